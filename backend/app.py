@@ -115,9 +115,9 @@ async def lifespan(app: FastAPI):
             await asyncio.sleep(3600)  # 1 hour
             try:
                 logger.info("Running periodic cache cleanup...")
-                from cache import url_cache, llm_cache, prompt_cache, translate_cache
+                from cache import url_cache, llm_cache, prompt_cache, translate_cache, embedding_cache
 
-                for cache in [url_cache, llm_cache, prompt_cache, translate_cache]:
+                for cache in [url_cache, llm_cache, prompt_cache, translate_cache, embedding_cache]:
                     cache.l1.cleanup_expired()
                     cache.l2.cleanup_expired()
                     cache.l2.cleanup_lru()
@@ -1095,7 +1095,7 @@ async def add_memory_entry(request: MemoryEntryRequest):
     if not request.content.strip():
         raise HTTPException(status_code=400, detail="Content cannot be empty")
     try:
-        entry = memory_manager.add_entry(
+        entry = await memory_manager.add_entry_async(
             content=request.content,
             category=request.category,
             salience=request.salience,
@@ -1110,7 +1110,7 @@ async def add_memory_entry(request: MemoryEntryRequest):
 @app.delete("/api/memory/entries/{entry_id}")
 async def delete_memory_entry(entry_id: str):
     """Delete a single memory entry by ID."""
-    success = memory_manager.delete_entry(entry_id)
+    success = await memory_manager.delete_entry_async(entry_id)
     if not success:
         raise HTTPException(status_code=404, detail="Entry not found")
     return {"status": "ok", "deleted": entry_id}
@@ -1125,7 +1125,7 @@ class UpdateMemoryEntryRequest(BaseModel):
 @app.put("/api/memory/entries/{entry_id}")
 async def update_memory_entry(entry_id: str, request: UpdateMemoryEntryRequest):
     """更新单条长期记忆条目。"""
-    result = memory_manager.update_entry(
+    result = await memory_manager.update_entry_async(
         entry_id=entry_id,
         content=request.content,
         category=request.category,
@@ -1776,6 +1776,11 @@ async def update_settings(request: SettingsUpdateRequest):
         prompt_cache.clear()
     except Exception:
         pass
+    from prompt_builder import invalidate_cache as invalidate_prompt_builder_cache
+    invalidate_prompt_builder_cache()
+    # .env 中的模型配置可能变化，重置 model pool 的旧配置回退缓存
+    from model_pool import invalidate_cache as invalidate_model_pool_cache
+    invalidate_model_pool_cache()
     # Invalidate LLM cache so new model config takes effect
     from engine import invalidate_caches
     invalidate_caches()
@@ -2269,13 +2274,14 @@ async def delete_pool_model(model_id: str):
 # 缓存端点
 # ============================================
 def _get_core_cache_map() -> dict:
-    """Get the 4 core cache instances."""
-    from cache import url_cache, llm_cache, prompt_cache, translate_cache
+    """Get the 5 core cache instances."""
+    from cache import url_cache, llm_cache, prompt_cache, translate_cache, embedding_cache
     return {
         "url": url_cache,
         "llm": llm_cache,
         "prompt": prompt_cache,
         "translate": translate_cache,
+        "embedding": embedding_cache,
     }
 
 
@@ -2337,7 +2343,7 @@ async def clear_cache(cache_type: str = Query(default="all")):
     Clear cache by type.
 
     Args:
-        cache_type: Cache type to clear (url, llm, prompt, translate, tool_*, all)
+        cache_type: Cache type to clear (url, llm, prompt, translate, embedding, tool_*, all)
     """
     try:
         core_map = _get_core_cache_map()
@@ -6,6 +6,7 @@ Provides a two-tier caching system (L1 memory + L2 disk) for various components:
 - LLM cache: Agent responses
 - Prompt cache: System prompt concatenation results
 - Translate cache: Translation API results
+- Embedding cache: Embedding vectors
 - Tool cache decorator: Generic caching for any tool
 """
 
@@ -13,6 +14,7 @@ from .url_cache import URLCache
 from .llm_cache import LLMCache
 from .prompt_cache import PromptCache
 from .translate_cache import TranslateCache
+from .embedding_cache import EmbeddingCache
 from .tool_cache_decorator import ToolCacheDecorator, cached_tool
 
 # Global cache instances (lazy initialized)
@@ -20,6 +22,7 @@ _url_cache = None
 _llm_cache = None
 _prompt_cache = None
 _translate_cache = None
+_embedding_cache = None
 
 
 def get_url_cache() -> URLCache:
@@ -54,25 +57,37 @@ def get_translate_cache() -> TranslateCache:
     return _translate_cache
 
 
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the global Embedding cache instance."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
+
+
 # Convenience exports
 url_cache = get_url_cache()
 llm_cache = get_llm_cache()
 prompt_cache = get_prompt_cache()
 translate_cache = get_translate_cache()
+embedding_cache = get_embedding_cache()
 
 __all__ = [
     "URLCache",
     "LLMCache",
     "PromptCache",
     "TranslateCache",
+    "EmbeddingCache",
     "ToolCacheDecorator",
     "cached_tool",
     "url_cache",
     "llm_cache",
     "prompt_cache",
     "translate_cache",
+    "embedding_cache",
     "get_url_cache",
     "get_llm_cache",
     "get_prompt_cache",
     "get_translate_cache",
+    "get_embedding_cache",
 ]
@@ -0,0 +1,152 @@
+"""
+Embedding cache for text embedding vectors.
+"""
+
+import base64
+import hashlib
+import logging
+from array import array
+from typing import Any, Optional
+
+from .memory_cache import MemoryCache
+from .disk_cache import DiskCache
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for embedding vectors.
+
+    缓存键基于 embedding 模型名 + 文本内容，切换模型后旧向量自动失效。
+    内容不变的记忆在重复压缩/聚类时无需再次调用 embedding API。
+
+    向量以 int8 量化形式存储（按最大绝对值缩放，base64 编码），
+    体积约为 JSON 浮点列表的 1/20；读取时还原为 float 列表，
+    余弦相似度误差约 0.001 量级，不影响聚类阈值判断。
+    """
+
+    def __init__(self):
+        """Initialize Embedding cache with L1 + L2."""
+        self.l1 = MemoryCache(
+            max_size=settings.cache_max_memory_items,
+            default_ttl=settings.embedding_cache_ttl,
+        )
+        self.l2 = DiskCache(
+            cache_dir=settings.cache_dir,
+            cache_type="embedding",
+            default_ttl=settings.embedding_cache_ttl,
+            max_size_mb=settings.cache_max_disk_size_mb,
+        )
+
+    def _compute_cache_key(self, text: str, model: str) -> str:
+        """
+        计算 embedding 缓存键。
+
+        Args:
+            text: 待向量化的文本
+            model: embedding 模型名
+
+        Returns:
+            SHA256 hash of model + text
+        """
+        key_str = f"{model}|{text}"
+        return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _pack(embedding: list[float]) -> dict:
+        """将 float 向量量化为 int8 并编码为可 JSON 序列化的字典"""
+        max_abs = max((abs(x) for x in embedding), default=0.0)
+        scale = max_abs / 127 if max_abs > 0 else 1.0
+        quantized = array("b", [max(-127, min(127, round(x / scale))) for x in embedding])
+        return {
+            "scale": scale,
+            "int8": base64.b64encode(quantized.tobytes()).decode("ascii"),
+        }
+
+    @staticmethod
+    def _unpack(value: Any) -> Optional[list[float]]:
+        """还原缓存中的向量（兼容旧版直接存储的 float 列表）"""
+        if isinstance(value, list):
+            return value
+        try:
+            quantized = array("b", base64.b64decode(value["int8"]))
+            scale = float(value["scale"])
+        except (KeyError, TypeError, ValueError) as e:
+            logger.debug(f"Embedding cache: invalid entry: {e}")
+            return None
+        return [q * scale for q in quantized]
+
+    def get_embedding(self, text: str, model: str) -> Optional[list[float]]:
+        """
+        获取缓存的 embedding 向量。
+
+        Args:
+            text: 文本内容
+            model: embedding 模型名
+
+        Returns:
+            缓存的向量，未命中返回 None
+        """
+        if not settings.enable_embedding_cache:
+            return None
+
+        cache_key = self._compute_cache_key(text, model)
+
+        # Try L1 first
+        cached = self.l1.get(cache_key)
+        if cached is not None:
+            return self._unpack(cached)
+
+        # Try L2
+        cached = self.l2.get(cache_key)
+        if cached is not None:
+            # Promote to L1
+            self.l1.set(cache_key, cached)
+            return self._unpack(cached)
+
+        return None
+
+    def cache_embedding(self, text: str, model: str, embedding: list[float]) -> None:
+        """
+        缓存 embedding 向量。
+
+        Args:
+            text: 文本内容
+            model: embedding 模型名
+            embedding: 向量
+        """
+        if not settings.enable_embedding_cache:
+            return
+
+        cache_key = self._compute_cache_key(text, model)
+        packed = self._pack(embedding)
+
+        # Store in both L1 and L2
+        self.l1.set(cache_key, packed)
+        self.l2.set(cache_key, packed)
+
+    def clear(self) -> dict:
+        """
+        Clear all Embedding cache.
+
+        Returns:
+            Dict with clear counts
+        """
+        l1_count = self.l1.clear()
+        l2_count = self.l2.clear()
+
+        return {
+            "l1_cleared": l1_count,
+            "l2_cleared": l2_count,
+        }
+
+    def get_stats(self) -> dict:
+        """Get Embedding cache statistics."""
+        return {
+            "enabled": settings.enable_embedding_cache,
+            "ttl": settings.embedding_cache_ttl,
+            "l1": self.l1.get_stats(),
+            "l2": self.l2.get_stats(),
+        }
@@ -3,11 +3,12 @@ Prompt cache for System Prompt concatenation results.
 """
 
 import hashlib
-import json
 import logging
 from typing import Optional
 from pathlib import Path
 
+import orjson
+
 from .memory_cache import MemoryCache
 from .disk_cache import DiskCache
 from config import settings
@@ -57,6 +58,10 @@ class PromptCache:
             memory_json = settings.memory_dir / "memory.json"
             if memory_json.exists():
                 workspace_files.append(memory_json)
+            # 单条更新/访问计数只追加到事件日志，不改动 memory.json
+            memory_events = settings.memory_dir / "memory.events.jsonl"
+            if memory_events.exists():
+                workspace_files.append(memory_events)
 
             # 监听每日日志文件（.json 格式）用于缓存失效
             from datetime import datetime, timedelta
@@ -98,8 +103,8 @@ class PromptCache:
             SHA256 hash of file versions
         """
         files_version = self._get_workspace_files_version()
-        version_str = json.dumps(files_version, sort_keys=True)
-        return hashlib.sha256(version_str.encode("utf-8")).hexdigest()
+        version_bytes = orjson.dumps(files_version, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(version_bytes).hexdigest()
 
     def get_cached_prompt(self) -> Optional[str]:
         """
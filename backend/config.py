@@ -114,11 +114,13 @@ class Settings(BaseSettings):
     enable_llm_cache: bool = Field(default=False)
     enable_prompt_cache: bool = Field(default=True)
     enable_translate_cache: bool = Field(default=True)
+    enable_embedding_cache: bool = Field(default=True)
 
     url_cache_ttl: int = Field(default=3600)
     llm_cache_ttl: int = Field(default=86400)
     prompt_cache_ttl: int = Field(default=600)
     translate_cache_ttl: int = Field(default=604800)
+    embedding_cache_ttl: int = Field(default=2592000)
 
     cache_max_memory_items: int = Field(default=100)
     cache_max_disk_size_mb: int = Field(default=5120)
@@ -128,6 +130,8 @@ class Settings(BaseSettings):
     memory_daily_log_days: int = Field(default=2)
     memory_max_prompt_tokens: int = Field(default=4000)
     memory_index_enabled: bool = Field(default=True)
+    memory_use_vec_index: bool = Field(default=True, description="向量检索走 SQLite 向量索引（false 时使用 LlamaIndex）")
+    memory_embedding_quant: str = Field(default="fp32", description="SQLite 向量索引的向量精度：fp32 / int8 / binary")
     # Memory v2 Configuration
     memory_consolidation_enabled: bool = Field(default=True)
     memory_archive_days: int = Field(default=30)
@@ -14,10 +14,8 @@ logger = logging.getLogger(__name__)
 _llm_cache: dict[str, ChatOpenAI] = {}
 
 
-def _config_fingerprint(scenario: str = "llm") -> str:
-    """根据当前模型配置生成短哈希，用于缓存键。"""
-    from model_pool import resolve_model
-    cfg = resolve_model(scenario)
+def _config_fingerprint(cfg: dict) -> str:
+    """根据模型配置生成短哈希，用于缓存键。"""
     raw = (f"{cfg['api_key']}|{cfg['api_base']}|{cfg['model']}"
            f"|{settings.llm_temperature}|{settings.llm_max_tokens}"
            f"|{settings.llm_request_timeout}")
@@ -25,13 +23,17 @@ def _config_fingerprint(scenario: str = "llm") -> str:
 
 
 def get_llm(streaming: bool = True, scenario: str = "llm") -> ChatOpenAI:
-    """获取或创建 ChatOpenAI 实例。配置未变时复用缓存。"""
-    fp = _config_fingerprint(scenario)
+    """获取或创建 ChatOpenAI 实例。配置未变时复用缓存。
+
+    每次调用只解析一次模型配置，指纹与新建实例共用同一份结果。
+    """
+    from model_pool import resolve_model
+    cfg = resolve_model(scenario)
+    fp = _config_fingerprint(cfg)
     key = f"{fp}_{streaming}"
-    if key not in _llm_cache:
-        from model_pool import resolve_model
-        cfg = resolve_model(scenario)
-        _llm_cache[key] = ChatOpenAI(
+    llm = _llm_cache.get(key)
+    if llm is None:
+        llm = _llm_cache[key] = ChatOpenAI(
             model=cfg["model"],
             api_key=cfg["api_key"],
             base_url=cfg["api_base"],
@@ -45,7 +47,7 @@ def get_llm(streaming: bool = True, scenario: str = "llm") -> ChatOpenAI:
                      settings.llm_request_timeout)
     else:
         logger.debug("LLM 实例已复用: fingerprint=%s", fp)
-    return _llm_cache[key]
+    return llm
 
 
 def create_llm(streaming: bool = True) -> ChatOpenAI:
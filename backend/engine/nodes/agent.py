@@ -113,10 +113,12 @@ async def agent_node(state: AgentState, config: RunnableConfig) -> dict[str, Any
                 logger.warning("[%s] Agent 调用了未知工具: %s", sid, tool_name)
 
             messages.append(ToolMessage(content=result_str, tool_call_id=call_id))
-            logger.info("[%s] Agent 工具执行: %s, 成功=%s", sid, tool_name, "[ERROR]" not in result_str)
+            # 约定：失败结果统一由本节点生成并以 [ERROR] 开头，只检查前缀，
+            # 无需扫描整段输出，也不会把工具正文里出现的 [ERROR] 误判为失败
+            logger.info("[%s] Agent 工具执行: %s, 成功=%s", sid, tool_name, not result_str.startswith("[ERROR]"))
 
             # 检测 plan_create → 解析计划数据
-            if tool_name == "plan_create" and "[ERROR]" not in result_str:
+            if tool_name == "plan_create" and not result_str.startswith("[ERROR]"):
                 plan_data = _parse_plan_from_tool_result(result_str, tool_args)
                 if plan_data:
                     logger.info("[%s] Agent 检测到 plan_create, plan_id=%s", sid, plan_data.get("plan_id"))
@@ -156,7 +156,7 @@ async def executor_node(state: AgentState, config: RunnableConfig) -> dict[str,
                     result_str = f"[ERROR] 未知工具: {tool_name}"
 
                 exec_messages.append(ToolMessage(content=result_str, tool_call_id=call_id))
-                logger.info("[%s] Executor 工具: %s, 成功=%s", sid, tool_name, "[ERROR]" not in result_str)
+                logger.info("[%s] Executor 工具: %s, 成功=%s", sid, tool_name, not result_str.startswith("[ERROR]"))
 
         if iterations >= max_iterations:
             logger.warning("Executor 达到最大迭代次数 (%d)", max_iterations)
@@ -86,6 +86,10 @@ async def _cached_run(message, session_history, ctx, mws):
         mem_file = settings.memory_dir / "memory.json"
         if mem_file.exists():
             memory_fingerprint = str(mem_file.stat().st_mtime)
+        # 单条更新只追加到事件日志，同样计入指纹
+        events_file = settings.memory_dir / "memory.events.jsonl"
+        if events_file.exists():
+            memory_fingerprint += f":{events_file.stat().st_size}"
     except Exception:
         pass
 
@@ -10,7 +10,7 @@
 - memory_manager: 核心管理器单例
 - MemoryManager: 管理器类
 - MemoryEntry, MemoryMeta: 数据模型
-- VALID_CATEGORIES, CATEGORY_LABELS: 分类定义
+- VALID_CATEGORIES, VALID_CATEGORIES_SET, CATEGORY_LABELS: 分类定义
 - session_reflector: 会话反思器（1 次 LLM 调用完成提取+反思+整合）
 """
 
@@ -21,6 +21,7 @@ from memory.models import (
     DailyLog,
     DailyLogEntry,
     VALID_CATEGORIES,
+    VALID_CATEGORIES_SET,
     CATEGORY_LABELS,
 )
 from memory.session_reflector import (
@@ -37,6 +38,7 @@ __all__ = [
     "DailyLog",
     "DailyLogEntry",
     "VALID_CATEGORIES",
+    "VALID_CATEGORIES_SET",
     "CATEGORY_LABELS",
     # 会话反思器
     "reflect_on_session",
@@ -4,16 +4,65 @@
 1. 30 天后：LLM 生成摘要 → 重要内容提升为长期记忆
 2. 60 天后：删除原始日志文件
 """
-import json
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
+import orjson
+
+try:
+    import ijson
+except ImportError:
+    # ijson 为可选依赖，缺失时整体解析日志
+    ijson = None
+
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# 批量归档的最大并发数（每次归档包含 LLM 调用，避免 API 过载）
+MAX_ARCHIVE_CONCURRENCY = 4
+
+# 归档时需要提升为长期记忆的日志条目类型
+IMPORTANT_LOG_TYPES = ("auto_extract", "reflection")
+
+# 清理时并发读取日志文件的上限
+MAX_LOG_READ_CONCURRENCY = 16
+
+# 日志摘要单次 Prompt 的最大字符数（超出时分段摘要后再合并）
+SUMMARY_CHUNK_CHARS = 2000
+
+# 分段摘要的最大并发数
+MAX_SUMMARY_CONCURRENCY = 3
+
+
+def _split_log_chunks(content: str, max_chars: int) -> list[str]:
+    """按行将日志切分为不超过 max_chars 的分段（超长单行硬切分）"""
+    chunks: list[str] = []
+    current: list[str] = []
+    current_len = 0
+
+    for line in content.splitlines():
+        while len(line) > max_chars:
+            # 单行超长：先提交当前分段，再硬切分该行
+            if current:
+                chunks.append("\n".join(current))
+                current, current_len = [], 0
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+
+        if current and current_len + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line) + 1
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
 
 async def summarize_daily_log(date: str) -> Optional[str]:
     """为每日日志生成摘要
@@ -26,7 +75,7 @@ async def summarize_daily_log(date: str) -> Optional[str]:
     """
     from memory.manager import memory_manager
 
-    content = memory_manager.read_daily_log(date)
+    content = await asyncio.to_thread(memory_manager.read_daily_log, date)
     if not content or len(content.strip()) < 50:
         return None
 
@@ -34,16 +83,47 @@ async def summarize_daily_log(date: str) -> Optional[str]:
         from engine.llm_factory import create_llm
         llm = create_llm(streaming=False)
 
-        prompt = f"""请为以下每日日志生成简洁摘要（100字以内），提取关键事件和发现。
+        chunks = _split_log_chunks(content, SUMMARY_CHUNK_CHARS)
+
+        if len(chunks) == 1:
+            prompt = f"""请为以下每日日志生成简洁摘要（100字以内），提取关键事件和发现。
 
 日期：{date}
 日志内容：
-{content[:2000]}
+{chunks[0]}
+
+摘要："""
+            response = await llm.ainvoke(prompt)
+            summary = response.content.strip()
+        else:
+            # Map：并发为每个分段生成摘要，覆盖全天日志而非只看开头
+            semaphore = asyncio.Semaphore(MAX_SUMMARY_CONCURRENCY)
+
+            async def _summarize_chunk(idx: int, chunk: str) -> str:
+                chunk_prompt = f"""以下是 {date} 每日日志的第 {idx}/{len(chunks)} 部分，请提取关键事件和发现，生成简洁摘要（100字以内）。
+
+日志内容：
+{chunk}
 
 摘要："""
+                async with semaphore:
+                    chunk_response = await llm.ainvoke(chunk_prompt)
+                return chunk_response.content.strip()
+
+            partials = await asyncio.gather(
+                *[_summarize_chunk(i, c) for i, c in enumerate(chunks, 1)]
+            )
+
+            # Reduce：合并分段摘要为全天摘要
+            partial_text = "\n".join(f"{i}. {p}" for i, p in enumerate(partials, 1) if p)
+            reduce_prompt = f"""以下是 {date} 每日日志各部分的摘要，请合并为一段完整的全天摘要（100字以内），保留最关键的事件和发现。
+
+分段摘要：
+{partial_text}
 
-        response = await llm.ainvoke(prompt)
-        summary = response.content.strip()
+摘要："""
+            response = await llm.ainvoke(reduce_prompt)
+            summary = response.content.strip()
 
         # 限制长度
         if len(summary) > 200:
@@ -56,6 +136,20 @@ async def summarize_daily_log(date: str) -> Optional[str]:
         return None
 
 
+def _read_important_entries(log_path: Path) -> list[dict]:
+    """读取日志中 auto_extract 和 reflection 类型的条目
+
+    安装了 ijson 时逐条流式解析 entries 数组，只保留需要的条目，
+    内存占用与保留条目数成正比；否则回退为整体解析。
+    """
+    with log_path.open("rb") as f:
+        if ijson is not None:
+            entries = ijson.items(f, "entries.item")
+        else:
+            entries = orjson.loads(f.read()).get("entries", [])
+        return [e for e in entries if e.get("type", "") in IMPORTANT_LOG_TYPES]
+
+
 async def extract_important_from_log(date: str) -> list[dict]:
     """从日志中提取重要内容，提升为长期记忆
 
@@ -72,26 +166,20 @@ async def extract_important_from_log(date: str) -> list[dict]:
         return []
 
     try:
-        data = json.loads(log_path.read_text(encoding="utf-8"))
-        entries = data.get("entries", [])
-
-        if not entries:
-            return []
+        # 流式解析放到线程中，避免阻塞事件循环
+        entries = await asyncio.to_thread(_read_important_entries, log_path)
 
-        # 筛选 auto_extract 和 reflection 类型的条目
         important = []
         for entry in entries:
-            entry_type = entry.get("type", "")
-            if entry_type in ("auto_extract", "reflection"):
-                content = entry.get("content", "")
-                category = entry.get("category", "general")
-                if content:
-                    important.append({
-                        "content": content,
-                        "category": category,
-                        "salience": 0.6,  # 从日志提升的记忆，中等重要性
-                        "source": f"archive_{date}",
-                    })
+            content = entry.get("content", "")
+            category = entry.get("category", "general")
+            if content:
+                important.append({
+                    "content": content,
+                    "category": category,
+                    "salience": 0.6,  # 从日志提升的记忆，中等重要性
+                    "source": f"archive_{date}",
+                })
 
         return important
 
@@ -120,8 +208,13 @@ async def archive_daily_log(date: str) -> dict:
     if not log_path.exists():
         return {"status": "not_found", "date": date}
 
+    # 标记文件存在说明已归档，无需读取解析日志
+    if _archived_marker(log_path).exists():
+        return {"status": "already_archived", "date": date}
+
     try:
-        data = json.loads(log_path.read_text(encoding="utf-8"))
+        raw = await asyncio.to_thread(log_path.read_bytes)
+        data = orjson.loads(raw)
 
         # 检查是否已归档
         if data.get("archived", False):
@@ -143,11 +236,15 @@ async def archive_daily_log(date: str) -> dict:
         # 标记为已归档
         data["archived"] = True
 
-        # 保存
-        log_path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            encoding="utf-8",
+        # 原子保存（序列化和写入均在线程中完成），崩溃时不会损坏日志
+        from memory.manager import _atomic_write_bytes
+        await asyncio.to_thread(
+            _atomic_write_bytes,
+            log_path,
+            orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS),
         )
+        # 写入标记文件，后续清理时无需解析 JSON 即可判断
+        await asyncio.to_thread(_archived_marker(log_path).touch)
 
         logger.info(f"已归档日志 {date}: 摘要={bool(summary)}, 提升={promoted_count}条")
         return {
@@ -162,6 +259,26 @@ async def archive_daily_log(date: str) -> dict:
         return {"status": "error", "date": date, "error": str(e)}
 
 
+def _archived_marker(log_path: Path) -> Path:
+    """已归档标记文件路径（YYYY-MM-DD.archived，空文件）"""
+    return log_path.with_suffix(".archived")
+
+
+def _is_log_archived(log_path: Path) -> bool:
+    """检查日志文件是否已归档
+
+    优先检查标记文件，无需解析整个 JSON；
+    标记缺失但 JSON 中 archived=true 时（旧数据）补建标记，下次直接命中。
+    """
+    marker = _archived_marker(log_path)
+    if marker.exists():
+        return True
+    archived = bool(orjson.loads(log_path.read_bytes()).get("archived", False))
+    if archived:
+        marker.touch()
+    return archived
+
+
 async def cleanup_old_logs(
     archive_days: Optional[int] = None,
     delete_days: Optional[int] = None,
@@ -193,49 +310,89 @@ async def cleanup_old_logs(
     if not memory_manager.logs_dir.exists():
         return {"archived": [], "deleted": [], "errors": []}
 
+    # 1. 分区：待删除（超过 delete_days）/ 待归档（超过 archive_days）/ 跳过
+    delete_candidates: list[tuple[str, Path]] = []
+    to_delete: list[tuple[str, Path]] = []
+    to_archive: list[str] = []
+
     for log_file in memory_manager.logs_dir.glob("*.json"):
         try:
             # 解析日期
             date_str = log_file.stem
             log_date = datetime.strptime(date_str, "%Y-%m-%d")
-
-            # 检查是否需要删除（超过 delete_days）
-            if log_date < delete_threshold:
-                # 先确保已归档（摘要 + 重要内容提升），再删除
-                try:
-                    log_data = json.loads(log_file.read_text(encoding="utf-8"))
-                    if not log_data.get("archived", False):
-                        # 未归档的日志先归档
-                        result = await archive_daily_log(date_str)
-                        if result.get("status") == "archived":
-                            archived.append(date_str)
-                        elif result.get("status") == "error":
-                            errors.append({"date": date_str, "error": result.get("error")})
-                            continue  # 归档失败则不删除，避免数据丢失
-                except Exception as e:
-                    logger.warning(f"删除前归档检查失败 ({date_str}): {e}")
-                    # 归档检查失败也不删除，保护数据
-                    errors.append({"date": date_str, "error": f"pre-delete archive check failed: {e}"})
-                    continue
-
-                log_file.unlink()
-                deleted.append(date_str)
-                logger.info(f"已删除旧日志: {date_str}")
-                continue
-
-            # 检查是否需要归档（超过 archive_days 但未到 delete_days）
-            if log_date < archive_threshold:
-                result = await archive_daily_log(date_str)
-                if result.get("status") == "archived":
-                    archived.append(date_str)
-                elif result.get("status") == "error":
-                    errors.append({"date": date_str, "error": result.get("error")})
-
         except ValueError:
             # 日期格式不正确，跳过
             continue
+
+        if log_date < delete_threshold:
+            # 超过 delete_days：需先确认已归档再删除
+            delete_candidates.append((date_str, log_file))
+        elif log_date < archive_threshold:
+            # 超过 archive_days 但未到 delete_days：归档
+            to_archive.append(date_str)
+
+    # 并发检查待删除日志的归档状态（文件读取在线程池中重叠执行）
+    read_semaphore = asyncio.Semaphore(MAX_LOG_READ_CONCURRENCY)
+
+    async def _probe_archived(log_file: Path) -> bool:
+        async with read_semaphore:
+            return await asyncio.to_thread(_is_log_archived, log_file)
+
+    probes = await asyncio.gather(
+        *[_probe_archived(f) for _, f in delete_candidates],
+        return_exceptions=True,
+    )
+
+    for (date_str, log_file), is_archived in zip(delete_candidates, probes):
+        if isinstance(is_archived, BaseException):
+            logger.warning(f"删除前归档检查失败 ({date_str}): {is_archived}")
+            # 归档检查失败也不删除，保护数据
+            errors.append({"date": date_str, "error": f"pre-delete archive check failed: {is_archived}"})
+            continue
+        if not is_archived:
+            # 未归档的日志先归档
+            to_archive.append(date_str)
+        to_delete.append((date_str, log_file))
+
+    # 2. 并发归档（信号量限制并发，避免 LLM API 过载）
+    semaphore = asyncio.Semaphore(MAX_ARCHIVE_CONCURRENCY)
+
+    async def _archive_with_sem(date_str: str) -> dict:
+        async with semaphore:
+            return await archive_daily_log(date_str)
+
+    results = await asyncio.gather(
+        *[_archive_with_sem(d) for d in to_archive],
+        return_exceptions=True,
+    )
+
+    failed_dates: set[str] = set()
+    for date_str, result in zip(to_archive, results):
+        if isinstance(result, BaseException):
+            errors.append({"date": date_str, "error": str(result)})
+            failed_dates.add(date_str)
+        elif result.get("status") == "archived":
+            archived.append(date_str)
+        elif result.get("status") == "error":
+            errors.append({"date": date_str, "error": result.get("error")})
+            failed_dates.add(date_str)
+
+    # 3. 串行删除：只删除已归档成功的日志，归档失败则保留，避免数据丢失
+    for date_str, log_file in to_delete:
+        if date_str in failed_dates:
+            continue
+        try:
+            log_file.unlink()
+            _archived_marker(log_file).unlink(missing_ok=True)
+            deleted.append(date_str)
+            logger.info(f"已删除旧日志: {date_str}")
         except Exception as e:
-            errors.append({"date": log_file.stem, "error": str(e)})
+            errors.append({"date": date_str, "error": str(e)})
+
+    if deleted:
+        # 已删除日志的条目可能仍在搜索结果缓存中
+        from memory.search import invalidate_search_results
+        invalidate_search_results()
 
     logger.info(f"日志清理完成: 归档={len(archived)}, 删除={len(deleted)}, 错误={len(errors)}")
     return {
@@ -16,14 +16,37 @@
 - 前端"整理记忆"按钮
 """
 import asyncio
-import json
 import logging
-import re
+import math
+import os
 import shutil
+import subprocess
+import sys
+import time
+from array import array
+from bisect import bisect_right
 from datetime import datetime
-from typing import Optional
+from itertools import combinations
+from operator import mul
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+import orjson
 
 from memory.models import MemoryEntry, VALID_CATEGORIES, CATEGORY_LABELS
+from memory.session_reflector import _extract_json
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy 随 llama-index 间接安装，缺失时使用纯 Python 实现
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    # numba 为可选依赖，缺失时使用纯 Python 并查集
+    njit = None
 
 logger = logging.getLogger(__name__)
 
@@ -33,98 +56,174 @@ CLUSTER_SIMILARITY_THRESHOLD = 0.75
 # 批量合并的最大并发数（避免 LLM API 过载）
 MAX_MERGE_CONCURRENCY = 3
 
+# 聚类内记忆两两 2-gram Jaccard 均不低于此值时视为重复，跳过 LLM 直接合并
+TRIVIAL_MERGE_JACCARD = 0.95
+
+# 多个聚类打包进同一个合并 prompt 的上限（估算 token 数 / 聚类数）
+MERGE_GROUP_MAX_TOKENS = 3000
+MERGE_GROUP_MAX_CLUSTERS = 8
+
+# 合并阶段 LLM 调用的预防性限流（低于常见账户的 RPM / TPM 上限，避免触发 429）
+MERGE_REQUESTS_PER_MINUTE = 60
+MERGE_TOKENS_PER_MINUTE = 60000
+
+# 单次 embedding 请求的最大文本数（DashScope 兼容模式上限为 10，OpenAI 更宽松）
+EMBEDDING_BATCH_SIZE = 10
 
-def _cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float:
-    """计算两个向量的余弦相似度"""
-    import math
+# 同时进行的 embedding 批量请求数
+MAX_EMBEDDING_CONCURRENCY = 4
 
-    if not vec_a or not vec_b or len(vec_a) != len(vec_b):
-        return 0.0
+# 相似度达到此值时记录日志（便于调试阈值）
+_LOG_SIMILARITY_FLOOR = 0.5
 
-    dot_product = sum(a * b for a, b in zip(vec_a, vec_b))
-    norm_a = math.sqrt(sum(a * a for a in vec_a))
-    norm_b = math.sqrt(sum(b * b for b in vec_b))
+# 分块计算相似度时每块的行数（峰值内存为 块行数 × N 个 float32，而不是 N × N）
+_SIMILARITY_BLOCK_ROWS = 512
 
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
+# 完整相似度矩阵的最大边长（超过后 JIT 内核不再使用，改走分块路径）
+_DENSE_MATRIX_MAX_ROWS = 4096
 
-    return dot_product / (norm_a * norm_b)
 
+# int8 量化向量：(量化后的分量数组, 量化向量的 L2 范数)
+QuantizedVector = tuple[array, float]
 
-def _text_similarity(text_a: str, text_b: str) -> float:
-    """计算两段文本的相似度（后备方案，当 embedding 不可用时）
 
-    使用多种方法的组合：
-    1. 字符级 n-gram Jaccard 相似度
-    2. 最长公共子序列比例
-    3. 字符集重叠度
+def _quantize_int8(vec: list[float]) -> Optional[QuantizedVector]:
+    """将 embedding 对称量化为 int8（按向量最大绝对值缩放）
 
-    这种方法对中文很友好，因为中文每个字符都有独立含义
+    array('b') 每个分量仅占 1 字节，而 Python float 列表每个分量约 32 字节，
+    聚类期间的内存占用显著下降；余弦相似度误差约 0.001 量级，不影响 0.75 阈值判断。
+    范数在量化时一次性算好，比较时只需一次整数点积。
     """
-    if not text_a or not text_b:
-        return 0.0
+    if not vec:
+        return None
+    max_abs = max(abs(x) for x in vec)
+    if max_abs == 0:
+        return None
+    scale = 127.0 / max_abs
+    quantized = array("b", [max(-127, min(127, round(x * scale))) for x in vec])
+    norm = math.sqrt(sum(map(mul, quantized, quantized)))
+    if norm == 0:
+        return None
+    return quantized, norm
+
+
+# 文本特征：(2-gram 集合, 3-gram 集合, 字符集合, 去空格后长度)
+TextFeatures = tuple[frozenset, frozenset, frozenset, int]
+
 
+def _text_features(text: str) -> TextFeatures:
+    """预计算文本相似度所需的特征（每条记忆只计算一次）
+
+    聚类时两两比较会调用 O(N²) 次相似度计算，
+    提前生成 n-gram 集合可避免每次比较都重新切分字符串。
+    """
     # 移除空格
-    text_a = text_a.replace(" ", "").replace("　", "")
-    text_b = text_b.replace(" ", "").replace("　", "")
+    text = text.replace(" ", "").replace("　", "") if text else ""
 
-    # 1. 字符级 2-gram Jaccard 相似度
-    def get_ngrams(text: str, n: int = 2) -> set:
-        return {text[i:i+n] for i in range(len(text) - n + 1)} if len(text) >= n else set()
+    def get_ngrams(n: int) -> frozenset:
+        return frozenset(text[i:i+n] for i in range(len(text) - n + 1)) if len(text) >= n else frozenset()
+
+    return get_ngrams(2), get_ngrams(3), frozenset(text), len(text)
+
+
+def _text_sim_from_feats(feats_a: TextFeatures, feats_b: TextFeatures) -> float:
+    """基于预计算特征计算文本相似度
 
-    ngrams_a_2 = get_ngrams(text_a, 2)
-    ngrams_b_2 = get_ngrams(text_b, 2)
+    综合得分 = 2-gram Jaccard 0.4 + 3-gram Jaccard 0.3 + 字符重叠 0.2 + 长度相似 0.1
+    """
+    ngrams_a_2, ngrams_a_3, chars_a, len_a = feats_a
+    ngrams_b_2, ngrams_b_3, chars_b, len_b = feats_b
+
+    # 1. 字符级 2-gram Jaccard 相似度
     if ngrams_a_2 and ngrams_b_2:
-        intersection_2 = ngrams_a_2 & ngrams_b_2
-        union_2 = ngrams_a_2 | ngrams_b_2
-        jaccard_2 = len(intersection_2) / len(union_2)
+        jaccard_2 = len(ngrams_a_2 & ngrams_b_2) / len(ngrams_a_2 | ngrams_b_2)
     else:
         jaccard_2 = 0.0
 
     # 2. 字符级 3-gram Jaccard 相似度
-    ngrams_a_3 = get_ngrams(text_a, 3)
-    ngrams_b_3 = get_ngrams(text_b, 3)
     if ngrams_a_3 and ngrams_b_3:
-        intersection_3 = ngrams_a_3 & ngrams_b_3
-        union_3 = ngrams_a_3 | ngrams_b_3
-        jaccard_3 = len(intersection_3) / len(union_3)
+        jaccard_3 = len(ngrams_a_3 & ngrams_b_3) / len(ngrams_a_3 | ngrams_b_3)
     else:
         jaccard_3 = 0.0
 
     # 3. 字符集重叠度（unigram）
-    chars_a = set(text_a)
-    chars_b = set(text_b)
     if chars_a and chars_b:
         char_overlap = len(chars_a & chars_b) / len(chars_a | chars_b)
     else:
         char_overlap = 0.0
 
     # 4. 长度相似度（惩罚长度差异过大的文本）
-    len_a, len_b = len(text_a), len(text_b)
     len_sim = min(len_a, len_b) / max(len_a, len_b) if max(len_a, len_b) > 0 else 0.0
 
-    # 综合得分（2-gram 0.4 + 3-gram 0.3 + 字符重叠 0.2 + 长度 0.1）
-    score = 0.4 * jaccard_2 + 0.3 * jaccard_3 + 0.2 * char_overlap + 0.1 * len_sim
+    return 0.4 * jaccard_2 + 0.3 * jaccard_3 + 0.2 * char_overlap + 0.1 * len_sim
 
-    return score
+
+def _text_candidate_pairs(feats: list[TextFeatures], threshold: float) -> Iterator[tuple[int, int]]:
+    """生成可能达到阈值的文本记忆对（按 2-gram 集合大小剪枝）
+
+    2-gram Jaccard ≤ 小集合大小 / 大集合大小，其余三项之和最多为 0.6，
+    因此 score ≤ 0.4 × ratio + 0.6。当 ratio < (threshold - 0.6) / 0.4 时，
+    该对记忆不可能达到阈值，可直接跳过。
+    按集合大小排序后用二分查找确定每条记忆的有效比较区间。
+    """
+    n = len(feats)
+    min_ratio = (threshold - 0.6) / 0.4
+    if min_ratio <= 0:
+        # 阈值过低，无法剪枝
+        yield from combinations(range(n), 2)
+        return
+
+    order = sorted(range(n), key=lambda k: len(feats[k][0]))
+    sizes = [len(feats[k][0]) for k in order]
+
+    for a, i in enumerate(order):
+        if sizes[a] == 0:
+            # 无 2-gram 的文本得分上限为 0.6，不可能达到阈值
+            continue
+        upper = bisect_right(sizes, sizes[a] / min_ratio)
+        for b in range(a + 1, upper):
+            yield i, order[b]
+
+
+# AsyncOpenAI 客户端缓存：键为 (api_key, api_base, 事件循环 id)，
+# 复用 HTTP 连接池；客户端的连接绑定事件循环，换循环时需重建
+_embedding_client = None
+_embedding_client_key: Optional[tuple] = None
+
+
+def _get_embedding_client(emb_cfg: dict):
+    """获取（或按需创建）embedding 请求使用的 AsyncOpenAI 客户端"""
+    global _embedding_client, _embedding_client_key
+    from openai import AsyncOpenAI
+
+    key = (emb_cfg["api_key"], emb_cfg["api_base"], id(asyncio.get_running_loop()))
+    if _embedding_client is None or _embedding_client_key != key:
+        _embedding_client = AsyncOpenAI(
+            api_key=emb_cfg["api_key"],
+            base_url=emb_cfg["api_base"],
+            timeout=30,
+        )
+        _embedding_client_key = key
+    return _embedding_client
 
 
 async def get_embedding(text: str) -> Optional[list[float]]:
     """获取文本的向量表示
 
     直接使用 OpenAI SDK，兼容所有 OpenAI 兼容的 API（如阿里云 DashScope）
+    结果按 (模型, 内容) 缓存，内容未变的记忆重复压缩时无需再次请求 API
     """
     try:
-        from openai import AsyncOpenAI
         from model_pool import resolve_model
+        from cache import embedding_cache
 
         emb_cfg = resolve_model("embedding")
 
-        client = AsyncOpenAI(
-            api_key=emb_cfg["api_key"],
-            base_url=emb_cfg["api_base"],
-            timeout=30,
-        )
+        cached = embedding_cache.get_embedding(text, emb_cfg["model"])
+        if cached is not None:
+            return cached
+
+        client = _get_embedding_client(emb_cfg)
 
         response = await client.embeddings.create(
             model=emb_cfg["model"],
@@ -132,7 +231,9 @@ async def get_embedding(text: str) -> Optional[list[float]]:
         )
 
         if response.data:
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
+            embedding_cache.cache_embedding(text, emb_cfg["model"], embedding)
+            return embedding
         return None
 
     except Exception as e:
@@ -140,6 +241,209 @@ async def get_embedding(text: str) -> Optional[list[float]]:
         return None
 
 
+async def get_embeddings_batch(texts: list[str]) -> list[Optional[list[float]]]:
+    """批量获取文本的向量表示，返回与 texts 一一对应的列表（失败项为 None）
+
+    缓存命中的文本不再请求；未命中的文本按 EMBEDDING_BATCH_SIZE 分批，
+    每批一次 HTTP 请求，多批并发，N 条记忆只需约 N / 批大小 次往返。
+    """
+    results: list[Optional[list[float]]] = [None] * len(texts)
+    if not texts:
+        return results
+
+    try:
+        from model_pool import resolve_model
+        from cache import embedding_cache
+
+        emb_cfg = resolve_model("embedding")
+        model = emb_cfg["model"]
+
+        # 缓存未命中时会逐条读 L2 磁盘文件，放到线程中执行，不阻塞事件循环
+        cached_list = await asyncio.to_thread(
+            lambda: [embedding_cache.get_embedding(text, model) for text in texts]
+        )
+        missing: list[int] = []
+        for i, cached in enumerate(cached_list):
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.append(i)
+
+        if not missing:
+            return results
+
+        client = _get_embedding_client(emb_cfg)
+    except Exception as e:
+        logger.warning(f"获取 embedding 失败: {e}")
+        return results
+
+    semaphore = asyncio.Semaphore(MAX_EMBEDDING_CONCURRENCY)
+    fetched: list[int] = []
+
+    async def _embed_chunk(indices: list[int]) -> None:
+        try:
+            async with semaphore:
+                response = await client.embeddings.create(
+                    model=model,
+                    input=[texts[i] for i in indices],
+                )
+        except Exception as e:
+            logger.warning(f"批量获取 embedding 失败（{len(indices)} 条）: {e}")
+            return
+        # 按 index 字段回填，不依赖服务端返回顺序
+        for item in response.data:
+            if 0 <= item.index < len(indices):
+                i = indices[item.index]
+                results[i] = item.embedding
+                fetched.append(i)
+
+    await asyncio.gather(*(
+        _embed_chunk(missing[start:start + EMBEDDING_BATCH_SIZE])
+        for start in range(0, len(missing), EMBEDDING_BATCH_SIZE)
+    ))
+
+    # 新向量统一在线程中写回缓存（每条一次磁盘写入）
+    if fetched:
+        def _write_back() -> None:
+            for i in fetched:
+                embedding_cache.cache_embedding(texts[i], model, results[i])
+
+        try:
+            await asyncio.to_thread(_write_back)
+        except Exception as e:
+            logger.warning(f"写入 embedding 缓存失败: {e}")
+    return results
+
+
+def _embedding_matrix(embeddings: list[Optional[list[float]]]) -> tuple["np.ndarray", list[bool]]:
+    """将 embedding 写入一块连续的 (N, D) float32 矩阵并按行 L2 归一化（需要 numpy）
+
+    相比 list[list[float]]，每个分量只占 4 字节且内存连续，可直接交给 BLAS。
+    返回 (矩阵, 有效标记)；缺失、维度不一致或零向量的行标记为无效。
+    """
+    dim = next((len(emb) for emb in embeddings if emb), 0)
+    matrix = np.zeros((len(embeddings), dim), dtype=np.float32)
+    mask = np.zeros(len(embeddings), dtype=bool)
+    for i, emb in enumerate(embeddings):
+        if emb and len(emb) == dim:
+            matrix[i] = emb
+            mask[i] = True
+
+    norms = np.linalg.norm(matrix, axis=1)
+    mask &= norms > 0
+    matrix[mask] /= norms[mask, None]
+    return matrix, mask.tolist()
+
+
+def _similarity_matrix(matrix: "np.ndarray") -> "np.ndarray":
+    """由按行归一化的矩阵计算 (N, N) 余弦相似度矩阵"""
+    return matrix @ matrix.T
+
+
+if njit is not None and np is not None:
+    @njit(cache=True)
+    def _kernel_find(parent, x):
+        """JIT 并查集查找（迭代式路径压缩）"""
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            nxt = parent[x]
+            parent[x] = root
+            x = nxt
+        return root
+
+    @njit(cache=True)
+    def _union_find_kernel(sims, threshold):
+        """JIT 内核：合并相似度矩阵上三角中 ≥ threshold 的记忆对，返回每个节点的根"""
+        n = sims.shape[0]
+        parent = np.arange(n).astype(np.int32)
+        rank = np.zeros(n, dtype=np.int32)
+        for i in range(n):
+            for j in range(i + 1, n):
+                if sims[i, j] < threshold:
+                    continue
+                px = _kernel_find(parent, i)
+                py = _kernel_find(parent, j)
+                if px == py:
+                    continue
+                if rank[px] < rank[py]:
+                    px, py = py, px
+                parent[py] = px
+                if rank[px] == rank[py]:
+                    rank[px] += 1
+        for i in range(n):
+            parent[i] = _kernel_find(parent, i)
+        return parent
+else:
+    _union_find_kernel = None
+
+
+def _pairwise_cosine(vectors, min_sim: float) -> list[tuple[int, int, float]]:
+    """一次性计算所有向量对的余弦相似度，返回 ≥ min_sim 的 (i, j, sim)
+
+    vectors 为按行归一化的 float32 矩阵时，按行分块做 BLAS 矩阵乘法，
+    每块只与自身及其后的行相乘（只算上三角），并立即筛出达到 min_sim 的记忆对，
+    不保留完整的 N × N 矩阵；为 int8 量化向量列表时使用纯 Python 整数点积。
+    """
+    n = len(vectors)
+    if n < 2:
+        return []
+
+    if np is not None and isinstance(vectors, np.ndarray):
+        pairs = []
+        for start in range(0, n, _SIMILARITY_BLOCK_ROWS):
+            # block[r, c] 对应记忆对 (start + r, start + c)
+            block = vectors[start:start + _SIMILARITY_BLOCK_ROWS] @ vectors[start:].T
+            rows, cols = np.nonzero(np.triu(block >= min_sim, k=1))
+            pairs.extend(
+                (start + int(r), start + int(c), float(block[r, c]))
+                for r, c in zip(rows, cols)
+            )
+        return pairs
+
+    # 范数已在量化时算好：直接用原始点积与 min_sim × 范数积比较，
+    # 只有通过阈值的记忆对才做除法
+    pairs = []
+    for i, j in combinations(range(n), 2):
+        vec_a, norm_a = vectors[i]
+        vec_b, norm_b = vectors[j]
+        if len(vec_a) != len(vec_b):
+            continue
+        dot = sum(map(mul, vec_a, vec_b))
+        denom = norm_a * norm_b
+        if dot >= min_sim * denom:
+            pairs.append((i, j, dot / denom))
+    return pairs
+
+
+def _score_embedding_pairs(
+    vectors,
+    has_vector: list[bool],
+    feats: list[Optional[TextFeatures]],
+    min_sim: float,
+) -> Iterator[tuple[int, int, float, str]]:
+    """向量模式下的两两相似度
+
+    vectors 只包含有向量的记忆（按下标顺序），批量计算；
+    缺失向量的记忆对回退为文本相似度。
+    """
+    valid = [i for i, ok in enumerate(has_vector) if ok]
+    for a, b, sim in _pairwise_cosine(vectors, min_sim):
+        yield valid[a], valid[b], sim, "vector"
+
+    # 部分 embedding 失败，对涉及这些记忆的记忆对使用文本相似度
+    missing = [i for i, ok in enumerate(has_vector) if not ok]
+    if not missing:
+        return
+    missing_set = set(missing)
+    for i in missing:
+        for j in range(len(has_vector)):
+            if j == i or (j in missing_set and j < i):
+                continue
+            yield i, j, _text_sim_from_feats(feats[i], feats[j]), "text-partial"
+
+
 class EmbeddingUnavailableError(Exception):
     """embedding 模型不可用异常，用于通知调用方需要降级"""
     pass
@@ -177,105 +481,233 @@ async def _cluster_by_similarity(
     n = len(entries)
     logger.info(f"开始聚类 {n} 条记忆，阈值: {threshold}")
 
+    # 聚类期间只访问 id 和 content：一次性抽取为并行数组，
+    # 热循环按下标访问，避免反复解引用 MemoryEntry 对象属性
+    ids = [e.id for e in entries]
+    contents = [e.content for e in entries]
+
+    # 内容完全相同的记忆共享 embedding 和文本特征，只计算一次
+    unique_contents: list[str] = []
+    content_index: dict[str, int] = {}
+    inverse: list[int] = []
+    for content in contents:
+        idx = content_index.get(content)
+        if idx is None:
+            idx = content_index[content] = len(unique_contents)
+            unique_contents.append(content)
+        inverse.append(idx)
+
     # 如果强制使用文本相似度，跳过 embedding 获取
     if force_text_similarity:
         logger.info("使用文本相似度模式（用户已确认降级）")
-        embeddings = [None] * n
+        has_vector = [False] * n
+        vectors = []
         use_text_fallback = True
     else:
         # 获取第一个 embedding 来检测模型是否可用
-        first_emb = await get_embedding(entries[0].content)
+        first_emb = await get_embedding(unique_contents[0])
         if first_emb is None:
             # 第一次就失败，抛出异常让调用方询问用户
             logger.warning("embedding 模型不可用，需要用户确认是否降级")
             raise EmbeddingUnavailableError("embedding 模型不可用")
 
-        # 第一个成功，继续获取剩余的 embedding
-        embeddings: list[Optional[list[float]]] = [first_emb]
-        for entry in entries[1:]:
-            emb = await get_embedding(entry.content)
-            embeddings.append(emb)
-
+        # 第一个成功，批量获取剩余的 embedding
+        raw = [first_emb, *await get_embeddings_batch(unique_contents[1:])]
+        if np is not None:
+            # 写入连续的 float32 矩阵（按行归一化），后续相似度计算直接走 BLAS
+            unique_matrix, unique_valid = _embedding_matrix(raw)
+            has_vector = [unique_valid[k] for k in inverse]
+            vectors = unique_matrix[[inverse[i] for i in range(n) if has_vector[i]]]
+        else:
+            # 无 numpy 时量化为 int8，降低纯 Python 路径的内存占用
+            quantized = [_quantize_int8(emb) if emb is not None else None for emb in raw]
+            has_vector = [quantized[k] is not None for k in inverse]
+            vectors = [quantized[inverse[i]] for i in range(n) if has_vector[i]]
+        del raw
         use_text_fallback = False
 
-    # 使用 Union-Find 进行聚类
+    # 文本相似度特征：每条记忆只预计算一次，避免 O(N²) 次重复切分
+    feats: list[Optional[TextFeatures]] = [None] * n
+    if use_text_fallback or not all(has_vector):
+        unique_feats = [_text_features(content) for content in unique_contents]
+        feats = [unique_feats[k] for k in inverse]
+
+    # 使用 Union-Find 进行聚类（按秩合并 + 迭代式路径压缩，避免递归开销）
     parent = list(range(n))
+    rank = [0] * n
 
     def find(x: int) -> int:
-        if parent[x] != x:
-            parent[x] = find(parent[x])
-        return parent[x]
+        # 第一遍：找到根节点
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        # 第二遍：路径压缩，将沿途节点直接挂到根上
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
 
     def union(x: int, y: int) -> None:
         px, py = find(x), find(y)
-        if px != py:
-            parent[px] = py
+        if px == py:
+            return
+        # 矮树挂到高树下，保持树高为 O(log N)
+        if rank[px] < rank[py]:
+            px, py = py, px
+        parent[py] = px
+        if rank[px] == rank[py]:
+            rank[px] += 1
+
+    # 逐对相似度日志只在 DEBUG 级别输出；判断一次，热循环内不再格式化字符串
+    log_pairs = logger.isEnabledFor(logging.DEBUG)
+    # 不记录日志时只需要达到阈值的记忆对
+    min_sim = min(threshold, _LOG_SIMILARITY_FLOOR) if log_pairs else threshold
+
+    # 计算两两相似度，得到 (i, j, 相似度, 方法) 序列
+    if use_text_fallback:
+        # 后备方案：文本相似度，按 2-gram 规模剪枝跳过不可能达到阈值的记忆对
+        scored = (
+            (i, j, _text_sim_from_feats(feats[i], feats[j]), "text")
+            for i, j in _text_candidate_pairs(feats, threshold)
+        )
+    elif (
+        _union_find_kernel is not None
+        and n <= _DENSE_MATRIX_MAX_ROWS
+        and all(has_vector)
+    ):
+        # 向量齐全且装有 numba：阈值判断与并查集合并都在 JIT 内核中完成
+        sims = _similarity_matrix(vectors)
+        parent[:] = _union_find_kernel(sims, threshold).tolist()
+        # 内核返回的是完全压缩的森林（树高 ≤ 1），同步秩以保持按秩合并的不变量
+        for i, root in enumerate(parent):
+            if root != i:
+                rank[root] = 1
+        # 后续循环仅用于记录相似度日志（已合并的记忆对 union 为空操作）
+        if log_pairs:
+            rows, cols = np.nonzero(np.triu(sims >= _LOG_SIMILARITY_FLOOR, k=1))
+            scored = ((int(i), int(j), float(sims[i, j]), "vector") for i, j in zip(rows, cols))
+        else:
+            scored = ()
+    else:
+        scored = _score_embedding_pairs(vectors, has_vector, feats, min_sim)
+
+    # 合并相似的记忆
+    for i, j, sim, method in scored:
+        if log_pairs and sim >= _LOG_SIMILARITY_FLOOR:
+            logger.debug(
+                "相似度 [%s]: [%s] vs [%s] = %.3f %s",
+                method, ids[i], ids[j], sim, "=> 合并" if sim >= threshold else "=> 不合并",
+            )
+
+        if sim >= threshold:
+            union(i, j)
 
-    # 计算两两相似度，合并相似的记忆
+    # 按聚类分组（先按下标分组，最后再还原为 MemoryEntry）
+    clusters_map: dict[int, list[int]] = {}
     for i in range(n):
-        for j in range(i + 1, n):
-            # 计算相似度
-            if use_text_fallback:
-                # 后备方案：文本相似度
-                sim = _text_similarity(entries[i].content, entries[j].content)
-                method = "text"
-            elif embeddings[i] is not None and embeddings[j] is not None:
-                # 正常情况：向量相似度
-                sim = _cosine_similarity(embeddings[i], embeddings[j])
-                method = "vector"
-            elif embeddings[i] is None or embeddings[j] is None:
-                # 部分 embedding 失败，对这一对使用文本相似度
-                sim = _text_similarity(entries[i].content, entries[j].content)
-                method = "text-partial"
-            else:
-                continue
+        clusters_map.setdefault(find(i), []).append(i)
 
-            # 记录相似度较高的比较
-            if sim >= 0.5:
-                logger.info(
-                    f"相似度 [{method}]: [{entries[i].id}] vs [{entries[j].id}] = {sim:.3f} "
-                    f"{'=> 合并' if sim >= threshold else '=> 不合并'}"
+    clusters = [[entries[i] for i in members] for members in clusters_map.values()]
+    logger.info(f"聚类完成: {n} 条记忆 -> {len(clusters)} 个聚类")
+
+    return clusters
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：CJK 字符约 1 token/字，其余约 4 字符/token"""
+    cjk = sum(1 for ch in text if ch >= "\u2e80")
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+class _TokenBucket:
+    """按分钟配额的令牌桶，同时限制请求数（RPM）与 token 数（TPM）
+
+    在发出请求前预先等待配额，而不是等服务端返回 429 再重试。
+    每次压缩任务创建一个实例，由该任务内的所有合并请求共享。
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._rpm = float(requests_per_minute)
+        self._tpm = float(tokens_per_minute)
+        self._requests = self._rpm
+        self._tokens = self._tpm
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self._rpm, self._requests + elapsed * self._rpm / 60)
+        self._tokens = min(self._tpm, self._tokens + elapsed * self._tpm / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        """等待直到同时拥有 1 个请求配额和 tokens 个 token 配额"""
+        # 超过桶容量的请求按满桶计，避免永远等不到
+        tokens = min(float(tokens), self._tpm)
+        # 持锁等待：先到的请求先获得配额
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self._rpm,
+                    (tokens - self._tokens) * 60 / self._tpm,
                 )
+                await asyncio.sleep(wait)
 
-            if sim >= threshold:
-                union(i, j)
 
-    # 按聚类分组
-    clusters_map: dict[int, list[MemoryEntry]] = {}
-    for i, entry in enumerate(entries):
-        root = find(i)
-        clusters_map.setdefault(root, []).append(entry)
+def _find_trivial_duplicate(cluster: list[MemoryEntry]) -> Optional[MemoryEntry]:
+    """判断聚类是否只是重复内容，是则返回可直接保留的记忆，否则返回 None
 
-    clusters = list(clusters_map.values())
-    logger.info(f"聚类完成: {n} 条记忆 -> {len(clusters)} 个聚类")
+    满足任一条件即视为重复（忽略空白差异）：
+    1. 最长的一条记忆包含其余所有记忆的内容
+    2. 两两 2-gram Jaccard 相似度均 ≥ TRIVIAL_MERGE_JACCARD
+    """
+    normalized = [" ".join(e.content.split()) for e in cluster]
+    longest = max(range(len(cluster)), key=lambda i: len(normalized[i]))
+    if all(text in normalized[longest] for text in normalized):
+        return cluster[longest]
+
+    grams = [_text_features(text)[0] for text in normalized]
+    for a, b in combinations(grams, 2):
+        if not a or not b or len(a & b) / len(a | b) < TRIVIAL_MERGE_JACCARD:
+            return None
+    return cluster[longest]
 
-    return clusters
 
+def _format_cluster_entries(cluster: list[MemoryEntry]) -> str:
+    """将聚类中的记忆格式化为 prompt 中的条目列表"""
+    return "\n".join([
+        f"- [{e.id}] (重要性:{e.salience:.2f}, 访问:{e.access_count}次, 来源:{e.source}) {e.content}"
+        for e in cluster
+    ])
 
-def _extract_json(text: str) -> str:
-    """从可能包含 markdown 代码块的文本中提取 JSON"""
-    match = re.search(r'```(?:json)?\s*\n?(.*?)```', text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return text.strip()
 
+def _trivial_merge_content(cluster: list[MemoryEntry]) -> Optional[tuple[str, float]]:
+    """重复内容聚类的机械合并结果 (内容, 重要性)；需要 LLM 合并时返回 None"""
+    duplicate = _find_trivial_duplicate(cluster)
+    if duplicate is None:
+        return None
+    logger.info(f"聚类内容重复，跳过 LLM 合并（short-circuit merge）: [{duplicate.id}]")
+    return duplicate.content, max(e.salience for e in cluster)
 
-async def _merge_cluster(
+
+async def _llm_merge_content(
     cluster: list[MemoryEntry],
     category: str,
-) -> tuple[MemoryEntry, dict]:
-    """使用 LLM 合并一组相似记忆
+    limiter: Optional[_TokenBucket] = None,
+) -> tuple[str, float]:
+    """调用 LLM 合并一组记忆的内容，返回 (合并后的内容, 重要性)
 
-    输入：同分类的多条相似记忆
-    输出：(合并后的记忆, 合并详情)
+    LLM 调用或解析失败时，保留访问次数最多/salience 最高的记忆。
     """
     from engine.llm_factory import create_llm
 
     # 构建条目文本
-    entries_text = "\n".join([
-        f"- [{e.id}] (重要性:{e.salience:.2f}, 访问:{e.access_count}次, 来源:{e.source}) {e.content}"
-        for e in cluster
-    ])
+    entries_text = _format_cluster_entries(cluster)
 
     cat_label = CATEGORY_LABELS.get(category, category)
 
@@ -299,11 +731,13 @@ async def _merge_cluster(
 """
 
     try:
+        if limiter is not None:
+            await limiter.acquire(_estimate_tokens(prompt))
         llm = create_llm(streaming=False)
         response = await llm.ainvoke(prompt)
         result = _extract_json(response.content)
 
-        data = json.loads(result)
+        data = orjson.loads(result)
         merged_content = data.get("content", "")
         merged_salience = data.get("salience", 0.5)
 
@@ -322,6 +756,16 @@ async def _merge_cluster(
         merged_content = best.content
         merged_salience = best.salience
 
+    return merged_content, merged_salience
+
+
+def _build_merged_entry(
+    cluster: list[MemoryEntry],
+    category: str,
+    merged_content: str,
+    merged_salience: float,
+) -> tuple[MemoryEntry, dict]:
+    """由合并结果构建新的 MemoryEntry 和合并详情"""
     # 创建新的 MemoryEntry
     new_entry = MemoryEntry(
         id=MemoryEntry.generate_id(),
@@ -345,31 +789,186 @@ async def _merge_cluster(
     return new_entry, merge_detail
 
 
-async def _batch_merge_clusters(
+async def _llm_merge_contents_batch(
+    group: list[tuple[str, list[MemoryEntry]]],
+    limiter: Optional[_TokenBucket] = None,
+) -> list[Optional[tuple[str, float]]]:
+    """一次 LLM 调用合并多个聚类，返回与 group 一一对应的 (内容, 重要性)
+
+    整体调用或解析失败、或某个聚类缺少有效结果时，对应位置为 None，由调用方单独回退。
+    """
+    from engine.llm_factory import create_llm
+
+    sections = "\n\n".join(
+        f"### 第 {k} 组（分类：{CATEGORY_LABELS.get(category, category)}）\n"
+        f"{_format_cluster_entries(cluster)}"
+        for k, (category, cluster) in enumerate(group, start=1)
+    )
+
+    prompt = f"""请分别合并以下 {len(group)} 组相似记忆，每组合并为一条精简的记忆。
+
+{sections}
+
+要求：
+1. 保留所有关键信息，去除冗余和重复
+2. 合并后的内容应简洁清晰，不要丢失重要细节
+3. 重新评估重要性（0.0-1.0），参考原始重要性和访问次数
+   - 访问次数多 → 重要性应该更高
+   - 多条记忆说同一件事 → 重要性应该更高
+4. 如果原始记忆互相矛盾，保留最新/最可靠的信息
+5. 各组独立合并，不要把不同组的内容混在一起
+
+返回 JSON 数组（不要包含其他内容），每组一个对象，group 为组序号：
+[{{"group": 1, "content": "合并后的内容", "salience": 0.7}}]
+"""
+
+    results: list[Optional[tuple[str, float]]] = [None] * len(group)
+    try:
+        if limiter is not None:
+            await limiter.acquire(_estimate_tokens(prompt))
+        llm = create_llm(streaming=False)
+        response = await llm.ainvoke(prompt)
+        data = orjson.loads(_extract_json(response.content))
+    except Exception as e:
+        logger.warning(f"批量合并 {len(group)} 组记忆失败，改为逐组合并: {e}")
+        return results
+
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            k = int(item.get("group", 0)) - 1
+            content = item.get("content", "")
+            salience = max(0.0, min(1.0, float(item.get("salience", 0.5))))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= k < len(group) and isinstance(content, str) and content.strip():
+            results[k] = (content, salience)
+    return results
+
+
+def _pack_merge_groups(clusters: list[tuple[str, list[MemoryEntry]]]) -> list[list[int]]:
+    """按估算 token 数将聚类依次打包成组，返回每组的聚类下标
+
+    单组不超过 MERGE_GROUP_MAX_CLUSTERS 个聚类、约 MERGE_GROUP_MAX_TOKENS 个 token；
+    超出预算的单个大聚类独占一组。
+    """
+    groups: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for idx, (_, cluster) in enumerate(clusters):
+        tokens = _estimate_tokens(_format_cluster_entries(cluster))
+        if current and (
+            len(current) >= MERGE_GROUP_MAX_CLUSTERS
+            or current_tokens + tokens > MERGE_GROUP_MAX_TOKENS
+        ):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(idx)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def _merge_cluster_group(
+    group: list[tuple[str, list[MemoryEntry]]],
+    limiter: Optional[_TokenBucket] = None,
+) -> list[tuple[MemoryEntry, dict]]:
+    """合并一组聚类，返回与 group 一一对应的 (合并后的记忆, 合并详情)
+
+    重复内容的聚类直接机械合并；其余聚类打包进同一个 prompt 只调用一次 LLM，
+    批量结果中缺失的聚类再依次单独调用 LLM 合并。
+    """
+    merged: list[Optional[tuple[str, float]]] = [
+        _trivial_merge_content(cluster) for _, cluster in group
+    ]
+
+    pending = [k for k, m in enumerate(merged) if m is None]
+    if len(pending) > 1:
+        batch = await _llm_merge_contents_batch([group[k] for k in pending], limiter)
+        for k, m in zip(pending, batch):
+            merged[k] = m
+        pending = [k for k in pending if merged[k] is None]
+
+    # 逐个回退：调用方每组只占一个并发名额，批量调用失败（如 429）时不应在名额内再放大并发
+    for k in pending:
+        merged[k] = await _llm_merge_content(group[k][1], group[k][0], limiter)
+
+    return [
+        _build_merged_entry(cluster, category, *m)
+        for (category, cluster), m in zip(group, merged)
+    ]
+
+
+async def _iter_merged_groups(
     clusters: list[tuple[str, list[MemoryEntry]]],
     max_concurrency: int = MAX_MERGE_CONCURRENCY,
-) -> tuple[list[MemoryEntry], list[dict]]:
-    """批量合并聚类（限制并发数）
+) -> AsyncIterator[list[tuple[int, MemoryEntry, dict]]]:
+    """并发合并聚类（限制并发数 + RPM/TPM 限流），按完成顺序逐组产出结果
+
+    多个小聚类打包进同一个 prompt，减少 LLM 往返次数；先完成的组先产出，慢请求不阻塞其余结果。
+    每组产出 [(聚类下标, 合并后的记忆, 合并详情)]。提前结束迭代（如客户端断开）时
+    取消尚未完成的合并任务，调用方应在 finally 中 aclose()。
 
     Args:
         clusters: [(category, [entries])] 需要合并的聚类列表
         max_concurrency: 最大并发数
-
-    Returns:
-        (合并后的记忆列表, 合并详情列表)
     """
     semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = _TokenBucket(MERGE_REQUESTS_PER_MINUTE, MERGE_TOKENS_PER_MINUTE)
 
-    async def _merge_one(category: str, cluster: list[MemoryEntry]) -> tuple[MemoryEntry, dict]:
+    async def _merge_group(indices: list[int]) -> list[tuple[int, MemoryEntry, dict]]:
         async with semaphore:
-            return await _merge_cluster(cluster, category)
+            merged = await _merge_cluster_group([clusters[i] for i in indices], limiter)
+        return [(idx, entry, detail) for idx, (entry, detail) in zip(indices, merged)]
+
+    tasks = [
+        asyncio.create_task(_merge_group(indices))
+        for indices in _pack_merge_groups(clusters)
+    ]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for task in tasks:
+            task.cancel()
 
-    tasks = [_merge_one(cat, cluster) for cat, cluster in clusters]
-    results = await asyncio.gather(*tasks)
 
-    entries = [r[0] for r in results]
-    details = [r[1] for r in results]
-    return entries, details
+def _snapshot_file(src: Path, dst: Path) -> None:
+    """为文件创建快照备份，优先使用零拷贝方式
+
+    memory.json 总是通过「写临时文件 + rename」整体替换，原 inode 不会被原地修改，
+    因此硬链接即可作为只读快照，备份耗时与文件大小无关。
+    调用方须保证随后立即用 os.replace 替换 src（如 _save_memory_json），
+    否则快照仍是 src 本身，src 被原地写入时快照也会随之改变。
+    依次尝试：硬链接 → reflink（Linux，写时复制）→ 普通复制。
+    """
+    # 先链接到临时名再 replace，保证 dst 始终是完整文件
+    tmp = dst.with_name(dst.name + ".tmp")
+    try:
+        tmp.unlink(missing_ok=True)
+        os.link(src, tmp)
+        os.replace(tmp, dst)
+        # dst 已是 src 的硬链接时 rename 不生效，需手动清理临时名
+        tmp.unlink(missing_ok=True)
+        return
+    except OSError as e:
+        logger.debug(f"硬链接备份失败，回退到复制: {e}")
+        tmp.unlink(missing_ok=True)
+
+    if sys.platform.startswith("linux"):
+        try:
+            result = subprocess.run(
+                ["cp", "--reflink=auto", str(src), str(dst)],
+                capture_output=True,
+            )
+            if result.returncode == 0:
+                return
+        except OSError:
+            pass
+
+    shutil.copy2(src, dst)
 
 
 async def compress_memories(force_text_similarity: bool = False) -> dict:
@@ -404,19 +1003,12 @@ async def compress_memories_stream(force_text_similarity: bool = False):
     from memory.manager import memory_manager
     from memory.search import invalidate_memory_index
 
-    # 1. 备份（关键：防止数据丢失）
-    yield {"type": "progress", "message": "正在备份记忆数据...", "step": "backup"}
-
-    backup_path = memory_manager.memory_file.with_suffix(".json.pre-compress")
-    if memory_manager.memory_file.exists():
-        shutil.copy2(memory_manager.memory_file, backup_path)
-        logger.info(f"已备份 memory.json 到 {backup_path}")
-
-    # 2. 加载所有记忆
+    # 1. 加载所有记忆（备份在确定需要写入时、替换文件之前进行）
     yield {"type": "progress", "message": "正在加载记忆...", "step": "load"}
 
     data = memory_manager._load_memory_json()
-    memories = [MemoryEntry.from_dict(m) for m in data.get("memories", [])]
+    raw_memories = data.get("memories", [])
+    memories = [MemoryEntry.from_dict(m) for m in raw_memories]
 
     if len(memories) < 2:
         yield {
@@ -436,17 +1028,17 @@ async def compress_memories_stream(force_text_similarity: bool = False):
 
     yield {"type": "progress", "message": f"已加载 {len(memories)} 条记忆", "step": "load"}
 
-    # 3. 按分类分组
+    # 2. 按分类分组
     by_category: dict[str, list[MemoryEntry]] = {}
     for m in memories:
         by_category.setdefault(m.category, []).append(m)
 
     # 调试日志：显示每个分类的记忆数量和 ID
-    for cat, entries in by_category.items():
-        ids = [e.id for e in entries]
-        logger.info(f"分类 [{cat}]: {len(entries)} 条记忆, IDs: {ids}")
+    if logger.isEnabledFor(logging.DEBUG):
+        for cat, entries in by_category.items():
+            logger.debug("分类 [%s]: %d 条记忆, IDs: %s", cat, len(entries), [e.id for e in entries])
 
-    # 4. 对每个分类进行聚类 + 合并
+    # 3. 对每个分类进行聚类 + 合并
     new_memories: list[MemoryEntry] = []
     stats = {
         "before": len(memories),
@@ -462,9 +1054,12 @@ async def compress_memories_stream(force_text_similarity: bool = False):
     categories_to_process = [cat for cat in VALID_CATEGORIES if by_category.get(cat)]
     total_categories = len(categories_to_process)
 
+    # 分类显示名只查一次，供后续进度事件复用
+    cat_labels = {cat: CATEGORY_LABELS.get(cat, cat) for cat in VALID_CATEGORIES}
+
     for cat_idx, category in enumerate(categories_to_process):
         cat_entries = by_category.get(category, [])
-        cat_label = CATEGORY_LABELS.get(category, category)
+        cat_label = cat_labels[category]
 
         if len(cat_entries) == 1:
             # 单条记忆，直接保留
@@ -522,7 +1117,7 @@ async def compress_memories_stream(force_text_similarity: bool = False):
             "step": "cluster",
         }
 
-    # 5. 批量 LLM 合并
+    # 4. 批量 LLM 合并
     merge_details: list[dict] = []
     if clusters_to_merge:
         yield {
@@ -534,33 +1129,66 @@ async def compress_memories_stream(force_text_similarity: bool = False):
 
         logger.info(f"正在合并 {len(clusters_to_merge)} 个聚类...")
 
-        # 逐个合并并推送进度
-        for idx, (category, cluster) in enumerate(clusters_to_merge):
-            cat_label = CATEGORY_LABELS.get(category, category)
-            preview = cluster[0].content[:30] + "..." if len(cluster[0].content) > 30 else cluster[0].content
-
-            yield {
-                "type": "progress",
-                "message": f"正在合并第 {idx + 1}/{len(clusters_to_merge)} 组: {preview}",
-                "step": "merge",
-                "detail": {"current": idx + 1, "total": len(clusters_to_merge), "category": cat_label},
-            }
-
-            merged_entry, detail = await _merge_cluster(cluster, category)
+        # 多个小聚类打包进同一个 prompt 并发合并，每完成一批即推送其中各组的进度
+        merged_results: list[tuple[int, MemoryEntry, dict]] = []
+        merge_iter = _iter_merged_groups(clusters_to_merge)
+        try:
+            async for group_results in merge_iter:
+                for idx, merged_entry, detail in group_results:
+                    merged_results.append((idx, merged_entry, detail))
+                    done_count = len(merged_results)
+
+                    category, cluster = clusters_to_merge[idx]
+                    cat_label = cat_labels[category]
+                    preview = cluster[0].content[:30] + "..." if len(cluster[0].content) > 30 else cluster[0].content
+
+                    yield {
+                        "type": "progress",
+                        "message": f"已合并 {done_count}/{len(clusters_to_merge)} 组: {preview}",
+                        "step": "merge",
+                        "detail": {"current": done_count, "total": len(clusters_to_merge), "category": cat_label},
+                    }
+        finally:
+            # 客户端断开等情况下取消尚未完成的合并任务
+            await merge_iter.aclose()
+
+        # 按原始聚类顺序输出，保证结果稳定
+        merged_results.sort(key=lambda r: r[0])
+        for _, merged_entry, detail in merged_results:
             new_memories.append(merged_entry)
             merge_details.append(detail)
 
-    # 6. 原子写入
-    yield {"type": "progress", "message": "正在保存记忆...", "step": "save"}
-
-    with memory_manager._lock:
-        data["memories"] = [m.to_dict() for m in new_memories]
-        data["last_updated"] = datetime.now().isoformat()
-        memory_manager._save_memory_json(data)
-
-    # 7. 关键：清除向量索引，下次搜索时重建
-    invalidate_memory_index()
-    logger.info("已清除向量索引，下次搜索时将重建")
+    if clusters_to_merge:
+        # 5. 备份（关键：防止数据丢失）+ 原子写入（_save_memory_json 内部为 写临时文件 → fsync → os.replace）
+        yield {"type": "progress", "message": "正在备份记忆数据...", "step": "backup"}
+        backup_path = memory_manager.memory_file.with_suffix(".json.pre-compress")
+        yield {"type": "progress", "message": "正在保存记忆...", "step": "save"}
+
+        # 未被合并的记忆直接复用加载时的原始字典，只有新生成的合并条目需要 to_dict
+        raw_by_id = {m["id"]: m for m in raw_memories if "id" in m}
+        data["memories"] = [raw_by_id.get(m.id) or m.to_dict() for m in new_memories]
+
+        # 序列化在锁外完成，锁内只做备份和落盘，缩短其他读写方的等待时间
+        content = await asyncio.to_thread(memory_manager._serialize_memory_json, data)
+
+        def _save_locked() -> None:
+            with memory_manager._lock:
+                # 快照紧挨着替换：硬链接快照要求 memory.json 随后被 os.replace 整体替换，
+                # 否则快照与原文件共享 inode，之后的原地写入会连同“备份”一起改掉
+                if memory_manager.memory_file.exists():
+                    _snapshot_file(memory_manager.memory_file, backup_path)
+                    logger.info(f"已备份 memory.json 到 {backup_path}")
+                memory_manager._save_memory_json(data, content)
+
+        # 落盘放到线程中执行，避免大文件写入阻塞事件循环
+        await asyncio.to_thread(_save_locked)
+
+        # 6. 关键：清除向量索引，下次搜索时重建
+        invalidate_memory_index()
+        logger.info("已清除向量索引，下次搜索时将重建")
+    else:
+        # 没有任何记忆被合并，内容未变化，无需重写文件和重建索引
+        logger.info("没有需要合并的记忆，跳过写入")
 
     stats["after"] = len(new_memories)
     stats["status"] = "ok"
@@ -5,9 +5,12 @@
 2. 与已有记忆比对
 3. 决策：ADD（新增）/ UPDATE（更新）/ DELETE（删除）/ NOOP（无操作）
 """
+import asyncio
 import logging
 from typing import Optional, Literal
 
+import orjson
+
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -15,6 +18,35 @@ logger = logging.getLogger(__name__)
 # 决策类型
 DecisionType = Literal["ADD", "UPDATE", "DELETE", "NOOP"]
 
+# 批量整合时检索阶段的最大并发数（检索不占用 LLM 配额，可以比 LLM 阶段更高）
+MAX_SEARCH_CONCURRENCY = 8
+
+
+async def _prepare_decision(
+    candidate_content: str,
+    candidate_category: str,
+    similarity_threshold: float = 0.7,
+) -> list[dict]:
+    """决策阶段一：检索同分类的相似记忆
+
+    Returns:
+        相似度达到阈值的已有记忆（为空表示直接 ADD，无需调用 LLM）
+    """
+    from memory.search import search_memories
+
+    # 搜索相似记忆（同步的向量检索放到线程中，避免阻塞事件循环）
+    similar = await asyncio.to_thread(
+        search_memories,
+        query=candidate_content,
+        top_k=5,
+        use_decay=False,  # 不使用衰减，找最相似的
+        category=candidate_category,
+        mode="vector",  # 阈值按相似度设定，不能用 RRF 融合得分
+    )
+
+    # 过滤低相似度结果
+    return [s for s in similar if s.get("score", 0) >= similarity_threshold]
+
 
 async def decide_consolidation(
     candidate_content: str,
@@ -36,27 +68,26 @@ async def decide_consolidation(
         - target_id: 目标记忆 ID（UPDATE/DELETE 时使用）
         - merged_content: 合并后的内容（UPDATE 时使用）
     """
-    from memory.manager import memory_manager
-    from memory.search import search_memories
-
-    # 搜索相似记忆
-    similar = search_memories(
-        query=candidate_content,
-        top_k=5,
-        use_decay=False,  # 不使用衰减，找最相似的
-        category=candidate_category,
+    high_similar = await _prepare_decision(
+        candidate_content, candidate_category, similarity_threshold
     )
 
     # 没有相似记忆，直接 ADD
-    if not similar:
-        return ("ADD", None, None)
-
-    # 过滤低相似度结果
-    high_similar = [s for s in similar if s.get("score", 0) >= similarity_threshold]
     if not high_similar:
         return ("ADD", None, None)
 
-    # 使用 LLM 决策
+    return await _run_decision_llm(
+        candidate_content, candidate_category, candidate_salience, high_similar
+    )
+
+
+async def _run_decision_llm(
+    candidate_content: str,
+    candidate_category: str,
+    candidate_salience: float,
+    high_similar: list[dict],
+) -> tuple[DecisionType, Optional[str], Optional[str]]:
+    """决策阶段二：让 LLM 基于相似记忆给出 ADD/UPDATE/DELETE/NOOP"""
     try:
         from engine.llm_factory import create_llm
         llm = create_llm(streaming=False)
@@ -91,13 +122,12 @@ async def decide_consolidation(
         result = response.content.strip()
 
         # 解析响应
-        import json
         try:
             # 从可能的 markdown 代码块中提取 JSON
             from memory.session_reflector import _extract_json
             result = _extract_json(result)
 
-            data = json.loads(result)
+            data = orjson.loads(result)
             decision = data.get("decision", "NOOP").upper()
             target_id = data.get("target_id")
             merged_content = data.get("merged_content")
@@ -107,7 +137,7 @@ async def decide_consolidation(
 
             return (decision, target_id, merged_content)
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             # 尝试简单解析
             if "ADD" in result.upper():
                 return ("ADD", None, None)
@@ -140,13 +170,29 @@ async def consolidate_memory(
     Returns:
         操作结果 {decision, entry}
     """
-    from memory.manager import memory_manager
-
-    decision, target_id, merged_content = await decide_consolidation(
+    decision = await decide_consolidation(
         candidate_content=content,
         candidate_category=category,
         candidate_salience=salience,
     )
+    # 写入会获取 memory_manager._lock 并落盘，放到线程中执行
+    return await asyncio.to_thread(
+        _apply_decision, decision, content, category, salience, source, context
+    )
+
+
+def _apply_decision(
+    decision_result: tuple[DecisionType, Optional[str], Optional[str]],
+    content: str,
+    category: str,
+    salience: float,
+    source: str,
+    context: Optional[dict],
+) -> dict:
+    """按整合决策写入记忆，返回操作结果 {decision, entry}"""
+    from memory.manager import memory_manager
+
+    decision, target_id, merged_content = decision_result
 
     if decision == "ADD":
         # skip_dedup=True: LLM 已做过 ADD 决策，跳过 Jaccard 重复检测避免矛盾
@@ -207,28 +253,50 @@ async def batch_consolidate(
     candidates: list[dict],
     max_concurrency: int = 3,
 ) -> list[dict]:
-    """批量整合记忆（并行执行，限制并发数）
+    """批量整合记忆（两阶段流水线，分别限制并发数）
+
+    阶段一并发检索所有候选的相似记忆，阶段二再对需要 LLM 判断的候选并发决策，
+    检索与 LLM 各用独立的信号量，避免检索等待占用 LLM 并发名额。
 
     Args:
         candidates: 候选记忆列表，每项包含 {content, category, salience, source, context}
-        max_concurrency: 最大并发数（避免 LLM API 过载）
+        max_concurrency: LLM 决策的最大并发数（避免 LLM API 过载）
 
     Returns:
         操作结果列表
     """
-    import asyncio
-
-    semaphore = asyncio.Semaphore(max_concurrency)
-
-    async def _consolidate_one(candidate: dict) -> dict:
-        async with semaphore:
-            return await consolidate_memory(
-                content=candidate.get("content", ""),
-                category=candidate.get("category", "general"),
-                salience=candidate.get("salience", 0.5),
-                source=candidate.get("source", "batch"),
-                context=candidate.get("context"),
+    search_semaphore = asyncio.Semaphore(MAX_SEARCH_CONCURRENCY)
+    llm_semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _prepare_one(candidate: dict) -> list[dict]:
+        async with search_semaphore:
+            return await _prepare_decision(
+                candidate.get("content", ""),
+                candidate.get("category", "general"),
             )
 
-    tasks = [_consolidate_one(c) for c in candidates]
-    return list(await asyncio.gather(*tasks))
+    async def _finish_one(candidate: dict, high_similar: list[dict]) -> dict:
+        content = candidate.get("content", "")
+        category = candidate.get("category", "general")
+        salience = candidate.get("salience", 0.5)
+
+        if not high_similar:
+            decision = ("ADD", None, None)
+        else:
+            async with llm_semaphore:
+                decision = await _run_decision_llm(content, category, salience, high_similar)
+
+        return await asyncio.to_thread(
+            _apply_decision,
+            decision,
+            content,
+            category,
+            salience,
+            candidate.get("source", "batch"),
+            candidate.get("context"),
+        )
+
+    prepared = await asyncio.gather(*(_prepare_one(c) for c in candidates))
+    return list(await asyncio.gather(*(
+        _finish_one(c, high_similar) for c, high_similar in zip(candidates, prepared)
+    )))
@@ -9,14 +9,31 @@
 - 支持 procedural 分类（程序性记忆）
 - 每日日志使用 JSON 格式
 """
-import json
+import asyncio
+import atexit
+import copy
 import logging
+import os
 import re
-import shutil
 import threading
+from collections import Counter
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
+
+import orjson
+
+try:
+    import ijson
+except ImportError:
+    # ijson 为可选依赖，缺失时整体解析 memory.json
+    ijson = None
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy 随 llama-index 间接安装，缺失时去重退回逐条精确 Jaccard
+    np = None
 
 from config import settings
 from memory.models import (
@@ -25,11 +42,96 @@ from memory.models import (
     DailyLog,
     DailyLogEntry,
     VALID_CATEGORIES,
+    VALID_CATEGORIES_SET,
     CATEGORY_LABELS,
 )
 
+# 保存后需要通知的缓存/索引，模块加载时导入一次，避免每次保存都走 import 机制
+# （memory.search 只在函数内反向导入 manager，不构成循环导入）
+try:
+    from cache import prompt_cache
+except Exception:
+    # cache 包导入时即初始化各级缓存，初始化失败不应影响记忆读写
+    prompt_cache = None
+
+try:
+    from memory.search import invalidate_memory_index, invalidate_search_results
+except ImportError:
+    invalidate_memory_index = None
+    invalidate_search_results = None
+
 logger = logging.getLogger(__name__)
 
+# read_memory 中高重要性条目的标记
+_IMPORTANT_MARK = "⭐"
+
+# 每日日志文件名（YYYY-MM-DD）
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# MinHash 签名：128 个哈希函数 h_i(x) = (a_i * x + b_i) mod p，p 为梅森素数 2^31-1
+# a_i、x 均小于 2^31，乘积不超过 2^62，uint64 运算不会溢出
+MINHASH_NUM_PERM = 128
+_MINHASH_PRIME = (1 << 31) - 1
+# 签名估计值的标准差约 sqrt(J(1-J)/128) ≈ 0.04，预筛阈值放宽 0.15 后再用精确 Jaccard 校验
+_MINHASH_PREFILTER_MARGIN = 0.15
+
+if np is not None:
+    _minhash_rng = np.random.default_rng(0x5EED)
+    _MINHASH_A = _minhash_rng.integers(1, _MINHASH_PRIME, size=(MINHASH_NUM_PERM, 1), dtype=np.uint64)
+    _MINHASH_B = _minhash_rng.integers(0, _MINHASH_PRIME, size=(MINHASH_NUM_PERM, 1), dtype=np.uint64)
+
+
+def _dumps(data) -> bytes:
+    """序列化为 2 空格缩进的 UTF-8 JSON（orjson，输出与 json.dumps(indent=2, ensure_ascii=False) 等价）"""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+
+def _preserve_backup(path: Path, backup: Path) -> None:
+    """把 path 当前的内容保留为 backup，不复制文件字节
+
+    优先用硬链接指向旧文件（随后 os.replace 换上新文件，备份仍指向旧 inode），
+    整个过程中 path 始终存在；文件系统不支持硬链接时退回 os.replace 轮换。
+    """
+    link_tmp = backup.with_name(backup.name + ".tmp")
+    try:
+        link_tmp.unlink(missing_ok=True)
+        os.link(path, link_tmp)
+        os.replace(link_tmp, backup)
+    except FileNotFoundError:
+        # 首次写入，没有旧文件可备份
+        return
+    except OSError:
+        try:
+            os.replace(path, backup)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("创建备份失败: %s", e)
+
+
+def _atomic_write_bytes(path: Path, data: bytes, backup: Optional[Path] = None) -> None:
+    """原子写入文件：写临时文件 → fsync → os.replace
+
+    进程崩溃或断电时目标文件要么是旧内容，要么是完整的新内容，不会出现半截文件。
+    指定 backup 时，在替换前将旧文件保留为备份（见 _preserve_backup）。
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if backup is not None:
+            _preserve_backup(path, backup)
+        os.replace(tmp_path, path)
+    except Exception:
+        # 清理临时文件
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
 
 def _tokenize_for_similarity(text: str) -> set[str]:
     """对文本进行分词，支持中英文混合。
@@ -65,21 +167,31 @@ def _tokenize_for_similarity(text: str) -> set[str]:
     return tokens
 
 
-def _jaccard_similarity(text_a: str, text_b: str) -> float:
-    """计算两段文本的 Jaccard 相似度（基于分词的集合交并比）
+def _jaccard_from_sets(words_a: frozenset[str], words_b: frozenset[str]) -> float:
+    """计算两个分词集合的 Jaccard 相似度（集合交并比）
 
     用于轻量级重复检测，无需 LLM 调用。
-    支持中文：中文使用字符级分词，确保相似度计算有效。
+    分词结果由调用方预先计算并复用，避免同一文本在循环比较中被反复分词。
     """
-    words_a = _tokenize_for_similarity(text_a)
-    words_b = _tokenize_for_similarity(text_b)
     if not words_a or not words_b:
         return 0.0
     intersection = len(words_a & words_b)
-    union = len(words_a | words_b)
+    union = len(words_a) + len(words_b) - intersection
     return intersection / union if union > 0 else 0.0
 
 
+def _minhash_signature(tokens: frozenset[str]) -> Optional["np.ndarray"]:
+    """计算分词集合的 MinHash 签名（需要 numpy），空集合返回 None
+
+    两个签名逐位相等的比例即 Jaccard 相似度的无偏估计。
+    token 哈希使用内置 hash()，仅在进程内稳定，因此签名只做内存缓存、不写入 memory.json。
+    """
+    if np is None or not tokens:
+        return None
+    x = np.fromiter((hash(t) % _MINHASH_PRIME for t in tokens), dtype=np.uint64, count=len(tokens))
+    return ((_MINHASH_A * x + _MINHASH_B) % _MINHASH_PRIME).min(axis=1).astype(np.uint32)
+
+
 class MemoryManager:
     """记忆管理核心类"""
 
@@ -90,15 +202,54 @@ class MemoryManager:
     PROMPT_MAX_ENTRIES_PER_CATEGORY = 20
     PROMPT_MAX_TOTAL_ENTRIES = 50
 
+    # 事件日志超过该大小后折叠进 memory.json 并清空
+    EVENTS_COMPACT_BYTES = 256 * 1024
+
+    # 每日日志写缓冲：同一天累计满 N 条或距首条缓冲超过 T 秒时批量落盘
+    DAILY_LOG_FLUSH_ENTRIES = 20
+    DAILY_LOG_FLUSH_INTERVAL = 2.0
+
     def __init__(self):
         self.memory_dir = settings.memory_dir
         self.logs_dir = settings.memory_dir / "logs"
         self.memory_file = settings.memory_dir / "memory.json"
         self.backup_file = settings.memory_dir / "memory.json.bak"
+        # 追加式事件日志：访问计数这类高频小改动只追加一行，不重写整个 memory.json
+        self.events_file = settings.memory_dir / "memory.events.jsonl"
 
         # 并发写保护锁（read-modify-write 操作需持有此锁）
         self._lock = threading.Lock()
 
+        # memory.json 缓存：((st_mtime_ns, st_size), 已折叠的事件日志字节数, 折叠后的 JSON 字节, 只读视图)
+        # 命中时从字节重新解析得到调用方私有的副本（orjson 解析比深拷贝快数倍）；
+        # 只读视图供 _peek_memory_json 等只读路径使用，首次访问时才解析（None 表示尚未解析）。
+        # 键与数据放在同一个元组里整体替换，无锁读取时不会读到不匹配的组合
+        self._mem_cache: Optional[tuple[tuple[int, int], int, bytes, Optional[dict]]] = None
+        # entry_id → memories 列表下标，随解析/保存重建；事件日志只改字段不改顺序，折叠时沿用
+        self._id_index: dict[str, int] = {}
+
+        # 去重用分词缓存：entry_id → (content, tokens, minhash)，仅在持有 _lock 时读写
+        # 内容不一致即视为失效，外部改写 memory.json（如压缩）也不会命中过期结果
+        self._token_cache: dict[str, tuple[str, frozenset[str], Optional["np.ndarray"]]] = {}
+        # 堆叠好的签名矩阵：(条目 ID 序列, 有签名的行号, (N, 128) 矩阵)，条目不变时直接复用
+        self._minhash_matrix: Optional[tuple[list[str], list[int], "np.ndarray"]] = None
+
+        # read_memory 用的列式数据：(来源 data 对象, contents, salience, category 下标)
+        # 来源对象即 _mem_cache 中的缓存字典，缓存被替换后自动重建
+        self._prompt_columns: Optional[tuple[dict, list[str], "np.ndarray", "np.ndarray"]] = None
+
+        # 每日日志写缓冲：day → 待写入条目；锁顺序固定为 _lock → _daily_buffer_lock
+        self._daily_buffer: dict[str, list[DailyLogEntry]] = {}
+        self._daily_buffer_lock = threading.Lock()
+        self._daily_flush_timer: Optional[threading.Timer] = None
+        # 进程正常退出时写出缓冲中的日志
+        atexit.register(self._flush_daily_buffer)
+
+        # list_daily_logs 结果缓存，键为 logs 目录的 st_mtime_ns（新增/删除文件时变化）；
+        # 原地改写日志只改变文件大小、不改变目录 mtime，由本类的写入路径显式置空
+        self._logs_index_cache: list[dict] = []
+        self._logs_index_key: Optional[int] = None
+
         # 确保目录存在
         self.memory_dir.mkdir(parents=True, exist_ok=True)
         self.logs_dir.mkdir(parents=True, exist_ok=True)
@@ -112,83 +263,270 @@ class MemoryManager:
         """加载 memory.json
 
         安全增强：主文件解析失败时自动尝试从备份恢复，避免数据丢失。
+        文件未变化（mtime_ns + size 相同）时从缓存的字节重新解析，跳过读盘；
+        每次返回的都是新对象，调用方可以任意修改返回值而不影响缓存。
+        返回前会折叠 memory.events.jsonl 中的增量；仅事件日志增长时只读取新增部分。
+        事件记录了追加时 memory.json 的 (mtime_ns, size)，文件被外部改写（如编辑器保存）后
+        旧事件不再回放，避免覆盖外部修改。
         """
-        default_data = {
-            "version": 2,
-            "last_updated": datetime.now().isoformat(),
-            "rolling_summary": "",
-            "memories": [],
-        }
-
-        if not self.memory_file.exists():
-            return default_data
+        try:
+            st = self.memory_file.stat()
+        except FileNotFoundError:
+            self._mem_cache = None
+            return self._default_memory_data()
+
+        cache_key = (st.st_mtime_ns, st.st_size)
+        events_size = self._events_size()
+        cached = self._mem_cache
+        if cached is not None and cached[0] == cache_key and cached[1] <= events_size:
+            data = orjson.loads(cached[2])
+            if cached[1] == events_size:
+                return data
+            # memory.json 未变、只有事件日志增长：在缓存副本上应用新增事件即可
+            self._apply_events(data, cached[1], events_size, cache_key)
+            self._mem_cache = (cache_key, events_size, orjson.dumps(data), None)
+            return data
 
         try:
-            return json.loads(self.memory_file.read_text(encoding="utf-8"))
-        except json.JSONDecodeError as e:
-            logger.error(f"memory.json 解析失败: {e}")
+            raw = self.memory_file.read_bytes()
+            data = orjson.loads(raw)
+            self._rebuild_id_index(data.get("memories", []))
+            if events_size:
+                self._apply_events(data, 0, events_size, cache_key)
+                raw = orjson.dumps(data)
+            self._mem_cache = (cache_key, events_size, raw, None)
+            return data
+        except orjson.JSONDecodeError as e:
+            logger.error("memory.json 解析失败: %s", e)
 
             # 尝试从备份恢复
             if self.backup_file.exists():
                 logger.info("尝试从 memory.json.bak 恢复...")
                 try:
-                    backup_data = json.loads(self.backup_file.read_text(encoding="utf-8"))
+                    backup_data = orjson.loads(self.backup_file.read_bytes())
                     # 恢复成功，将备份内容写回主文件
-                    self.memory_file.write_text(
-                        json.dumps(backup_data, ensure_ascii=False, indent=2),
-                        encoding="utf-8"
-                    )
+                    _atomic_write_bytes(self.memory_file, _dumps(backup_data))
                     logger.info("已从备份成功恢复 memory.json")
+                    # 事件基于已损坏的主文件，不再回放到备份数据上
                     return backup_data
                 except Exception as backup_err:
-                    logger.error(f"备份文件也无法解析: {backup_err}")
+                    logger.error("备份文件也无法解析: %s", backup_err)
 
-            return default_data
+            return self._default_memory_data()
 
-    def _save_memory_json(self, data: dict) -> None:
-        """保存 memory.json（带自动备份）
+    @staticmethod
+    def _default_memory_data() -> dict:
+        """空的 memory.json 结构（仅在文件缺失或损坏时构造，避免每次加载都取当前时间）"""
+        return {
+            "version": 2,
+            "last_updated": datetime.now().isoformat(),
+            "rolling_summary": "",
+            "memories": [],
+        }
 
-        安全增强：使用原子写入模式，先写临时文件再 rename，防止进程崩溃导致数据损坏。
+    def _valid_mem_cache(self) -> Optional[dict]:
+        """memory.json 与事件日志均未变化时返回缓存数据（只读，调用方不得修改），否则返回 None"""
+        cached = self._mem_cache
+        if cached is None:
+            return None
+        try:
+            st = self.memory_file.stat()
+        except FileNotFoundError:
+            return None
+        if cached[0] != (st.st_mtime_ns, st.st_size) or cached[1] != self._events_size():
+            return None
+        view = cached[3]
+        if view is None:
+            view = orjson.loads(cached[2])
+            self._mem_cache = (*cached[:3], view)
+        return view
+
+    def _peek_memory_json(self) -> dict:
+        """返回 memory.json 数据的只读视图，缓存有效时不做深拷贝
+
+        供只读统计/格式化使用，调用方不得修改返回值。
         """
-        import os
-        import tempfile
+        data = self._valid_mem_cache()
+        if data is None:
+            loaded = self._load_memory_json()
+            data = self._valid_mem_cache() or loaded
+        return data
 
-        # 更新时间戳
-        data["last_updated"] = datetime.now().isoformat()
+    def _load_field(self, field: str, predicate: Optional[Callable[[dict], bool]] = None):
+        """只读取 memory.json 中的单个字段，供只读接口使用
 
-        # 创建备份（在写入新数据之前）
-        if self.memory_file.exists():
+        field 为顶层键（如 "rolling_summary"、"version"）时返回其值，不存在返回 None；
+        为 "memories.item" 时返回满足 predicate 的条目字典列表。
+
+        缓存有效时直接取缓存；否则安装了 ijson 时流式解析，只构造需要的对象，
+        大文件下峰值内存与解析量随实际取用部分缩减；其余情况回退为 _load_memory_json。
+        事件日志中的增量可能改变条目字段，存在未折叠事件时条目查询也回退为整体加载。
+        """
+        is_items = field == "memories.item"
+        data = self._valid_mem_cache()
+        owned = False
+        if data is None and (
+            ijson is None
+            or not self.memory_file.exists()
+            or (is_items and self._events_size() > 0)
+        ):
+            data = self._load_memory_json()
+            owned = True
+
+        if data is None:
             try:
-                shutil.copy2(self.memory_file, self.backup_file)
-            except Exception as e:
-                logger.warning(f"创建备份失败: {e}")
-
-        # 原子写入：先写临时文件，再 rename
-        content = json.dumps(data, ensure_ascii=False, indent=2)
-        fd, tmp_path = tempfile.mkstemp(
-            suffix=".tmp",
-            prefix="memory_",
-            dir=str(self.memory_dir)
-        )
+                with self.memory_file.open("rb") as f:
+                    if is_items:
+                        return [
+                            m for m in ijson.items(f, field, use_float=True)
+                            if predicate is None or predicate(m)
+                        ]
+                    for value in ijson.items(f, field, use_float=True):
+                        return value
+                    return None
+            except ijson.JSONError as e:
+                # 文件损坏：走整体加载（含备份恢复逻辑）
+                logger.warning("流式解析 memory.json 失败，回退整体加载: %s", e)
+                data = self._load_memory_json()
+                owned = True
+
+        if is_items:
+            items = [m for m in data.get("memories", []) if predicate is None or predicate(m)]
+            return items if owned else copy.deepcopy(items)
+        value = data.get(field)
+        return value if owned else copy.deepcopy(value)
+
+    def _events_size(self) -> int:
+        """事件日志当前大小（字节），不存在时为 0"""
         try:
-            with os.fdopen(fd, "w", encoding="utf-8") as f:
-                f.write(content)
+            return self.events_file.stat().st_size
+        except FileNotFoundError:
+            return 0
 
-            # Windows 兼容：如果目标存在，先删除再重命名
-            if os.name == "nt" and self.memory_file.exists():
-                self.memory_file.unlink()
-            os.rename(tmp_path, self.memory_file)
-        except Exception:
-            # 清理临时文件
+    def _apply_events(self, data: dict, start: int, end: int, base: tuple[int, int]) -> None:
+        """将事件日志 [start, end) 字节范围内的增量原地应用到 data
+
+        access 事件：access_count + 1，并刷新 last_accessed。
+        只回放基于当前 memory.json（base 为其 (mtime_ns, size)）追加的事件；
+        文件被外部改写后的旧事件、已删除或已合并条目的事件直接忽略。
+        """
+        if end <= start:
+            return
+        try:
+            with open(self.events_file, "rb") as f:
+                f.seek(start)
+                chunk = f.read(end - start)
+        except FileNotFoundError:
+            return
+
+        memories = data.get("memories", [])
+        for line in chunk.splitlines():
+            if not line.strip():
+                continue
             try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
-            raise
+                event = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                logger.warning("跳过无法解析的记忆事件: %r", line[:80])
+                continue
+            if tuple(event.get("base") or ()) != base:
+                continue
+            idx = self._find_entry(memories, event.get("id"))
+            if idx is None:
+                continue
+            m = memories[idx]
+            m["access_count"] = m.get("access_count", 1) + 1
+            if event.get("ts"):
+                m["last_accessed"] = event["ts"]
+
+    def _rebuild_id_index(self, memories: list[dict]) -> None:
+        """重建 entry_id → 下标映射（整体替换，无锁读取方不会看到半成品）"""
+        self._id_index = {m.get("id"): i for i, m in enumerate(memories)}
+
+    def _find_entry(self, memories: list[dict], entry_id: str) -> Optional[int]:
+        """按 ID 查找条目在 memories 中的下标，O(1)
+
+        memories 应与缓存同序（来自 _load_memory_json）。命中后校验 ID，
+        映射与列表不一致（如刚被外部改写）时退回线性查找，结果始终正确。
+        """
+        index = self._id_index
+        idx = index.get(entry_id)
+        if idx is not None and idx < len(memories) and memories[idx].get("id") == entry_id:
+            return idx
+        if idx is None and len(index) == len(memories):
+            # 映射与列表规模一致且不含该 ID：条目不存在
+            return None
+        for i, m in enumerate(memories):
+            if m.get("id") == entry_id:
+                return i
+        return None
+
+    def _append_event(self, event: dict) -> int:
+        """向事件日志追加一行（O_APPEND 单次写入），返回追加后的日志大小
+
+        事件中记录当前 memory.json 的 (mtime_ns, size)，读取时只回放与文件匹配的事件。
+        需在持有 _lock 时调用，避免与折叠/清空日志交错。
+        """
+        try:
+            st = self.memory_file.stat()
+            event["base"] = [st.st_mtime_ns, st.st_size]
+        except FileNotFoundError:
+            event["base"] = None
+        line = orjson.dumps(event) + b"\n"
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        fd = os.open(self.events_file, flags, 0o644)
+        try:
+            os.write(fd, line)
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+    def _serialize_memory_json(self, data: dict) -> bytes:
+        """更新时间戳并序列化 memory.json 内容
+
+        不涉及文件 IO，可在持有 _lock 之前调用，缩短锁的持有时间。
+        """
+        data["last_updated"] = datetime.now().isoformat()
+        return _dumps(data)
 
-        # 记忆变更后使 prompt 缓存失效，避免下次对话使用过时的记忆数据
+    def _save_memory_json(self, data: dict, content: Optional[bytes] = None) -> None:
+        """保存 memory.json（带自动备份）
+
+        安全增强：使用原子写入模式，先写临时文件并 fsync 再 os.replace，
+        防止进程崩溃或断电导致数据损坏；被替换的旧文件保留为 memory.json.bak。
+
+        Args:
+            data: memory.json 数据
+            content: 已由 _serialize_memory_json 序列化的内容，传入时跳过序列化
+        """
+        if content is None:
+            content = self._serialize_memory_json(data)
+
+        # 原子写入：先写临时文件并 fsync，再 os.replace（Windows 上同样可覆盖已有文件）
+        # 旧文件以硬链接/rename 保留为 .bak，不再整文件复制
+        _atomic_write_bytes(self.memory_file, content, backup=self.backup_file)
+
+        # data 由 _load_memory_json 得到，已包含折叠后的全部事件，写入后清空事件日志
+        # （两步之间崩溃时事件会被重放一次：字段更新幂等，仅 access_count 可能多计）
+        try:
+            os.unlink(self.events_file)
+        except FileNotFoundError:
+            pass
+
+        # 直接用刚写入的字节刷新缓存和 ID 映射，下次读取无需重新读盘
+        try:
+            st = self.memory_file.stat()
+            self._mem_cache = ((st.st_mtime_ns, st.st_size), 0, content, None)
+        except OSError:
+            self._mem_cache = None
+        self._rebuild_id_index(data.get("memories", []))
+
+        self._invalidate_prompt_cache()
+
+    def _invalidate_prompt_cache(self) -> None:
+        """记忆变更后使 prompt 缓存失效，避免下次对话使用过时的记忆数据"""
+        if prompt_cache is None:
+            return
         try:
-            from cache import prompt_cache
             prompt_cache.clear()
         except Exception:
             pass
@@ -201,52 +539,77 @@ class MemoryManager:
         - 按分类组织的记忆条目
         - 重要性标记
         """
-        data = self._load_memory_json()
-        memories = [MemoryEntry.from_dict(m) for m in data.get("memories", [])]
+        data = self._peek_memory_json()
+        memories = data.get("memories", [])
 
         if not memories:
             return ""
 
-        parts = []
+        return "\n\n".join(self._iter_memory_blocks(data, memories))
 
+    def _iter_memory_blocks(self, data: dict, memories: list[dict]) -> Iterator[str]:
+        """逐块生成 read_memory 的内容：概要块 + 每个分类一块（标题与条目一次拼接）"""
         # Rolling Summary
         summary = data.get("rolling_summary", "")
         if summary:
-            parts.append(f"## 概要\n{summary}")
-
-        # 按分类组织
-        by_category: dict[str, list[MemoryEntry]] = {}
-        for m in memories:
-            by_category.setdefault(m.category, []).append(m)
+            yield f"## 概要\n{summary}"
 
-        # 按重要性排序，限制条目数量避免 Prompt 过长
+        # 每个分类按 salience 降序取前 N 条（稳定排序，同分保持原顺序），总量不超过上限
         total_count = 0
-        for cat in VALID_CATEGORIES:
-            cat_entries = by_category.get(cat, [])
-            if not cat_entries:
-                continue
-
-            # 按 salience 降序排序，优先保留高重要性条目
-            cat_entries.sort(key=lambda x: x.salience, reverse=True)
-            cat_entries = cat_entries[:self.PROMPT_MAX_ENTRIES_PER_CATEGORY]
-
-            # 检查总量限制
+        for cat_idx, cat in enumerate(VALID_CATEGORIES):
             remaining = self.PROMPT_MAX_TOTAL_ENTRIES - total_count
             if remaining <= 0:
                 break
-            cat_entries = cat_entries[:remaining]
-            total_count += len(cat_entries)
-
-            label = CATEGORY_LABELS.get(cat, cat)
-            lines = [f"## {label}"]
-            for e in cat_entries:
-                # 显示重要性标记
-                importance = "⭐" if e.salience >= 0.8 else ""
-                lines.append(f"- {importance}{e.content}")
-
-            parts.append("\n".join(lines))
+            limit = min(self.PROMPT_MAX_ENTRIES_PER_CATEGORY, remaining)
+            top = self._top_entries(data, memories, cat_idx, limit)
+            if not top:
+                continue
+            total_count += len(top)
+
+            # 高重要性条目带 ⭐ 标记
+            yield "\n".join([
+                f"## {CATEGORY_LABELS.get(cat, cat)}",
+                *(
+                    f"- {_IMPORTANT_MARK if salience >= 0.8 else ''}{content}"
+                    for content, salience in top
+                ),
+            ])
+
+    def _top_entries(
+        self, data: dict, memories: list[dict], cat_idx: int, limit: int
+    ) -> list[tuple[str, float]]:
+        """取某分类 salience 最高的 limit 条，返回 [(content, salience)]
+
+        有 numpy 时使用列式数组（contents / salience / category 下标），
+        只为选中的条目取内容，不为全部记忆构造 MemoryEntry；列数据随缓存复用。
+        """
+        if np is None:
+            entries = [
+                m for m in memories
+                if m.get("category", "general") == VALID_CATEGORIES[cat_idx]
+            ]
+            entries.sort(key=lambda m: m.get("salience", 0.5), reverse=True)
+            return [(m.get("content", ""), m.get("salience", 0.5)) for m in entries[:limit]]
+
+        columns = self._prompt_columns
+        if columns is None or columns[0] is not data:
+            cat_lookup = {cat: i for i, cat in enumerate(VALID_CATEGORIES)}
+            columns = (
+                data,
+                [m.get("content", "") for m in memories],
+                np.fromiter((m.get("salience", 0.5) for m in memories), dtype=np.float64, count=len(memories)),
+                np.fromiter(
+                    (cat_lookup.get(m.get("category", "general"), -1) for m in memories),
+                    dtype=np.int8,
+                    count=len(memories),
+                ),
+            )
+            self._prompt_columns = columns
+        _, contents, salience, category = columns
 
-        return "\n\n".join(parts)
+        idxs = np.flatnonzero(category == cat_idx)
+        top = idxs[np.argsort(-salience[idxs], kind="stable")[:limit]]
+        return [(contents[i], float(salience[i])) for i in top]
 
     def get_entries(self, category: Optional[str] = None) -> list[dict]:
         """获取记忆条目列表（API 格式）
@@ -257,17 +620,83 @@ class MemoryManager:
         Returns:
             条目列表，每条包含 entry_id, content, category, timestamp, salience, access_count
         """
-        data = self._load_memory_json()
-        memories = [MemoryEntry.from_dict(m) for m in data.get("memories", [])]
-
+        predicate = None
         if category:
-            memories = [m for m in memories if m.category == category]
+            predicate = lambda m: m.get("category", "general") == category
+        memories = [MemoryEntry.from_dict(m) for m in self._load_field("memories.item", predicate)]
 
         # 按创建时间降序排序
         memories.sort(key=lambda x: x.created_at, reverse=True)
 
         return [m.to_api_dict() for m in memories]
 
+    def _find_duplicate(self, memories: list[dict], content_stripped: str) -> Optional[dict]:
+        """查找与新内容重复的已有记忆（精确匹配优先，其次 Jaccard 相似度）
+
+        新内容只分词一次；已有条目的分词结果和 MinHash 签名按 entry_id 缓存，跨多次 add_entry 复用。
+        有 numpy 时先用签名批量预筛候选，再对少量候选做精确 Jaccard，漏判概率可忽略。
+        需在持有 _lock 时调用。
+        """
+        # 精确匹配：一次构建 内容 → 条目 映射，O(1) 判断
+        by_content: dict[str, dict] = {}
+        for m in memories:
+            by_content.setdefault(m.get("content", "").strip(), m)
+        exact = by_content.get(content_stripped)
+        if exact is not None:
+            return exact
+
+        new_tokens = frozenset(_tokenize_for_similarity(content_stripped))
+        if not new_tokens:
+            return None
+        new_sig = _minhash_signature(new_tokens)
+
+        old_cache = self._token_cache
+        token_cache: dict[str, tuple[str, frozenset[str], Optional["np.ndarray"]]] = {}
+        rows: list[tuple[dict, frozenset[str], Optional["np.ndarray"]]] = []
+        ids: list[str] = []
+        changed = False
+        for m in memories:
+            existing = m.get("content", "").strip()
+            entry_id = m.get("id", "")
+            cached = old_cache.get(entry_id)
+            if cached is None or cached[0] != existing:
+                tokens = frozenset(_tokenize_for_similarity(existing))
+                cached = (existing, tokens, _minhash_signature(tokens))
+                changed = True
+            token_cache[entry_id] = cached
+            rows.append((m, cached[1], cached[2]))
+            ids.append(entry_id)
+        # 只保留当前仍存在的条目，已删除条目的缓存随之丢弃
+        self._token_cache = token_cache
+
+        candidates = range(len(rows))
+        if new_sig is not None:
+            # MinHash 预筛：一次向量化比较所有签名，只对估计值接近阈值的条目做精确 Jaccard
+            stacked = self._minhash_matrix
+            if changed or stacked is None or stacked[0] != ids:
+                sig_rows = [i for i, row in enumerate(rows) if row[2] is not None]
+                if not sig_rows:
+                    return None
+                stacked = (ids, sig_rows, np.stack([rows[i][2] for i in sig_rows]))
+                self._minhash_matrix = stacked
+            _, sig_rows, sigs = stacked
+            estimates = (sigs == new_sig).mean(axis=1)
+            hits = np.flatnonzero(
+                estimates >= self.DUPLICATE_SIMILARITY_THRESHOLD - _MINHASH_PREFILTER_MARGIN
+            )
+            candidates = [sig_rows[i] for i in hits]
+
+        duplicate = None
+        for i in candidates:
+            m, tokens, _ = rows[i]
+            if _jaccard_from_sets(tokens, new_tokens) >= self.DUPLICATE_SIMILARITY_THRESHOLD:
+                duplicate = m
+                break
+
+        if duplicate is not None:
+            logger.info("检测到相似记忆，跳过添加: %.50s...", content_stripped)
+        return duplicate
+
     def add_entry(
         self,
         content: str,
@@ -290,7 +719,7 @@ class MemoryManager:
         Returns:
             创建的条目（API 格式）
         """
-        if category not in VALID_CATEGORIES:
+        if category not in VALID_CATEGORIES_SET:
             category = "general"
 
         # 限制 salience 范围
@@ -305,13 +734,9 @@ class MemoryManager:
             # 重复检测：精确匹配 + Jaccard 相似度（轻量级，无 LLM 开销）
             # consolidator 已通过 LLM 做了 ADD 决策时，跳过此检测避免矛盾
             if not skip_dedup:
-                for m in memories:
-                    existing = m.get("content", "").strip()
-                    if existing == content_stripped:
-                        return MemoryEntry.from_dict(m).to_api_dict()
-                    if _jaccard_similarity(existing, content_stripped) >= self.DUPLICATE_SIMILARITY_THRESHOLD:
-                        logger.info(f"检测到相似记忆，跳过添加: {content_stripped[:50]}...")
-                        return MemoryEntry.from_dict(m).to_api_dict()
+                duplicate = self._find_duplicate(memories, content_stripped)
+                if duplicate is not None:
+                    return MemoryEntry.from_dict(duplicate).to_api_dict()
 
             # 创建新条目
             entry = MemoryEntry(
@@ -328,8 +753,8 @@ class MemoryManager:
             self._save_memory_json(data)
 
         # 通知搜索模块索引已过期
-        self._invalidate_search_index()
-        logger.info(f"已添加记忆条目 [{entry.id}] 到 {category}")
+        self._invalidate_search_index(added=[entry.id])
+        logger.info("已添加记忆条目 [%s] 到 %s", entry.id, category)
         return entry.to_api_dict()
 
     def update_entry(
@@ -350,31 +775,32 @@ class MemoryManager:
         Returns:
             更新后的条目，或 None（未找到）
         """
+        fields: dict = {}
+        if content is not None:
+            fields["content"] = content.strip()
+        if category is not None and category in VALID_CATEGORIES_SET:
+            fields["category"] = category
+        if salience is not None:
+            fields["salience"] = max(0.0, min(1.0, salience))
+
         result = None
         with self._lock:
             data = self._load_memory_json()
             memories = data.get("memories", [])
 
-            for i, m in enumerate(memories):
-                if m.get("id") == entry_id:
-                    if content is not None:
-                        m["content"] = content.strip()
-                    if category is not None and category in VALID_CATEGORIES:
-                        m["category"] = category
-                    if salience is not None:
-                        m["salience"] = max(0.0, min(1.0, salience))
-                    m["last_accessed"] = datetime.now().isoformat()
-
-                    memories[i] = m
-                    data["memories"] = memories
-                    self._save_memory_json(data)
-                    result = MemoryEntry.from_dict(m).to_api_dict()
-                    break
+            idx = self._find_entry(memories, entry_id)
+            if idx is not None:
+                m = memories[idx]
+                m.update(fields)
+                m["last_accessed"] = datetime.now().isoformat()
+                # 内容修改直接写回 memory.json，文件查看、备份与压缩快照都能看到最新内容
+                self._save_memory_json(data)
+                result = MemoryEntry.from_dict(m).to_api_dict()
 
         # 索引失效通知放在锁外，与 add_entry 保持一致
         if result is not None:
-            self._invalidate_search_index()
-            logger.info(f"已更新记忆条目 [{entry_id}]")
+            self._invalidate_search_index(updated=[entry_id])
+            logger.info("已更新记忆条目 [%s]", entry_id)
 
         return result
 
@@ -392,38 +818,33 @@ class MemoryManager:
             data = self._load_memory_json()
             memories = data.get("memories", [])
 
-            original_len = len(memories)
-            memories = [m for m in memories if m.get("id") != entry_id]
-
-            if len(memories) < original_len:
+            idx = self._find_entry(memories, entry_id)
+            if idx is not None:
+                memories.pop(idx)
                 data["memories"] = memories
                 self._save_memory_json(data)
                 deleted = True
 
         # 索引失效通知放在锁外，与 add_entry 保持一致
         if deleted:
-            self._invalidate_search_index()
-            logger.info(f"已删除记忆条目 [{entry_id}]")
+            self._invalidate_search_index(removed=[entry_id])
+            logger.info("已删除记忆条目 [%s]", entry_id)
 
         return deleted
 
     def record_access(self, entry_id: str) -> None:
-        """记录条目访问（更新 last_accessed 和 access_count）"""
-        with self._lock:
-            data = self._load_memory_json()
-            memories = data.get("memories", [])
+        """记录条目访问（更新 last_accessed 和 access_count）
 
-            for m in memories:
-                if m.get("id") == entry_id:
-                    m["last_accessed"] = datetime.now().isoformat()
-                    m["access_count"] = m.get("access_count", 1) + 1
-                    self._save_memory_json(data)
-                    break
+        只向事件日志追加一行，读取时再折叠，避免每次访问都重写整个 memory.json。
+        """
+        event = {"op": "access", "id": entry_id, "ts": datetime.now().isoformat()}
+        with self._lock:
+            if self._append_event(event) >= self.EVENTS_COMPACT_BYTES:
+                self._save_memory_json(self._load_memory_json())
 
     def get_rolling_summary(self) -> str:
         """获取滚动摘要"""
-        data = self._load_memory_json()
-        return data.get("rolling_summary", "")
+        return self._load_field("rolling_summary") or ""
 
     def set_rolling_summary(self, summary: str) -> None:
         """设置滚动摘要"""
@@ -453,6 +874,11 @@ class MemoryManager:
     ) -> None:
         """向每日日志追加条目
 
+        条目先进入内存缓冲，同一天满 DAILY_LOG_FLUSH_ENTRIES 条或 DAILY_LOG_FLUSH_INTERVAL 秒后
+        才读取一次日志文件并批量写回，避免每条日志都整文件读写。
+        持久性相应减弱：进程被强制终止（kill -9、断电）时最近几秒的日志可能丢失；
+        正常退出时由 atexit 写出。本类的读取接口会先写出对应日期的缓冲，结果不受影响。
+
         Args:
             content: 日志内容
             day: 日期（默认今天）
@@ -461,54 +887,97 @@ class MemoryManager:
             tool: 工具名（用于 reflection）
             error: 错误信息（用于 reflection）
         """
-        path = self._daily_log_path(day)
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        now = datetime.now()
+        day = day or now.strftime("%Y-%m-%d")
+        entry = DailyLogEntry(
+            time=now.strftime("%H:%M:%S"),
+            type=log_type,
+            content=content,
+            category=category,
+            tool=tool,
+            error=error,
+        )
 
-        # 日志文件的 read-modify-write 需持锁保护，防止并发写入丢失数据
-        # （auto_extract、reflection、用户纠正等多条路径可能同时触发）
+        with self._daily_buffer_lock:
+            pending = self._daily_buffer.setdefault(day, [])
+            pending.append(entry)
+            flush_now = len(pending) >= self.DAILY_LOG_FLUSH_ENTRIES
+            if not flush_now and self._daily_flush_timer is None:
+                timer = threading.Timer(self.DAILY_LOG_FLUSH_INTERVAL, self._flush_daily_buffer)
+                timer.daemon = True
+                self._daily_flush_timer = timer
+                timer.start()
+
+        if flush_now:
+            self._flush_daily_buffer(day)
+
+    def _flush_daily_buffer(self, day: Optional[str] = None) -> None:
+        """将缓冲中的每日日志写入文件（day 为 None 时写出全部日期）"""
         with self._lock:
-            # 加载或创建日志
+            self._flush_daily_buffer_locked(day)
+
+    def _flush_daily_buffer_locked(self, day: Optional[str] = None) -> None:
+        """同 _flush_daily_buffer，需在持有 _lock 时调用
+
+        取出缓冲与写入文件都在 _lock 内完成，其他读取方不会看到“已出缓冲、未落盘”的中间状态。
+        """
+        with self._daily_buffer_lock:
+            if day is None:
+                pending = self._daily_buffer
+                self._daily_buffer = {}
+                timer, self._daily_flush_timer = self._daily_flush_timer, None
+                if timer is not None and timer is not threading.current_thread():
+                    timer.cancel()
+            else:
+                entries = self._daily_buffer.pop(day, None)
+                pending = {day: entries} if entries else {}
+
+        for pending_day, entries in pending.items():
+            path = self._daily_log_path(pending_day)
+            # 每个日期只读写一次文件
             if path.exists():
                 try:
-                    data = json.loads(path.read_text(encoding="utf-8"))
+                    data = orjson.loads(path.read_bytes())
                     daily_log = DailyLog.from_dict(data)
                 except Exception:
-                    daily_log = DailyLog(date=day or datetime.now().strftime("%Y-%m-%d"))
+                    daily_log = DailyLog(date=pending_day)
             else:
-                daily_log = DailyLog(date=day or datetime.now().strftime("%Y-%m-%d"))
+                daily_log = DailyLog(date=pending_day)
 
-            # 添加条目
-            entry = DailyLogEntry(
-                time=timestamp,
-                type=log_type,
-                content=content,
-                category=category,
-                tool=tool,
-                error=error,
-            )
-            daily_log.entries.append(entry)
+            daily_log.entries.extend(entries)
+            path.write_bytes(_dumps(daily_log.to_dict()))
+            self._mark_logs_changed()
+            logger.info("已追加 %s 条到每日日志: %s", len(entries), path.name)
 
-            # 保存
-            path.write_text(
-                json.dumps(daily_log.to_dict(), ensure_ascii=False, indent=2),
-                encoding="utf-8",
-            )
+    def flush_pending_logs(self) -> None:
+        """写出全部缓冲中的每日日志（无缓冲时不加锁）
 
-        logger.info(f"已追加到每日日志: {path.name}")
+        直接读取日志文件的检索路径（SQLite 镜像、逐条扫描）在读取前调用，保证刚追加的条目立即可搜。
+        """
+        if self._daily_buffer:
+            self._flush_daily_buffer()
+
+    def _flush_pending_day(self, day: str) -> None:
+        """读取某天日志前写出其缓冲（无缓冲时不加锁）"""
+        if day in self._daily_buffer:
+            self._flush_daily_buffer(day)
 
     def read_daily_log(self, day: Optional[str] = None) -> str:
         """读取每日日志内容（返回人类可读格式）"""
+        # 日期只解析一次，后续的缓冲写出、路径拼接、.md 兼容都复用
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        self._flush_pending_day(day)
         path = self._daily_log_path(day)
 
         if not path.exists():
             # 兼容旧版 .md 格式
-            md_path = self.logs_dir / f"{day or datetime.now().strftime('%Y-%m-%d')}.md"
+            md_path = self.logs_dir / f"{day}.md"
             if md_path.exists():
                 return md_path.read_text(encoding="utf-8")
             return ""
 
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
+            data = orjson.loads(path.read_bytes())
             daily_log = DailyLog.from_dict(data)
         except Exception:
             return ""
@@ -531,17 +1000,26 @@ class MemoryManager:
 
     def delete_daily_log(self, day: str) -> bool:
         """删除每日日志文件"""
+        # 丢弃该日期尚未落盘的缓冲，避免删除后又被写回
+        with self._daily_buffer_lock:
+            self._daily_buffer.pop(day, None)
+        self._logs_index_key = None
+
         path = self._daily_log_path(day)
         if path.exists():
             path.unlink()
-            logger.info(f"已删除每日日志: {path.name}")
+            # 同步清理归档标记文件（由 archiver 写入）
+            path.with_suffix(".archived").unlink(missing_ok=True)
+            self._mark_logs_changed()
+            logger.info("已删除每日日志: %s", path.name)
             return True
 
         # 兼容旧版 .md 格式
         md_path = self.logs_dir / f"{day}.md"
         if md_path.exists():
             md_path.unlink()
-            logger.info(f"已删除每日日志: {md_path.name}")
+            self._mark_logs_changed()
+            logger.info("已删除每日日志: %s", md_path.name)
             return True
 
         return False
@@ -552,36 +1030,44 @@ class MemoryManager:
         if not self.logs_dir.exists():
             return logs
 
-        # 收集 .json 和 .md 文件
-        seen_dates = set()
-
-        for f in sorted(self.logs_dir.glob("*.json"), reverse=True):
-            if not re.match(r"\d{4}-\d{2}-\d{2}", f.stem):
-                continue
-            seen_dates.add(f.stem)
-            stat = f.stat()
-            logs.append({
-                "date": f.stem,
-                "path": f"memory/logs/{f.name}",
-                "size": stat.st_size,
-            })
-
-        # 兼容旧版 .md 文件
-        for f in sorted(self.logs_dir.glob("*.md"), reverse=True):
-            if not re.match(r"\d{4}-\d{2}-\d{2}", f.stem):
-                continue
-            if f.stem in seen_dates:
-                continue  # 已有 JSON 版本
-            stat = f.stat()
-            logs.append({
-                "date": f.stem,
-                "path": f"memory/logs/{f.name}",
-                "size": stat.st_size,
-            })
+        # 今天的日志可能还在缓冲中尚未创建文件
+        if self._daily_buffer:
+            self._flush_daily_buffer()
+
+        index_key = self.logs_dir.stat().st_mtime_ns
+        if index_key == self._logs_index_key:
+            return [dict(log) for log in self._logs_index_cache]
+
+        # 单次 scandir 同时收集 .json 和 .md 文件，文件大小取自目录项的 stat（每个文件只 stat 一次）
+        json_logs: dict[str, dict] = {}
+        md_logs: dict[str, dict] = {}
+        with os.scandir(self.logs_dir) as it:
+            for entry in it:
+                stem, _, ext = entry.name.rpartition(".")
+                if ext == "json":
+                    target = json_logs
+                elif ext == "md":
+                    target = md_logs
+                else:
+                    continue
+                if not _DATE_RE.match(stem) or not entry.is_file():
+                    continue
+                target[stem] = {
+                    "date": stem,
+                    "path": f"memory/logs/{entry.name}",
+                    "size": entry.stat().st_size,
+                }
+
+        # 兼容旧版 .md 文件（已有 JSON 版本的日期以 JSON 为准）
+        logs.extend(json_logs.values())
+        logs.extend(log for stem, log in md_logs.items() if stem not in json_logs)
 
         # 按日期降序排序
         logs.sort(key=lambda x: x["date"], reverse=True)
-        return logs
+
+        self._logs_index_cache = logs
+        self._logs_index_key = index_key
+        return [dict(log) for log in logs]
 
     def get_daily_log_entries(self, day: str) -> list[dict]:
         """获取每日日志的结构化条目列表（含 index 作为 ID）
@@ -592,12 +1078,13 @@ class MemoryManager:
         Returns:
             条目列表，每条包含 index, time, type, content, category
         """
+        self._flush_pending_day(day)
         path = self._daily_log_path(day)
         if not path.exists():
             return []
 
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
+            data = orjson.loads(path.read_bytes())
             daily_log = DailyLog.from_dict(data)
         except Exception:
             return []
@@ -628,12 +1115,13 @@ class MemoryManager:
             更新后的条目，或 None（未找到）
         """
         path = self._daily_log_path(day)
-        if not path.exists():
-            return None
-
         with self._lock:
+            self._flush_daily_buffer_locked(day)
+            if not path.exists():
+                return None
+
             try:
-                data = json.loads(path.read_text(encoding="utf-8"))
+                data = orjson.loads(path.read_bytes())
                 daily_log = DailyLog.from_dict(data)
             except Exception:
                 return None
@@ -645,13 +1133,11 @@ class MemoryManager:
             if log_type is not None:
                 daily_log.entries[index].type = log_type
 
-            path.write_text(
-                json.dumps(daily_log.to_dict(), ensure_ascii=False, indent=2),
-                encoding="utf-8",
-            )
+            path.write_bytes(_dumps(daily_log.to_dict()))
+            self._mark_logs_changed()
 
         entry = daily_log.entries[index]
-        logger.info(f"已更新每日日志条目: {day} #{index}")
+        logger.info("已更新每日日志条目: %s #%s", day, index)
         return {
             "index": index,
             "time": entry.time,
@@ -671,12 +1157,13 @@ class MemoryManager:
             是否成功删除
         """
         path = self._daily_log_path(day)
-        if not path.exists():
-            return False
-
         with self._lock:
+            self._flush_daily_buffer_locked(day)
+            if not path.exists():
+                return False
+
             try:
-                data = json.loads(path.read_text(encoding="utf-8"))
+                data = orjson.loads(path.read_bytes())
                 daily_log = DailyLog.from_dict(data)
             except Exception:
                 return False
@@ -689,15 +1176,15 @@ class MemoryManager:
             # 条目清空则删除整个文件
             if not daily_log.entries:
                 path.unlink()
-                logger.info(f"已删除空的每日日志文件: {day}")
+                path.with_suffix(".archived").unlink(missing_ok=True)
+                self._mark_logs_changed()
+                logger.info("已删除空的每日日志文件: %s", day)
                 return True
 
-            path.write_text(
-                json.dumps(daily_log.to_dict(), ensure_ascii=False, indent=2),
-                encoding="utf-8",
-            )
+            path.write_bytes(_dumps(daily_log.to_dict()))
+            self._mark_logs_changed()
 
-        logger.info(f"已删除每日日志条目: {day} #{index}")
+        logger.info("已删除每日日志条目: %s #%s", day, index)
         return True
 
     def get_daily_context(self, num_days: Optional[int] = None) -> str:
@@ -730,33 +1217,31 @@ class MemoryManager:
         Returns:
             程序性记忆列表
         """
-        entries = self.get_entries(category="procedural")
+        if not tool:
+            return self.get_entries(category="procedural")
 
-        if tool:
-            # 一次性加载 memory.json，避免循环内重复读取
-            data = self._load_memory_json()
-            # 构建 ID → context 映射
-            context_map = {
-                m.get("id"): m.get("context", {})
-                for m in data.get("memories", [])
-            }
-            # 过滤特定工具的经验
-            filtered = []
-            for e in entries:
-                ctx = context_map.get(e["entry_id"], {})
-                if ctx and ctx.get("tool") == tool:
-                    filtered.append(e)
-            return filtered
-
-        return entries
-
-    def _invalidate_search_index(self) -> None:
-        """通知搜索模块记忆索引已过期，下次搜索时懒加载重建"""
-        try:
-            from memory.search import invalidate_memory_index
-            invalidate_memory_index()
-        except ImportError:
-            pass
+        # 分类与工具过滤在解析时完成，无需再整体加载一次构建 ID → context 映射
+        def predicate(m: dict) -> bool:
+            ctx = m.get("context")
+            return m.get("category", "general") == "procedural" and bool(ctx) and ctx.get("tool") == tool
+
+        memories = [MemoryEntry.from_dict(m) for m in self._load_field("memories.item", predicate)]
+        memories.sort(key=lambda x: x.created_at, reverse=True)
+        return [m.to_api_dict() for m in memories]
+
+    def _invalidate_search_index(self, **changes: list[str]) -> None:
+        """通知搜索模块记忆索引已过期
+
+        changes 为 added/removed/updated 条目 id 时只增量更新对应节点，否则下次搜索时整体重建。
+        """
+        if invalidate_memory_index is not None:
+            invalidate_memory_index(**changes)
+
+    def _mark_logs_changed(self) -> None:
+        """日志文件写入/删除后调用：使 list_daily_logs 缓存与搜索结果缓存失效"""
+        self._logs_index_key = None
+        if invalidate_search_results is not None:
+            invalidate_search_results()
 
     def add_procedural_memory(
         self,
@@ -794,26 +1279,61 @@ class MemoryManager:
             context=context,
         )
 
+    # ============================================
+    # 异步接口（供事件循环中的调用方使用）
+    # ============================================
+    # 同步接口内部持有 threading.Lock 并做阻塞文件 IO，直接在协程中调用会卡住事件循环。
+    # 以下包装把整个调用放到线程池执行；锁仍是 threading.Lock，
+    # 因为工具等同步调用方也会在其他线程中写记忆，asyncio.Lock 无法覆盖。
+
+    async def add_entry_async(self, *args, **kwargs) -> dict:
+        """add_entry 的异步版本"""
+        return await asyncio.to_thread(self.add_entry, *args, **kwargs)
+
+    async def update_entry_async(self, *args, **kwargs) -> Optional[dict]:
+        """update_entry 的异步版本"""
+        return await asyncio.to_thread(self.update_entry, *args, **kwargs)
+
+    async def delete_entry_async(self, entry_id: str) -> bool:
+        """delete_entry 的异步版本"""
+        return await asyncio.to_thread(self.delete_entry, entry_id)
+
+    async def append_daily_log_async(self, *args, **kwargs) -> None:
+        """append_daily_log 的异步版本（缓冲写满时会同步落盘）"""
+        await asyncio.to_thread(self.append_daily_log, *args, **kwargs)
+
     # ============================================
     # 统计
     # ============================================
 
     def get_stats(self) -> dict:
         """获取记忆统计信息"""
-        data = self._load_memory_json()
-        memories = [MemoryEntry.from_dict(m) for m in data.get("memories", [])]
+        data = self._peek_memory_json()
+        memories = data.get("memories", [])
         logs = self.list_daily_logs()
 
-        # 按分类计数
-        category_counts = {}
-        for cat in VALID_CATEGORIES:
-            category_counts[cat] = sum(1 for m in memories if m.category == cat)
-
-        # 平均重要性
-        avg_salience = (
-            sum(m.salience for m in memories) / len(memories)
-            if memories else 0
-        )
+        # 只读取 category / salience 两个字段，不构造 MemoryEntry
+        if np is not None and memories:
+            cat_lookup = {cat: i for i, cat in enumerate(VALID_CATEGORIES)}
+            # 未知分类映射到 0 号桶，统计时丢弃
+            cats = np.fromiter(
+                (cat_lookup.get(m.get("category", "general"), -1) + 1 for m in memories),
+                dtype=np.int64,
+                count=len(memories),
+            )
+            saliences = np.fromiter(
+                (m.get("salience", 0.5) for m in memories), dtype=np.float64, count=len(memories)
+            )
+            counts = np.bincount(cats, minlength=len(VALID_CATEGORIES) + 1)[1:]
+            category_counts = {cat: int(n) for cat, n in zip(VALID_CATEGORIES, counts)}
+            avg_salience = float(saliences.mean())
+        else:
+            counts = Counter(m.get("category", "general") for m in memories)
+            category_counts = {cat: counts.get(cat, 0) for cat in VALID_CATEGORIES}
+            avg_salience = (
+                sum(m.get("salience", 0.5) for m in memories) / len(memories)
+                if memories else 0
+            )
 
         memory_size = self.memory_file.stat().st_size if self.memory_file.exists() else 0
 
@@ -24,6 +24,9 @@ VALID_CATEGORIES = [
     "general",      # 通用信息
 ]
 
+# 分类合法性校验用（O(1) 成员判断）
+VALID_CATEGORIES_SET = frozenset(VALID_CATEGORIES)
+
 CATEGORY_LABELS = {
     "preferences": "用户偏好",
     "facts": "重要事实",
@@ -1,18 +1,42 @@
 """记忆搜索模块 — 支持向量检索 + 关键词匹配 + 时间衰减
 
 提供多种搜索策略：
-1. 向量搜索（LlamaIndex）
+1. 向量搜索（SQLite 向量索引，或 LlamaIndex）
 2. 关键词匹配（fallback）
-3. 重要性 × 时间衰减排序
+3. 混合检索：向量 + 关键词按倒数排名融合（RRF，默认）
+4. 重要性 × 时间衰减排序
 """
+import heapq
 import logging
 import math
+import os
+import sqlite3
 import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
 
+import orjson
+
+# pyahocorasick 为可选依赖：缺失时逐个关键词做子串判断
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# numpy 为可选依赖：缺失时批量相关性计算退化为逐条循环
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from cache.memory_cache import MemoryCache
 from config import settings
 from memory.models import MemoryEntry
+from memory.sqlite_store import search_store
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +47,34 @@ _memory_query_engine = None
 _index_dirty = False
 # 索引操作的线程锁，防止搜索和写入之间的竞争条件
 _index_lock = threading.Lock()
+# 是否有线程正在锁外构建索引；构建结束（无论成功与否）时 _index_build_done 被置位
+_index_building = False
+_index_build_done = threading.Event()
+_index_build_done.set()
+# 待增量同步到 LlamaIndex 索引的长期记忆 id（新增/修改/删除），下次向量搜索前应用
+_index_pending: set[str] = set()
+# embedding 模型实例缓存：配置不变时复用同一实例及其 HTTP 连接池
+_embed_model = None
+_embed_model_key: Optional[tuple[str, str, str]] = None
+# search_memories 结果缓存：键中包含 _cache_epoch（记忆或日志经 MemoryManager 变化时递增）
+# 与记忆/日志文件指纹（外部直接改写文件时变化），旧结果自然不可达（随 LRU/TTL 淘汰），无需逐条清除
+_result_cache = MemoryCache(max_size=512, default_ttl=300)
+_cache_epoch = 0
+# 长期记忆的物化视图（见 _get_memory_view），memory.json 与事件日志未变化时复用
+_memory_view: Optional[dict] = None
+# 并发读取日志文件的线程数
+_LOG_READ_WORKERS = 8
+
+# 构建索引时每次 embedding 请求的文本数，以及并发请求的批数
+_EMBED_BATCH_SIZE = 96
+_EMBED_BATCH_WORKERS = 4
+
+# 混合检索：倒数排名融合（RRF）常数与两路权重
+_RRF_K = 60
+_HYBRID_VECTOR_WEIGHT = 0.6
+_HYBRID_KEYWORD_WEIGHT = 0.4
+# 混合检索中与向量检索并发执行关键词检索的线程池
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory-search")
 
 
 def compute_relevance(
@@ -49,16 +101,7 @@ def compute_relevance(
     if decay_lambda is None:
         decay_lambda = settings.memory_decay_lambda
 
-    # 解析 last_accessed 时间
-    # memory.json 中的时间通常由 datetime.now().isoformat() 生成（本地时间、无时区），
-    # 若手动编辑为 UTC（如 "...Z"）则需先转本地时区再去掉 tzinfo 以确保与 now() 一致比较
-    try:
-        last_accessed = datetime.fromisoformat(memory.last_accessed.replace("Z", "+00:00"))
-        if last_accessed.tzinfo is not None:
-            # 先转换为本地时区，再去掉 tzinfo 以与 naive datetime.now() 一致
-            last_accessed = last_accessed.astimezone().replace(tzinfo=None)
-    except (ValueError, AttributeError):
-        last_accessed = now
+    last_accessed = _parse_last_accessed(memory.last_accessed) or now
 
     # 计算天数差
     days_old = (now - last_accessed).days
@@ -71,27 +114,183 @@ def compute_relevance(
     return semantic_score * memory.salience * decay
 
 
+def _parse_last_accessed(value: str) -> Optional[datetime]:
+    """解析 last_accessed 为本地 naive datetime，无法解析时返回 None"""
+    if not isinstance(value, str):
+        return None
+    return _iso_to_naive_local(value)
+
+
+@lru_cache(maxsize=4096)
+def _iso_to_naive_local(value: str) -> Optional[datetime]:
+    """ISO 时间字符串 → 本地 naive datetime（按字符串缓存，同一条目反复出现时不再重复解析）
+
+    memory.json 中的时间通常由 datetime.now().isoformat() 生成（本地时间、无时区），
+    若手动编辑为 UTC（如 "...Z"）则需先转本地时区再去掉 tzinfo 以确保与 now() 一致比较
+    """
+    try:
+        last_accessed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if last_accessed.tzinfo is not None:
+        # 先转换为本地时区，再去掉 tzinfo 以与 naive datetime.now() 一致
+        last_accessed = last_accessed.astimezone().replace(tzinfo=None)
+    return last_accessed
+
+
+def _get_memory_view() -> dict:
+    """长期记忆的物化视图：按 memory.json + 事件日志的 (mtime_ns, size) 缓存
+
+    以平行数组（SoA）保存相关性计算所需的字段，last_accessed 只在构建时解析一次：
+    - index: 条目 id → 数组下标
+    - salience: 重要性（numpy 可用时为 float64 数组）
+    - last_accessed: 本地 naive 时间（numpy 可用时为 datetime64[us] 数组，无法解析为 NaT/None）
+    """
+    global _memory_view
+    from memory.manager import memory_manager
+
+    try:
+        st = memory_manager.memory_file.stat()
+        key = (st.st_mtime_ns, st.st_size, memory_manager._events_size())
+    except FileNotFoundError:
+        key = None
+    view = _memory_view
+    if view is not None and view["key"] == key:
+        return view
+
+    entries = [MemoryEntry.from_dict(m) for m in memory_manager._peek_memory_json().get("memories", [])]
+    salience = [e.salience for e in entries]
+    last_accessed = [_parse_last_accessed(e.last_accessed) for e in entries]
+    if np is not None:
+        salience = np.array(salience, dtype=np.float64)
+        last_accessed = np.array(
+            [np.datetime64("NaT") if t is None else t for t in last_accessed],
+            dtype="datetime64[us]",
+        )
+    view = {
+        "key": key,
+        "index": {e.id: i for i, e in enumerate(entries)},
+        "salience": salience,
+        "last_accessed": last_accessed,
+    }
+    _memory_view = view
+    return view
+
+
+def compute_relevance_batch(
+    view: dict,
+    indices: list[int],
+    semantic_scores: list[float],
+    now: Optional[datetime] = None,
+    decay_lambda: Optional[float] = None,
+) -> list[float]:
+    """批量计算综合相关性得分（语义相似度 × 重要性 × 时间衰减），结果与 compute_relevance 一致
+
+    Args:
+        view: _get_memory_view() 返回的物化视图
+        indices: 各条目在视图中的下标
+        semantic_scores: 与 indices 一一对应的语义相似度
+        now: 当前时间（默认 datetime.now()）
+        decay_lambda: 衰减系数（默认读取 settings.memory_decay_lambda）
+    """
+    if now is None:
+        now = datetime.now()
+    if decay_lambda is None:
+        decay_lambda = settings.memory_decay_lambda
+    if not indices:
+        return []
+
+    if np is None:
+        scores = []
+        for i, semantic_score in zip(indices, semantic_scores):
+            last_accessed = view["last_accessed"][i] or now
+            days_old = max(0, (now - last_accessed).days)
+            scores.append(semantic_score * view["salience"][i] * math.exp(-decay_lambda * days_old))
+        return scores
+
+    idx = np.asarray(indices, dtype=np.intp)
+    last_accessed = view["last_accessed"][idx]
+    # 与 timedelta.days 相同按整天向下取整；无法解析的时间视为刚访问过
+    days_old = np.floor((np.datetime64(now, "us") - last_accessed) / np.timedelta64(1, "D"))
+    days_old = np.where(np.isnat(last_accessed), 0.0, np.maximum(days_old, 0.0))
+    decay = np.exp(-decay_lambda * days_old)
+    return (np.asarray(semantic_scores, dtype=np.float64) * view["salience"][idx] * decay).tolist()
+
+
 def build_or_load_memory_index():
-    """构建或加载记忆搜索索引（LlamaIndex）"""
-    global _memory_index, _memory_query_engine, _index_dirty
+    """构建或加载记忆搜索索引（LlamaIndex）
 
+    _index_lock 只在开始（登记构建状态、准备 embedding 模型）和结束（安装索引）时持有，
+    耗时的读盘、embedding 与持久化在锁外执行，不阻塞并发搜索；
+    已有其他线程在构建时直接返回，调用方降级为关键词搜索。
+    """
     if not settings.memory_index_enabled:
         return
 
+    _try_build_memory_index()
+
+
+def _try_build_memory_index() -> bool:
+    """构建或加载索引并安装为全局索引；已有其他线程在构建时返回 False"""
+    global _memory_index, _memory_query_engine, _index_dirty, _index_building
+
     with _index_lock:
-        return _build_or_load_memory_index_locked()
+        if _index_building:
+            return False
+        if _memory_query_engine is not None:
+            return True
+        try:
+            # 使用自定义 embedding 模型（兼容所有 OpenAI 兼容 API）
+            embed_model = _create_embed_model()
+        except ImportError as e:
+            logger.warning(f"LlamaIndex 不可用，将使用关键词搜索: {e}")
+            return True
+        if embed_model is None:
+            # Embedding 模型不可用，静默返回，不构建索引
+            logger.info("Embedding 模型不可用，跳过向量索引构建（将使用关键词搜索）")
+            return True
+        dirty = _index_dirty
+        _index_dirty = False
+        _index_building = True
+        _index_build_done.clear()
+
+    index = query_engine = None
+    try:
+        index = _build_or_load_index(embed_model, dirty)
+        if index is not None:
+            query_engine = index.as_query_engine(
+                similarity_top_k=10,
+                response_mode="no_text",  # 返回原始节点，不合成
+            )
+    except ImportError as e:
+        logger.warning(f"LlamaIndex 不可用，将使用关键词搜索: {e}")
+    except Exception as e:
+        logger.warning(f"构建记忆索引失败，将降级使用关键词搜索: {e}")
+    finally:
+        with _index_lock:
+            # 构建期间发生过增删改（invalidate_memory_index 重新置脏）：结果已过期，不安装
+            if query_engine is not None and not _index_dirty:
+                _memory_index = index
+                _memory_query_engine = query_engine
+            _index_building = False
+            _index_build_done.set()
+    return True
 
 
 def _create_embed_model():
     """创建 embedding 模型，使用 OpenAI SDK 直接调用（兼容阿里云等非标准 API）
 
+    (api_key, api_base, model) 未变化时返回上次创建的实例（需在 _index_lock 内调用）。
+
     Returns:
         CustomOpenAIEmbedding 实例，如果配置不可用则返回 None
     """
+    global _embed_model, _embed_model_key
     from llama_index.core.embeddings import BaseEmbedding
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
     from model_pool import resolve_model
     from pydantic import PrivateAttr
+    from cache import embedding_cache
 
     try:
         emb_cfg = resolve_model("embedding")
@@ -103,10 +302,15 @@ def _create_embed_model():
         logger.warning(f"无法获取 Embedding 模型配置: {e}，跳过向量索引构建")
         return None
 
+    model_key = (emb_cfg["api_key"], emb_cfg["api_base"], emb_cfg["model"])
+    if _embed_model is not None and _embed_model_key == model_key:
+        return _embed_model
+
     class CustomOpenAIEmbedding(BaseEmbedding):
         """自定义 embedding 模型，直接使用 OpenAI SDK"""
 
         _client: OpenAI = PrivateAttr()
+        _aclient: AsyncOpenAI = PrivateAttr()
         _model_name: str = PrivateAttr()
 
         def __init__(self, api_key: str, api_base: str, model: str, **kwargs):
@@ -116,6 +320,11 @@ def _create_embed_model():
                 base_url=api_base,
                 timeout=30,
             )
+            self._aclient = AsyncOpenAI(
+                api_key=api_key,
+                base_url=api_base,
+                timeout=30,
+            )
             self._model_name = model
 
         @classmethod
@@ -131,139 +340,304 @@ def _create_embed_model():
             return response.data[0].embedding
 
         def _get_query_embedding(self, query: str) -> list[float]:
-            return self._get_embedding(query)
+            # 查询向量按 (模型, 文本) 缓存：会话开始的隐式召回与结束时的反思常检索同一条用户消息
+            cached = embedding_cache.get_embedding(query, self._model_name)
+            if cached is not None:
+                return cached
+            embedding = self._get_embedding(query)
+            embedding_cache.cache_embedding(query, self._model_name, embedding)
+            return embedding
 
         def _get_text_embedding(self, text: str) -> list[float]:
             return self._get_embedding(text)
 
+        def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+            """一批文本一次 API 请求（默认实现逐条请求）"""
+            response = self._client.embeddings.create(
+                model=self._model_name,
+                input=texts,
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+        async def _aget_embedding(self, text: str) -> list[float]:
+            """异步获取单个文本的 embedding（不阻塞事件循环）"""
+            response = await self._aclient.embeddings.create(
+                model=self._model_name,
+                input=text,
+            )
+            return response.data[0].embedding
+
         async def _aget_query_embedding(self, query: str) -> list[float]:
-            # LlamaIndex 会在异步场景调用此方法，这里简单返回同步结果
-            return self._get_embedding(query)
+            # LlamaIndex 会在异步场景调用此方法
+            cached = embedding_cache.get_embedding(query, self._model_name)
+            if cached is not None:
+                return cached
+            embedding = await self._aget_embedding(query)
+            embedding_cache.cache_embedding(query, self._model_name, embedding)
+            return embedding
 
         async def _aget_text_embedding(self, text: str) -> list[float]:
-            return self._get_embedding(text)
+            return await self._aget_embedding(text)
+
+        async def _aget_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+            response = await self._aclient.embeddings.create(
+                model=self._model_name,
+                input=texts,
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
 
     try:
-        return CustomOpenAIEmbedding(
+        _embed_model = CustomOpenAIEmbedding(
             api_key=emb_cfg["api_key"],
             api_base=emb_cfg["api_base"],
             model=emb_cfg["model"],
+            embed_batch_size=_EMBED_BATCH_SIZE,
         )
+        _embed_model_key = model_key
+        return _embed_model
     except Exception as e:
         logger.warning(f"创建 Embedding 模型实例失败: {e}")
         return None
 
 
-def _build_or_load_memory_index_locked():
-    """构建或加载索引的内部实现（需在 _index_lock 内调用）"""
-    global _memory_index, _memory_query_engine, _index_dirty
+def _read_log_files(log_files: list[Path]) -> list[tuple[Optional[dict], Optional[Exception]]]:
+    """并发读取并解析日志文件，返回与 log_files 一一对应的 (数据, 异常) 列表
 
-    try:
-        from llama_index.core import (
-            VectorStoreIndex,
-            StorageContext,
-            load_index_from_storage,
-            Document,
-            Settings as LlamaSettings,
-        )
+    逐个读取时 N 个文件就是 N 次串行的磁盘 I/O，改用线程池并发读取。
+    """
+    def _read(path: Path) -> tuple[Optional[dict], Optional[Exception]]:
+        try:
+            return orjson.loads(path.read_bytes()), None
+        except Exception as e:
+            return None, e
+
+    if len(log_files) <= 1:
+        return [_read(path) for path in log_files]
+    with ThreadPoolExecutor(max_workers=min(_LOG_READ_WORKERS, len(log_files))) as executor:
+        return list(executor.map(_read, log_files))
+
+
+def _memory_node(entry: MemoryEntry):
+    """长期记忆条目 → 索引节点（节点 id 固定为 "mem:<条目 id>"，便于增量删除/替换）"""
+    from llama_index.core.schema import TextNode
+
+    return TextNode(
+        id_=f"mem:{entry.id}",
+        text=entry.content,
+        metadata={
+            "id": entry.id,
+            "category": entry.category,
+            "salience": entry.salience,
+            "source": "memory.json",
+            "type": "long_term",
+        },
+    )
+
+
+def _apply_pending_index_updates() -> None:
+    """把 invalidate_memory_index 登记的增量变更应用到已加载的 LlamaIndex 索引
+
+    与构建共用 _index_building 标记，保证同一时刻只有一个线程修改/持久化索引；
+    已有构建或更新进行中时跳过，变更留待下次搜索。更新失败时退回整体重建。
+    """
+    global _memory_index, _memory_query_engine, _index_dirty, _index_building
 
-        # 使用自定义 embedding 模型（兼容所有 OpenAI 兼容 API）
-        embed_model = _create_embed_model()
-        if embed_model is None:
-            # Embedding 模型不可用，静默返回，不构建索引
-            logger.info("Embedding 模型不可用，跳过向量索引构建（将使用关键词搜索）")
+    with _index_lock:
+        if not _index_pending or _memory_index is None or _index_building:
             return
-        LlamaSettings.embed_model = embed_model
+        index = _memory_index
+        embed_model = _embed_model
+        entry_ids = list(_index_pending)
+        _index_pending.clear()
+        _index_building = True
+        _index_build_done.clear()
+
+    try:
+        _update_index_nodes(index, embed_model, entry_ids)
+    except Exception as e:
+        logger.warning(f"增量更新记忆索引失败，将整体重建: {e}")
+        with _index_lock:
+            if _memory_index is index:
+                _memory_index = None
+                _memory_query_engine = None
+            _index_dirty = True
+    finally:
+        with _index_lock:
+            _index_building = False
+            _index_build_done.set()
+
+
+def _update_index_nodes(index, embed_model, entry_ids: list[str]) -> None:
+    """删除这些条目的旧节点，按 memory.json 当前内容重新插入（在 _index_lock 外调用）
+
+    只为内容变化的条目调用 embedding API；仅重要性/分类变化时沿用旧向量。
+    """
+    from memory.manager import memory_manager
+
+    current = {m.get("id"): m for m in memory_manager._load_memory_json().get("memories", [])}
+    nodes_dict = index.index_struct.nodes_dict
+    old = {}
+    for entry_id in entry_ids:
+        node_id = f"mem:{entry_id}"
+        if node_id in nodes_dict:
+            old[node_id] = (
+                index.docstore.get_node(node_id).get_content(),
+                index.vector_store.get(node_id),
+            )
+    if old:
+        index.delete_nodes(list(old), delete_from_docstore=True)
+
+    nodes = [_memory_node(MemoryEntry.from_dict(current[i])) for i in entry_ids if i in current]
+    to_embed = []
+    for node in nodes:
+        text, embedding = old.get(node.node_id, (None, None))
+        if text == node.text and embedding is not None:
+            node.embedding = embedding
+        else:
+            to_embed.append(node)
+    if to_embed:
+        embeddings = embed_model.get_text_embedding_batch([node.text for node in to_embed])
+        for node, embedding in zip(to_embed, embeddings):
+            node.embedding = embedding
+    if nodes:
+        index.insert_nodes(nodes)
+
+    index.storage_context.persist(persist_dir=str(settings.storage_dir / "memory_index"))
+    logger.info(f"增量更新记忆索引：写入 {len(nodes)} 个节点，重新计算 {len(to_embed)} 个向量")
+
 
-        persist_dir = settings.storage_dir / "memory_index"
+def _build_or_load_index(embed_model, dirty: bool):
+    """加载持久化索引，失败或不存在时从 memory.json 与日志重新构建（在 _index_lock 外调用）
 
-        # 索引被标记为脏（有增删改操作），清除持久化缓存强制重建
-        if _index_dirty:
-            if persist_dir.exists():
-                import shutil
-                shutil.rmtree(persist_dir)
-                logger.info("记忆索引已标记为脏，清除持久化缓存")
-            _index_dirty = False
+    同一时刻最多只有一个线程执行（由 _index_building 保证），不修改全局索引。
 
-        # 尝试加载已有索引
-        if persist_dir.exists():
+    Args:
+        embed_model: _create_embed_model() 返回的 embedding 模型
+        dirty: 索引已被标记为脏时先清除持久化缓存
+
+    Returns:
+        VectorStoreIndex，没有文档需要索引时返回 None
+    """
+    from llama_index.core import (
+        VectorStoreIndex,
+        StorageContext,
+        load_index_from_storage,
+        Settings as LlamaSettings,
+    )
+    from llama_index.core.schema import TextNode
+
+    LlamaSettings.embed_model = embed_model
+
+    persist_dir = settings.storage_dir / "memory_index"
+
+    # 索引被标记为脏（有增删改操作），清除持久化缓存强制重建
+    if dirty and persist_dir.exists():
+        import shutil
+        shutil.rmtree(persist_dir)
+        logger.info("记忆索引已标记为脏，清除持久化缓存")
+
+    # 尝试加载已有索引
+    if persist_dir.exists():
+        try:
+            storage_context = StorageContext.from_defaults(
+                persist_dir=str(persist_dir)
+            )
+            index = load_index_from_storage(storage_context)
+            node_ids = index.index_struct.nodes_dict
+            if node_ids and not any(node_id.startswith("mem:") for node_id in node_ids):
+                # 旧版本构建的索引中长期记忆节点没有固定 id，无法增量更新
+                raise ValueError("索引缺少长期记忆节点 id")
+            logger.info("从存储加载记忆索引")
+            return index
+        except Exception as e:
+            logger.warning(f"加载记忆索引失败，将重建: {e}")
+
+    # 构建新索引
+    documents = []
+
+    # 索引 memory.json
+    from memory.manager import memory_manager
+    data = memory_manager._load_memory_json()
+    memories = data.get("memories", [])
+
+    for m in memories:
+        documents.append(_memory_node(MemoryEntry.from_dict(m)))
+
+    # 索引每日日志
+    logs_dir = settings.memory_dir / "logs"
+    if logs_dir.exists():
+        log_files = list(logs_dir.glob("*.json"))
+        # 并发读取解析，Document 仍按顺序在当前线程构建
+        for log_file, (log_data, error) in zip(log_files, _read_log_files(log_files)):
+            if error is not None:
+                logger.warning(f"索引 {log_file.name} 失败: {error}")
+                continue
             try:
-                storage_context = StorageContext.from_defaults(
-                    persist_dir=str(persist_dir)
-                )
-                _memory_index = load_index_from_storage(storage_context)
-                logger.info("从存储加载记忆索引")
+                entries = log_data.get("entries", [])
+                for entry in entries:
+                    content = entry.get("content", "")
+                    if content.strip():
+                        doc = TextNode(
+                            text=content,
+                            metadata={
+                                "source": f"logs/{log_file.name}",
+                                "type": "daily_log",
+                                "date": log_file.stem,
+                            },
+                        )
+                        documents.append(doc)
             except Exception as e:
-                logger.warning(f"加载记忆索引失败，将重建: {e}")
-                _memory_index = None
+                logger.warning(f"索引 {log_file.name} 失败: {e}")
 
-        # 需要时构建新索引
-        if _memory_index is None:
-            documents = []
+    if not documents:
+        logger.info("没有记忆文档需要索引")
+        return None
 
-            # 索引 memory.json
-            from memory.manager import memory_manager
-            data = memory_manager._load_memory_json()
-            memories = data.get("memories", [])
+    # 按批预先计算 embedding（每批一次 API 请求，多批并发），节点带上向量后 LlamaIndex 不再逐条请求
+    texts = [doc.text for doc in documents]
+    batches = [texts[i:i + _EMBED_BATCH_SIZE] for i in range(0, len(texts), _EMBED_BATCH_SIZE)]
+    if len(batches) == 1:
+        embeddings = embed_model.get_text_embedding_batch(batches[0])
+    else:
+        with ThreadPoolExecutor(max_workers=min(_EMBED_BATCH_WORKERS, len(batches))) as executor:
+            embeddings = [e for batch in executor.map(embed_model.get_text_embedding_batch, batches) for e in batch]
+    for doc, embedding in zip(documents, embeddings):
+        doc.embedding = embedding
 
-            for m in memories:
-                entry = MemoryEntry.from_dict(m)
-                # 构建索引文档，包含元数据
-                doc = Document(
-                    text=entry.content,
-                    metadata={
-                        "id": entry.id,
-                        "category": entry.category,
-                        "salience": entry.salience,
-                        "source": "memory.json",
-                        "type": "long_term",
-                    },
-                )
-                documents.append(doc)
-
-            # 索引每日日志
-            logs_dir = settings.memory_dir / "logs"
-            if logs_dir.exists():
-                import json
-                for log_file in logs_dir.glob("*.json"):
-                    try:
-                        log_data = json.loads(log_file.read_text(encoding="utf-8"))
-                        entries = log_data.get("entries", [])
-                        for entry in entries:
-                            content = entry.get("content", "")
-                            if content.strip():
-                                doc = Document(
-                                    text=content,
-                                    metadata={
-                                        "source": f"logs/{log_file.name}",
-                                        "type": "daily_log",
-                                        "date": log_file.stem,
-                                    },
-                                )
-                                documents.append(doc)
-                    except Exception as e:
-                        logger.warning(f"索引 {log_file.name} 失败: {e}")
-
-            if not documents:
-                logger.info("没有记忆文档需要索引")
-                return
-
-            _memory_index = VectorStoreIndex.from_documents(documents)
-
-            # 持久化
-            persist_dir.mkdir(parents=True, exist_ok=True)
-            _memory_index.storage_context.persist(persist_dir=str(persist_dir))
-            logger.info(f"构建记忆索引，共 {len(documents)} 个文档")
-
-        _memory_query_engine = _memory_index.as_query_engine(
-            similarity_top_k=10,
-            response_mode="no_text",  # 返回原始节点，不合成
-        )
+    index = VectorStoreIndex(nodes=documents)
 
-    except ImportError as e:
-        logger.warning(f"LlamaIndex 不可用，将使用关键词搜索: {e}")
-    except Exception as e:
-        logger.warning(f"构建记忆索引失败，将降级使用关键词搜索: {e}")
+    # 持久化
+    persist_dir.mkdir(parents=True, exist_ok=True)
+    index.storage_context.persist(persist_dir=str(persist_dir))
+    logger.info(f"构建记忆索引，共 {len(documents)} 个文档")
+    return index
+
+
+@lru_cache(maxsize=128)
+def _keyword_counter(keywords: tuple[str, ...]) -> Callable[[str], int]:
+    """返回统计文本命中了多少个关键词的函数（查询中重复的关键词按出现次数计）
+
+    安装了 pyahocorasick 时用 Aho–Corasick 自动机单遍扫描文本，
+    否则逐个关键词做子串判断。按关键词元组缓存，重复查询无需重建自动机。
+    """
+    if ahocorasick is None:
+        return lambda text: sum(1 for kw in keywords if kw in text)
+
+    automaton = ahocorasick.Automaton()
+    for kw, count in Counter(keywords).items():
+        automaton.add_word(kw, (kw, count))
+    automaton.make_automaton()
+    unique = len(automaton)
+
+    def count_matches(text: str) -> int:
+        matched = set()
+        for _, value in automaton.iter(text):
+            matched.add(value)
+            if len(matched) == unique:
+                break
+        return sum(count for _, count in matched)
+
+    return count_matches
 
 
 def keyword_search(
@@ -274,6 +648,9 @@ def keyword_search(
 ) -> list[dict]:
     """关键词搜索（当向量索引不可用时的 fallback）
 
+    候选条目由 SQLite FTS5 镜像（memory/sqlite_store.py）筛选，不再每次查询都解析全部 JSON；
+    存储不可用时回退为逐条扫描。
+
     Args:
         query: 搜索查询
         top_k: 返回数量
@@ -283,62 +660,116 @@ def keyword_search(
     Returns:
         搜索结果列表
     """
-    from memory.manager import memory_manager
+    keywords = query.lower().split()
+    if not keywords:
+        return []
+
+    include_memories = source_type is None or source_type == "long_term"
+    include_logs = source_type is None or source_type == "daily_log"
+
+    candidates = None
+    try:
+        candidates = search_store.keyword_candidates(keywords, include_memories, include_logs)
+    except sqlite3.Error as e:
+        logger.warning(f"SQLite 关键词检索失败，回退逐条扫描: {e}")
+    if candidates is None:
+        candidates = _scan_keyword_candidates(keywords, include_memories, include_logs)
+    memory_candidates, log_candidates = candidates
+    count_matches = _keyword_counter(tuple(keywords))
 
     results = []
-    query_lower = query.lower()
-    keywords = query_lower.split()
     now = datetime.now()
 
-    # 搜索 memory.json（长期记忆）
-    if source_type is None or source_type == "long_term":
-        data = memory_manager._load_memory_json()
-        memories = [MemoryEntry.from_dict(m) for m in data.get("memories", [])]
+    # 长期记忆：先算关键词匹配得分，再经物化视图批量乘以重要性与时间衰减
+    keyword_scores = [count_matches(content_lower) / len(keywords) for _, content_lower in memory_candidates]
+    if use_decay:
+        scores = keyword_scores[:]
+        view = _get_memory_view()
+        positions = [view["index"].get(m["id"]) for m, _ in memory_candidates]
+        mapped = [i for i, pos in enumerate(positions) if pos is not None]
+        batch = compute_relevance_batch(
+            view, [positions[i] for i in mapped], [keyword_scores[i] for i in mapped], now,
+        )
+        for i, score in zip(mapped, batch):
+            scores[i] = score
+        for i, pos in enumerate(positions):
+            if pos is None:
+                # 候选与视图读取间隙 memory.json 被修改：逐条计算
+                scores[i] = compute_relevance(MemoryEntry.from_dict(memory_candidates[i][0]), keyword_scores[i], now)
+    else:
+        scores = [ks * m["salience"] for ks, (m, _) in zip(keyword_scores, memory_candidates)]
+
+    for (m, _), score in zip(memory_candidates, scores):
+        results.append({
+            "id": m["id"],
+            "content": m["content"],
+            "category": m["category"],
+            "source": "memory.json",
+            "score": score,
+            "salience": m["salience"],
+        })
+
+    # 每日日志（短期记忆）
+    for content, content_lower, file_name in log_candidates:
+        keyword_score = count_matches(content_lower) / len(keywords)
+        results.append({
+            "content": content,
+            "source": f"logs/{file_name}",
+            "score": keyword_score * 0.5,  # 日志权重较低
+        })
 
-        for memory in memories:
-            content_lower = memory.content.lower()
-            if any(kw in content_lower for kw in keywords):
-                # 计算关键词匹配得分
-                keyword_score = sum(1 for kw in keywords if kw in content_lower) / len(keywords)
+    # 按得分排序并限制数量
+    results.sort(key=lambda x: x["score"], reverse=True)
+    return results[:top_k]
 
-                if use_decay:
-                    score = compute_relevance(memory, keyword_score, now)
-                else:
-                    score = keyword_score * memory.salience
 
-                results.append({
-                    "id": memory.id,
-                    "content": memory.content,
-                    "category": memory.category,
-                    "source": "memory.json",
-                    "score": score,
-                    "salience": memory.salience,
-                })
+def _scan_keyword_candidates(
+    keywords: list[str],
+    include_memories: bool,
+    include_logs: bool,
+) -> tuple[list[tuple[dict, str]], list[tuple[str, str, str]]]:
+    """逐条扫描 memory.json 与日志文件查找关键词候选（SQLite 存储不可用时的回退）
 
-    # 搜索每日日志（短期记忆）
-    if source_type is None or source_type == "daily_log":
-        import json
+    返回格式与 MemorySearchStore.keyword_candidates 相同。
+    """
+    memories = []
+    logs = []
+    count_matches = _keyword_counter(tuple(keywords))
+
+    if include_memories:
+        from memory.manager import memory_manager
+        data = memory_manager._load_memory_json()
+        for m in data.get("memories", []):
+            content_lower = m.get("content", "").lower()
+            if count_matches(content_lower):
+                entry = MemoryEntry.from_dict(m)
+                memories.append(({
+                    "id": entry.id,
+                    "content": entry.content,
+                    "category": entry.category,
+                    "salience": entry.salience,
+                    "last_accessed": entry.last_accessed,
+                }, content_lower))
+
+    if include_logs:
+        from memory.manager import memory_manager
+        memory_manager.flush_pending_logs()
         logs_dir = settings.memory_dir / "logs"
         if logs_dir.exists():
-            for log_file in sorted(logs_dir.glob("*.json"), reverse=True):
+            log_files = sorted(logs_dir.glob("*.json"), reverse=True)
+            for log_file, (log_data, error) in zip(log_files, _read_log_files(log_files)):
+                if error is not None:
+                    continue
                 try:
-                    log_data = json.loads(log_file.read_text(encoding="utf-8"))
                     for entry in log_data.get("entries", []):
                         content = entry.get("content", "")
                         content_lower = content.lower()
-                        if any(kw in content_lower for kw in keywords):
-                            keyword_score = sum(1 for kw in keywords if kw in content_lower) / len(keywords)
-                            results.append({
-                                "content": content,
-                                "source": f"logs/{log_file.name}",
-                                "score": keyword_score * 0.5,  # 日志权重较低
-                            })
+                        if count_matches(content_lower):
+                            logs.append((content, content_lower, log_file.name))
                 except Exception:
                     pass
 
-    # 按得分排序并限制数量
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results[:top_k]
+    return memories, logs
 
 
 def search_memories(
@@ -347,124 +778,286 @@ def search_memories(
     use_decay: bool = True,
     category: Optional[str] = None,
     source_type: Optional[str] = None,
+    mode: str = "hybrid",
 ) -> list[dict]:
     """搜索记忆
 
-    先尝试向量搜索，失败时 fallback 到关键词搜索。
-
     Args:
         query: 搜索查询
         top_k: 返回数量
         use_decay: 是否使用时间衰减
         category: 分类过滤（可选）
         source_type: 来源类型过滤（long_term/daily_log，可选）
+        mode: 搜索模式
+            - "hybrid"（默认）：向量与关键词检索并发执行，按 RRF 融合排名；向量不可用时只用关键词
+            - "vector"：向量搜索，失败时 fallback 到关键词搜索
+            - "keyword"：只做关键词搜索，无需 embedding API（低延迟场景）
 
     Returns:
         搜索结果列表，每项包含：
         - content: 内容
         - source: 来源
-        - score: 得分
+        - score: 得分（hybrid 模式下为来源检索的得分，不是融合得分）
+        - rrf_score: RRF 融合得分，仅 hybrid 模式（用于排序）
         - id: ID（可选）
         - category: 分类（可选）
         - salience: 重要性（可选）
     """
-    # 尝试向量搜索：先在锁内获取引擎引用，再在锁外执行查询
-    query_engine = None
+    # 先写出缓冲中的每日日志：写出时会使结果缓存失效，刚追加的日志不会被旧结果遮住
+    from memory.manager import memory_manager
+    memory_manager.flush_pending_logs()
+
     with _index_lock:
-        query_engine = _memory_query_engine
+        epoch = _cache_epoch
+    cache_key = repr((epoch, _data_fingerprint(memory_manager), query, top_k, use_decay, category, source_type, mode))
+    cached = _result_cache.get(cache_key)
+    if cached is None:
+        cached = _search_memories_uncached(query, top_k, use_decay, category, source_type, mode)
+        _result_cache.set(cache_key, cached)
+    # 返回副本：调用方（如 get_implicit_recall）会修改结果列表
+    return [dict(r) for r in cached]
 
-    if query_engine is not None or settings.memory_index_enabled:
-        if query_engine is None:
-            build_or_load_memory_index()
-            with _index_lock:
-                query_engine = _memory_query_engine
 
-        if query_engine is not None:
-            try:
-                response = query_engine.query(query)
-                if hasattr(response, "source_nodes") and response.source_nodes:
-                    results = []
-                    now = datetime.now()
-
-                    # 一次性加载 memory.json 用于衰减计算，避免循环内重复读取
-                    memory_map = {}
-                    if use_decay:
-                        from memory.manager import memory_manager
-                        data = memory_manager._load_memory_json()
-                        memory_map = {
-                            m.get("id"): m for m in data.get("memories", [])
-                        }
-
-                    for node in response.source_nodes[:top_k * 2]:  # 获取更多用于过滤
-                        text = node.node.get_content()
-                        metadata = node.metadata
-                        semantic_score = getattr(node, "score", 0.5)
-                        salience = metadata.get("salience", 0.5)
-
-                        # 来源类型过滤（long_term / daily_log）
-                        if source_type and metadata.get("type") != source_type:
-                            continue
-
-                        # 分类过滤
-                        if category and metadata.get("category") != category:
-                            continue
-
-                        # 计算综合得分
-                        if use_decay:
-                            entry_id = metadata.get("id")
-                            m = memory_map.get(entry_id) if entry_id else None
-                            if m:
-                                entry = MemoryEntry.from_dict(m)
-                                score = compute_relevance(entry, semantic_score, now)
-                            else:
-                                score = semantic_score * salience
-                        else:
-                            score = semantic_score * salience
-
-                        results.append({
-                            "id": metadata.get("id"),
-                            "content": text[:300],
-                            "category": metadata.get("category"),
-                            "source": metadata.get("source", "unknown"),
-                            "score": score,
-                            "salience": salience,
-                        })
-
-                    # 按综合得分排序
-                    results.sort(key=lambda x: x["score"], reverse=True)
-                    return results[:top_k]
+def _data_fingerprint(memory_manager) -> tuple:
+    """memory.json、事件日志与每日日志文件的指纹，作为结果缓存键的一部分
 
-            except Exception as e:
-                logger.warning(f"向量搜索失败，fallback 到关键词搜索: {e}")
+    绕过 MemoryManager 的写入（如编辑器直接保存 memory.json 或日志）不会递增 _cache_epoch，
+    靠指纹让旧结果失效；日志目录取 (文件数, 最大 mtime_ns, 总大小)，原地改写也能感知。
+    """
+    try:
+        st = memory_manager.memory_file.stat()
+        memory_key = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        memory_key = None
+    count = latest = total = 0
+    try:
+        with os.scandir(memory_manager.logs_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    st = entry.stat()
+                    count += 1
+                    latest = max(latest, st.st_mtime_ns)
+                    total += st.st_size
+    except FileNotFoundError:
+        pass
+    return memory_key, memory_manager._events_size(), (count, latest, total)
+
+
+def _search_memories_uncached(
+    query: str,
+    top_k: int,
+    use_decay: bool,
+    category: Optional[str],
+    source_type: Optional[str],
+    mode: str = "hybrid",
+) -> list[dict]:
+    """search_memories 的实际检索逻辑（不经过结果缓存）"""
+    if mode == "hybrid":
+        return _hybrid_search(query, top_k, use_decay, category, source_type)
+
+    if mode != "keyword":
+        # 尝试向量搜索（多取一些用于过滤）
+        hits = _vector_hits(query, top_k * 2)
+        if hits:
+            return _rank_vector_hits(hits, top_k, use_decay, category, source_type)
 
     # Fallback 到关键词搜索
-    results = keyword_search(query, top_k, use_decay, source_type=source_type)
+    return _filter_category(keyword_search(query, top_k, use_decay, source_type=source_type), category)
+
 
-    # 分类过滤
-    if category:
-        results = [r for r in results if r.get("category") == category]
+def _vector_hits(query: str, limit: int) -> Optional[list[tuple[str, dict, float]]]:
+    """按配置选择向量检索后端，返回 (文本, 元数据, 语义相似度) 列表，不可用时返回 None"""
+    if settings.memory_use_vec_index:
+        return _sqlite_vector_hits(query, limit) if settings.memory_index_enabled else None
+    return _llama_vector_hits(query, limit)
 
-    return results
+
+def _filter_category(results: list[dict], category: Optional[str]) -> list[dict]:
+    """分类过滤（category 为空时原样返回）"""
+    if not category:
+        return results
+    return [r for r in results if r.get("category") == category]
+
+
+def _hybrid_search(
+    query: str,
+    top_k: int,
+    use_decay: bool,
+    category: Optional[str],
+    source_type: Optional[str],
+) -> list[dict]:
+    """混合检索：向量与关键词结果按加权倒数排名融合（RRF）
+
+    向量检索擅长语义改写，关键词检索擅长精确的名称/ID，两者互补。
+    关键词检索在后台线程执行，与查询 embedding（网络请求）重叠；
+    两路结果各自已按 重要性（× 时间衰减）排序，融合得分 = Σ 权重 / (RRF_K + 排名)。
+    融合得分只用于排序，写入 rrf_score；score 保留该条目在来源检索中的得分（优先向量），
+    与 vector/keyword 模式含义一致。
+    """
+    limit = top_k * 2
+    keyword_future = _search_executor.submit(keyword_search, query, limit, use_decay, source_type)
+    hits = _vector_hits(query, limit)
+    try:
+        keyword_results = _filter_category(keyword_future.result(), category)
+    except Exception as e:
+        # 与向量不可用时只用关键词对称：关键词检索失败时只用向量结果
+        logger.warning(f"混合检索中关键词检索失败，只使用向量结果: {e}")
+        keyword_results = []
+    if not hits:
+        return keyword_results[:top_k]
+    vector_results = _rank_vector_hits(hits, limit, use_decay, category, source_type)
+
+    fused: dict = {}
+    for results, weight in ((vector_results, _HYBRID_VECTOR_WEIGHT), (keyword_results, _HYBRID_KEYWORD_WEIGHT)):
+        for rank, r in enumerate(results, 1):
+            # 日志条目没有 id，按来源 + 内容（与向量结果同样截断）识别
+            key = r.get("id") or (r["source"], r["content"][:300])
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**r, "rrf_score": 0.0}
+            entry["rrf_score"] += weight / (_RRF_K + rank)
+
+    results = sorted(fused.values(), key=lambda x: x["rrf_score"], reverse=True)
+    return results[:top_k]
+
+
+def _llama_vector_hits(query: str, limit: int) -> Optional[list[tuple[str, dict, float]]]:
+    """LlamaIndex 向量检索，返回 (文本, 元数据, 语义相似度) 列表，不可用时返回 None"""
+    # 先在锁内获取引擎引用，再在锁外执行查询
+    with _index_lock:
+        query_engine = _memory_query_engine
+
+    if query_engine is None and settings.memory_index_enabled:
+        build_or_load_memory_index()
+        with _index_lock:
+            query_engine = _memory_query_engine
+    if query_engine is None:
+        return None
+    _apply_pending_index_updates()
+
+    try:
+        response = query_engine.query(query)
+    except Exception as e:
+        logger.warning(f"向量搜索失败，fallback 到关键词搜索: {e}")
+        return None
+    if not getattr(response, "source_nodes", None):
+        return None
+    return [
+        (node.node.get_content(), node.metadata, getattr(node, "score", 0.5))
+        for node in response.source_nodes[:limit]
+    ]
+
+
+def _get_embed_model_and_name():
+    """获取 embedding 模型实例及模型名，不可用时返回 (None, None)"""
+    with _index_lock:
+        try:
+            embed_model = _create_embed_model()
+        except ImportError as e:
+            logger.warning(f"LlamaIndex 不可用，将使用关键词搜索: {e}")
+            return None, None
+        if embed_model is None:
+            return None, None
+        return embed_model, _embed_model_key[2]
+
+
+def _sqlite_vector_hits(query: str, limit: int) -> Optional[list[tuple[str, dict, float]]]:
+    """SQLite 向量检索（sqlite-vec / 内存暴力计算），返回格式同 _llama_vector_hits
+
+    绕过 LlamaIndex query_engine：查询只做一次 embedding，KNN 直接在存储中完成。
+    """
+    embed_model, model_name = _get_embed_model_and_name()
+    if embed_model is None:
+        return None
+    try:
+        query_embedding = embed_model.get_query_embedding(query)
+        hits = search_store.vector_candidates(
+            query_embedding, embed_model.get_text_embedding_batch, model_name, limit,
+        )
+    except Exception as e:
+        logger.warning(f"向量搜索失败，fallback 到关键词搜索: {e}")
+        return None
+    if hits is None:
+        return None
+    return [(meta["content"], meta, score) for meta, score in hits]
+
+
+def _rank_vector_hits(
+    hits: list[tuple[str, dict, float]],
+    top_k: int,
+    use_decay: bool,
+    category: Optional[str],
+    source_type: Optional[str],
+) -> list[dict]:
+    """过滤向量检索结果并按 语义相似度 × 重要性（× 时间衰减）排序"""
+    # 来源类型（long_term / daily_log）与分类过滤
+    kept = [
+        (text, metadata, semantic_score)
+        for text, metadata, semantic_score in hits
+        if (not source_type or metadata.get("type") == source_type)
+        and (not category or metadata.get("category") == category)
+    ]
+
+    # 基础得分：语义相似度 × 重要性（来自索引元数据）
+    scores = [semantic_score * metadata.get("salience", 0.5) for _, metadata, semantic_score in kept]
+
+    # 长期记忆：按物化视图中的最新重要性与访问时间一次性计算衰减得分
+    if use_decay and kept:
+        view = _get_memory_view()
+        positions = [
+            view["index"].get(metadata["id"]) if metadata.get("id") else None
+            for _, metadata, _ in kept
+        ]
+        mapped = [i for i, pos in enumerate(positions) if pos is not None]
+        batch = compute_relevance_batch(
+            view, [positions[i] for i in mapped], [kept[i][2] for i in mapped],
+        )
+        for i, score in zip(mapped, batch):
+            scores[i] = score
+
+    results = [
+        {
+            "id": metadata.get("id"),
+            "content": text[:300],
+            "category": metadata.get("category"),
+            "source": metadata.get("source", "unknown"),
+            "score": score,
+            "salience": metadata.get("salience", 0.5),
+        }
+        for (text, metadata, _), score in zip(kept, scores)
+    ]
+
+    # 按综合得分排序
+    results.sort(key=lambda x: x["score"], reverse=True)
+    return results[:top_k]
 
 
 def rebuild_memory_index() -> str:
     """强制重建记忆搜索索引"""
-    global _memory_index, _memory_query_engine
+    global _memory_index, _memory_query_engine, _index_dirty
+
+    if settings.memory_use_vec_index:
+        embed_model, model_name = _get_embed_model_and_name()
+        if embed_model is None:
+            return "⚠️ 没有记忆文档需要索引"
+        try:
+            count = search_store.rebuild_vectors(embed_model.get_text_embedding_batch, model_name)
+        except Exception as e:
+            logger.warning(f"重建记忆向量索引失败: {e}")
+            return f"❌ 记忆索引重建失败: {e}"
+        return "✅ 记忆索引重建成功" if count else "⚠️ 没有记忆文档需要索引"
 
     with _index_lock:
-        # 清除现有索引
+        # 清除现有索引，并标记为脏：构建时会删除持久化目录后从头构建
         _memory_index = None
         _memory_query_engine = None
+        _index_dirty = True
+        _index_pending.clear()
 
-        # 删除持久化目录
-        persist_dir = settings.storage_dir / "memory_index"
-        if persist_dir.exists():
-            import shutil
-            shutil.rmtree(persist_dir)
-            logger.info("已删除旧的记忆索引")
-
-    # 重建（build_or_load_memory_index 内部自带 _index_lock）
-    build_or_load_memory_index()
+    # 重建；若已有构建进行中，等其结束（其结果因已置脏不会被安装）后再构建
+    if settings.memory_index_enabled:
+        while not _try_build_memory_index():
+            _index_build_done.wait()
 
     with _index_lock:
         if _memory_index is not None:
@@ -500,14 +1093,15 @@ def get_implicit_recall(
     if include_procedural:
         from memory.manager import memory_manager
         procedural = memory_manager.get_procedural_memories()
-        # 按 salience 排序，取 top 3
-        procedural.sort(key=lambda x: x.get("salience", 0), reverse=True)
+        # 按 salience 取 top 3（无需整体排序）
+        top_procedural = heapq.nlargest(3, procedural, key=lambda x: x.get("salience", 0))
 
-        # 基于内容前缀去重（日志型结果可能没有 id 字段，字段名也不统一）
-        existing_contents = {r.get("content", "")[:100] for r in results}
-        for p in procedural[:3]:
+        # 去重：长期记忆按 id（向量结果的内容被截断），日志型结果没有 id，按完整内容
+        existing_ids = {r["id"] for r in results if r.get("id")}
+        existing_contents = {r.get("content", "") for r in results}
+        for p in top_procedural:
             p_content = p.get("content", "")
-            if p_content[:100] not in existing_contents:
+            if p.get("entry_id") not in existing_ids and p_content not in existing_contents:
                 results.append({
                     "id": p.get("entry_id"),
                     "content": p_content,
@@ -516,22 +1110,60 @@ def get_implicit_recall(
                     "score": p.get("salience", 0.5),
                     "salience": p.get("salience", 0.5),
                 })
-                existing_contents.add(p_content[:100])
+                existing_contents.add(p_content)
 
     return results[:top_k + 3]  # 允许额外的 procedural
 
 
-def invalidate_memory_index() -> None:
-    """使记忆索引失效，下次搜索时自动懒加载重建
+def invalidate_memory_index(
+    added: Optional[list[str]] = None,
+    removed: Optional[list[str]] = None,
+    updated: Optional[list[str]] = None,
+) -> None:
+    """使记忆索引失效
 
     由 MemoryManager 的增删改操作调用，实现自然节流：
-    多次快速写入只会在下一次搜索时触发一次重建。
+    传入变更的条目 id 时为增量失效，只登记这些条目，下次向量搜索前删除/重新插入对应节点，
+    多次快速写入合并为一次更新。
+    不传参数（如 compressor 批量合并后）时整体失效：同时设置 _index_dirty 标记，
+    使 build_or_load_memory_index 清除持久化目录后从头构建，而不是从磁盘加载过时的旧索引。
 
-    关键：同时设置 _index_dirty 标记，使 build_or_load_memory_index
-    清除持久化目录后从头构建，而不是从磁盘加载过时的旧索引。
+    Args:
+        added: 新增的条目 id
+        removed: 删除的条目 id
+        updated: 修改的条目 id
     """
-    global _memory_index, _memory_query_engine, _index_dirty
+    global _memory_index, _memory_query_engine, _index_dirty, _cache_epoch
     with _index_lock:
-        _memory_index = None
-        _memory_query_engine = None
-        _index_dirty = True
+        if added is None and removed is None and updated is None:
+            _memory_index = None
+            _memory_query_engine = None
+            _index_dirty = True
+            _index_pending.clear()
+        else:
+            _index_pending.update(added or ())
+            _index_pending.update(removed or ())
+            _index_pending.update(updated or ())
+        _cache_epoch += 1
+    _iso_to_naive_local.cache_clear()
+
+
+def invalidate_search_results() -> None:
+    """使 search_memories 结果缓存失效（不影响向量索引）
+
+    由 MemoryManager 在每日日志变化时调用：日志内容参与搜索，但无需为此重建索引。
+    """
+    global _cache_epoch
+    with _index_lock:
+        _cache_epoch += 1
+
+
+def get_index_cache_stats() -> dict:
+    """search_memories 结果缓存的命中统计"""
+    stats = _result_cache.get_stats()
+    return {
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "hit_rate": stats["hit_rate"],
+        "size": stats["size"],
+    }
@@ -8,13 +8,23 @@
 1. 会话后自动反思 → 本模块
 2. Agent 主动调用 memory_write → consolidator
 """
-import json
+import asyncio
 import logging
 import re
+from functools import partial
 from typing import Optional
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+# LLM 返回中的 markdown 代码块（模块加载时预编译）
+_JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*\n?(.*?)```', re.DOTALL)
+
+# 流式回复以这些内容开头时表示无需记录（_parse_llm_response 对二者都返回空结果）
+_EMPTY_RESULTS = ("null", "[]")
+_EMPTY_PREFIX_LEN = 32
+
 
 async def reflect_on_session(
     session_messages: list[dict],
@@ -24,7 +34,7 @@ async def reflect_on_session(
     """会话结束后统一反思 — 1 次 LLM 调用完成所有记忆工作
 
     工作流程：
-    1. 从 session_messages 提取关键词，搜索 top-10 现有相关记忆
+    1. 以最后一条用户消息为查询，在后台搜索 top-10 现有相关记忆（与步骤 2 的文本拼接并发）
     2. 构建统一 Prompt（对话摘要 + 工具调用时间线 + 现有记忆）
     3. 1 次 LLM 调用，输出 JSON 对象：{session_summary, decisions: [{action, content, ...}]}
     4. 执行 ADD/UPDATE/NOOP 决策
@@ -41,7 +51,22 @@ async def reflect_on_session(
         return {"decisions": [], "session_summary": ""}
 
     try:
-        # 1. 构建对话摘要
+        # 1. 用最后一条用户消息作为搜索查询，先在后台线程启动检索（含 embedding 网络请求），
+        #    与下面的对话摘要、工具时间线拼接并发执行
+        query = ""
+        for msg in reversed(session_messages):
+            if msg.get("role") == "user" and msg.get("content"):
+                query = msg["content"][:200]
+                break
+        search_task = None
+        if query:
+            from memory.search import search_memories
+            # run_in_executor 立即提交到线程池（create_task + to_thread 要等到下一次 await 才开始）
+            search_task = asyncio.get_running_loop().run_in_executor(
+                None, partial(search_memories, query, top_k=10, use_decay=False),
+            )
+
+        # 2. 构建对话摘要
         conversation_lines = []
         for msg in session_messages[-10:]:
             role = msg.get("role", "unknown")
@@ -51,23 +76,10 @@ async def reflect_on_session(
         conversation = "\n".join(conversation_lines)
 
         if not conversation.strip():
+            if search_task is not None:
+                search_task.cancel()
             return {"decisions": [], "session_summary": ""}
 
-        # 2. 提取关键词并搜索现有记忆
-        existing_memories = []
-        try:
-            # 用最后一条用户消息作为搜索查询
-            query = ""
-            for msg in reversed(session_messages):
-                if msg.get("role") == "user" and msg.get("content"):
-                    query = msg["content"][:200]
-                    break
-            if query:
-                from memory.search import search_memories
-                existing_memories = search_memories(query, top_k=10, use_decay=False)
-        except Exception as e:
-            logger.debug("搜索现有记忆失败（非致命）: %s", e)
-
         # 3. 构建工具调用时间线
         tool_timeline = ""
         if tool_calls:
@@ -75,13 +87,22 @@ async def reflect_on_session(
             for i, tc in enumerate(tool_calls[:10], 1):
                 tool_name = tc.get("tool", "unknown")
                 output = tc.get("output", "")
-                is_error = "[ERROR]" in output
+                # 执行失败的输出以 [ERROR] 开头（由 agent/executor 节点生成）
+                is_error = output.startswith("[ERROR]")
                 status = "失败" if is_error else "成功"
                 lines.append(f"  {i}. {tool_name} → {status}")
                 if is_error:
                     lines.append(f"     错误: {output[:150]}")
             tool_timeline = "\n".join(lines)
 
+        # 等待现有记忆检索结果
+        existing_memories = []
+        if search_task is not None:
+            try:
+                existing_memories = await search_task
+            except Exception as e:
+                logger.debug("搜索现有记忆失败（非致命）: %s", e)
+
         # 4. 构建现有记忆上下文
         existing_context = ""
         if existing_memories:
@@ -131,8 +152,7 @@ async def reflect_on_session(
         # 6. 调用 LLM（唯一的一次调用）
         from engine.llm_factory import create_llm
         llm = create_llm(streaming=False)
-        response = await llm.ainvoke(prompt)
-        result = response.content.strip()
+        result = await _stream_response(llm, prompt)
 
         # 7. 解析 JSON
         parsed = _parse_llm_response(result)
@@ -157,7 +177,7 @@ async def execute_reflect_results(
         session_id: 会话 ID
     """
     from memory.manager import memory_manager
-    from memory.models import VALID_CATEGORIES
+    from memory.models import VALID_CATEGORIES_SET
 
     # 兼容新旧格式
     if isinstance(results, dict):
@@ -181,7 +201,7 @@ async def execute_reflect_results(
             continue
 
         # 分类校验
-        if category not in VALID_CATEGORIES:
+        if category not in VALID_CATEGORIES_SET:
             category = "general"
 
         # 限制 salience 范围
@@ -194,7 +214,7 @@ async def execute_reflect_results(
                 if category == "procedural":
                     context = {"learned_from": session_id}
 
-                memory_manager.add_entry(
+                await memory_manager.add_entry_async(
                     content=content,
                     category=category,
                     salience=salience,
@@ -205,7 +225,7 @@ async def execute_reflect_results(
                 add_count += 1
 
             elif action == "UPDATE" and target_id:
-                memory_manager.update_entry(
+                await memory_manager.update_entry_async(
                     entry_id=target_id,
                     content=content,
                     salience=salience,
@@ -219,7 +239,7 @@ async def execute_reflect_results(
 
     # 写入对话摘要到日志（始终写入，无论是否产生新记忆）
     if session_summary:
-        memory_manager.append_daily_log(
+        await memory_manager.append_daily_log_async(
             content=session_summary,
             log_type="reflection",
         )
@@ -227,7 +247,7 @@ async def execute_reflect_results(
                      session_summary, add_count, update_count, session_id)
     elif add_count > 0 or update_count > 0:
         # 兜底：如果没有摘要但有记忆变更，仍记录一条
-        memory_manager.append_daily_log(
+        await memory_manager.append_daily_log_async(
             content=f"会话产生 {add_count} 条新记忆, {update_count} 条更新",
             log_type="reflection",
         )
@@ -235,12 +255,29 @@ async def execute_reflect_results(
                      add_count, update_count, session_id)
 
 
+async def _stream_response(llm, prompt: str) -> str:
+    """流式获取 LLM 回复；开头已能判定为空结果（null / []）时提前结束生成"""
+    chunks = []
+    head = ""
+    async for chunk in llm.astream(prompt):
+        chunks.append(chunk.content)
+        if len(head) < _EMPTY_PREFIX_LEN:
+            head = "".join(chunks).lstrip()
+            if head.lower().startswith(_EMPTY_RESULTS):
+                logger.debug("反思结果为空，提前结束生成")
+                break
+    return "".join(chunks).strip()
+
+
 def _extract_json(text: str) -> str:
     """从可能包含 markdown 代码块的文本中提取 JSON
 
     支持 ```json、``` 等多种代码块格式，以及无代码块的纯文本。
     """
-    match = re.search(r'```(?:json)?\s*\n?(.*?)```', text, re.DOTALL)
+    # 快速路径：不含代码块标记时无需正则匹配
+    if "```" not in text:
+        return text.strip()
+    match = _JSON_BLOCK_RE.search(text)
     if match:
         return match.group(1).strip()
     return text.strip()
@@ -254,7 +291,7 @@ def _parse_llm_response(result: str) -> dict:
     result = _extract_json(result)
 
     try:
-        parsed = json.loads(result)
+        parsed = orjson.loads(result)
 
         # 新格式：{"session_summary": "...", "decisions": [...]}
         if isinstance(parsed, dict):
@@ -282,6 +319,6 @@ def _parse_llm_response(result: str) -> dict:
 
         return {"session_summary": session_summary, "decisions": valid}
 
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.warning("无法解析反思结果 JSON: %s", result[:200])
         return {"session_summary": "", "decisions": []}
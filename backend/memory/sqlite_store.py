@@ -0,0 +1,632 @@
+"""SQLite 检索存储 — 关键词搜索的 FTS5 全文索引 + 向量 KNN 索引
+
+将 memory.json 条目与每日日志镜像到 storage/memory_search.db 的 FTS5 虚表中，
+keyword_search 直接在 SQLite 内筛选候选条目，不再每次查询都重新解析全部 JSON。
+
+设计要点：
+- trigram 分词器（区分大小写，索引小写化内容）：中文无需分词即可做子串匹配，
+  与原来的 `kw in content.lower()` 语义一致
+- trigram 只能索引 ≥3 个字符的子串；查询含更短关键词时改用 instr() 在库内扫描
+- 同步方式：按 memory.json + 事件日志、每个日志文件的 (mtime_ns, size) 判断
+  是否需要重建对应部分，MemoryManager、compressor 写入以及手动编辑都能被感知
+- SQLite 不支持 FTS5 trigram（< 3.34）时 available 为 False，调用方回退到逐条扫描
+
+向量检索（MEMORY_USE_VEC_INDEX=true 时由 search_memories 使用）：
+- vectors 表按 key（"mem:<id>" / "log:<文件名>:<序号>"）保存 float32 向量，
+  内容与模型均未变的文档不会重新调用 embedding API
+- 安装了 sqlite-vec 且 sqlite3 支持加载扩展时，KNN 由 vec0 虚表完成；
+  否则在内存中的归一化矩阵上暴力计算余弦相似度
+- MEMORY_EMBEDDING_QUANT 控制 KNN 索引中的向量精度（vectors 表始终保存 float32 原值）：
+  fp32 / int8（按向量缩放到 [-127, 127]，体积 1/4）/ binary（符号位，体积 1/32，按汉明距离计算）；
+  未安装 numpy 且未加载 sqlite-vec 时始终按 fp32 计算
+"""
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Callable, Optional
+
+import orjson
+
+# sqlite-vec 为可选依赖：未安装或 sqlite3 不支持加载扩展时退化为内存暴力检索
+try:
+    import sqlite_vec
+except ImportError:
+    sqlite_vec = None
+
+# numpy 为可选依赖：缺失时暴力检索使用纯 Python 点积
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from config import settings
+from memory.models import MemoryEntry
+
+logger = logging.getLogger(__name__)
+
+# 表结构版本：结构变化时递增，旧库会被删除重建
+_SCHEMA_VERSION = 2
+# trigram 分词器能索引的最短子串长度
+_TRIGRAM_MIN_LEN = 3
+
+# vec0 虚表的向量列定义，以及写入/查询时包装 float32 字节的 SQL 表达式（按量化方式）
+_VEC_COLUMNS = {
+    "fp32": "float[{dim}] distance_metric=cosine",
+    "int8": "int8[{dim}] distance_metric=cosine",
+    "binary": "bit[{dim}]",
+}
+_VEC_EXPRS = {
+    "fp32": "?",
+    "int8": "vec_int8(?)",
+    "binary": "vec_quantize_binary(?)",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS memories USING fts5(
+    content_lower, content UNINDEXED, id UNINDEXED, category UNINDEXED,
+    salience UNINDEXED, last_accessed UNINDEXED, pos UNINDEXED,
+    tokenize = 'trigram case_sensitive 1'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS logs USING fts5(
+    content_lower, content UNINDEXED, file UNINDEXED, pos UNINDEXED,
+    tokenize = 'trigram case_sensitive 1'
+);
+CREATE TABLE IF NOT EXISTS log_files (name TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, content TEXT, model TEXT, embedding BLOB);
+"""
+
+
+def _match_clause(table: str, keywords: list[str]) -> tuple[str, list[str]]:
+    """构造“任一关键词命中”的 WHERE 子句
+
+    所有关键词都足够长时走 FTS5 索引（OR 连接的短语查询），
+    否则用 instr() 扫描（FTS5 的 MATCH 不能与其他条件 OR 组合）。
+    """
+    if all(len(kw) >= _TRIGRAM_MIN_LEN for kw in keywords):
+        expr = " OR ".join('"' + kw.replace('"', '""') + '"' for kw in keywords)
+        return f"{table} MATCH ?", [expr]
+    return " OR ".join(["instr(content_lower, ?) > 0"] * len(keywords)), list(keywords)
+
+
+def _pack_vector(vector: list[float]) -> bytes:
+    """float 向量 → float32 字节（sqlite-vec 的原生格式）"""
+    return array("f", vector).tobytes()
+
+
+def _quant_mode() -> str:
+    """当前向量量化方式，无法识别的配置值按 fp32 处理"""
+    quant = settings.memory_embedding_quant.lower()
+    return quant if quant in _VEC_COLUMNS else "fp32"
+
+
+def _quantize_int8(blob: bytes) -> bytes:
+    """float32 向量字节 → int8 字节（按向量最大绝对值缩放到 [-127, 127]）
+
+    vec0 按余弦距离比较，与缩放系数无关，因此只需保存量化后的值。
+    """
+    if np is not None:
+        vector = np.frombuffer(blob, dtype=np.float32)
+        peak = float(np.abs(vector).max()) if len(vector) else 0.0
+        scale = peak / 127 if peak > 0 else 1.0
+        return np.round(vector / scale).astype(np.int8).tobytes()
+    vector = array("f", blob)
+    peak = max((abs(x) for x in vector), default=0.0)
+    scale = peak / 127 if peak > 0 else 1.0
+    return array("b", (round(x / scale) for x in vector)).tobytes()
+
+
+def _normalize(vector: list[float]) -> list[float]:
+    norm = sum(x * x for x in vector) ** 0.5
+    return [x / norm for x in vector] if norm > 0 else list(vector)
+
+
+class MemorySearchStore:
+    """memory.json 与每日日志的 SQLite FTS5 镜像
+
+    所有操作在 _lock 内串行执行（向量同步时的 embedding API 调用除外），
+    连接跨线程共享（check_same_thread=False）。
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = db_path or settings.storage_dir / "memory_search.db"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # None 表示尚未尝试连接
+        self._available: Optional[bool] = None
+        self._memories_key: Optional[str] = None
+        self._log_files: dict[str, tuple[int, int]] = {}
+        # memories/logs 表内容每变化一次加 1，用于判断向量是否需要同步
+        self._docs_version = 0
+        # 向量状态：(docs_version, model, 量化方式)、rowid → 文档元数据、暴力检索用的矩阵
+        self._vec_state: Optional[tuple[int, str, str]] = None
+        # vectors 表每次写入/清空加 1，锁外计算向量期间表被其他线程改动时据此重新计算差异
+        self._vec_generation = 0
+        self._vec_meta: dict[int, dict] = {}
+        self._vec_rowids: list[int] = []
+        self._vec_matrix = None
+        # int8 量化时各行的缩放系数；_vec_quant 为矩阵实际使用的量化方式
+        self._vec_scales = None
+        self._vec_quant = "fp32"
+        self._vec_dim = 0
+        self._vec_loaded = False
+
+    @property
+    def available(self) -> bool:
+        """当前 SQLite 是否支持 FTS5 trigram 索引（首次访问时建库）"""
+        with self._lock:
+            return self._ensure_conn() is not None
+
+    def _ensure_conn(self) -> Optional[sqlite3.Connection]:
+        """打开数据库并建表（需在 _lock 内调用），不可用时返回 None"""
+        if self._available is not None:
+            return self._conn
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._open()
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is None or row[0] != str(_SCHEMA_VERSION):
+                # 旧版本结构：删库重建（内容均可从 JSON 文件恢复）
+                conn.close()
+                self.db_path.unlink(missing_ok=True)
+                conn = self._open()
+                with conn:
+                    conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('schema_version', ?)",
+                        (str(_SCHEMA_VERSION),),
+                    )
+            self._memories_key = self._get_meta(conn, "memories_key")
+            self._log_files = {
+                name: (mtime_ns, size)
+                for name, mtime_ns, size in conn.execute("SELECT name, mtime_ns, size FROM log_files")
+            }
+        except sqlite3.Error as e:
+            logger.info("SQLite FTS5 检索存储不可用，关键词搜索将逐条扫描: %s", e)
+            self._available = False
+            self._conn = None
+            return None
+        self._conn = conn
+        self._available = True
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.executescript(_SCHEMA)
+        self._vec_loaded = False
+        if sqlite_vec is not None:
+            try:
+                conn.enable_load_extension(True)
+                sqlite_vec.load(conn)
+                conn.enable_load_extension(False)
+                self._vec_loaded = True
+            except (AttributeError, sqlite3.Error) as e:
+                # 部分 Python 发行版编译时关闭了扩展加载
+                logger.info("sqlite-vec 扩展加载失败，向量检索使用内存暴力计算: %s", e)
+        return conn
+
+    @staticmethod
+    def _get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _sync_memories(self, conn: sqlite3.Connection) -> None:
+        """memory.json 或事件日志变化时整体重建 memories 表"""
+        from memory.manager import memory_manager
+
+        # 先取指纹再读数据：读取期间文件若再次变化，下次查询会因指纹不一致重新同步
+        try:
+            st = memory_manager.memory_file.stat()
+            key = f"{st.st_mtime_ns}:{st.st_size}:{memory_manager._events_size()}"
+        except FileNotFoundError:
+            key = "missing"
+        if key == self._memories_key:
+            return
+
+        data = memory_manager._peek_memory_json()
+        rows = []
+        for pos, m in enumerate(data.get("memories", [])):
+            entry = MemoryEntry.from_dict(m)
+            rows.append((
+                entry.content.lower(), entry.content, entry.id, entry.category,
+                entry.salience, entry.last_accessed, pos,
+            ))
+        with conn:
+            conn.execute("DELETE FROM memories")
+            conn.executemany("INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('memories_key', ?)", (key,))
+        self._memories_key = key
+        self._docs_version += 1
+
+    def _sync_logs(self, conn: sqlite3.Connection) -> None:
+        """只重新索引新增、修改过的日志文件，并清除已删除文件的条目"""
+        current: dict[str, tuple[int, int]] = {}
+        try:
+            with os.scandir(settings.memory_dir / "logs") as it:
+                for entry in it:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        st = entry.stat()
+                        current[entry.name] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            pass
+
+        changed = [name for name, key in current.items() if self._log_files.get(name) != key]
+        removed = [name for name in self._log_files if name not in current]
+        if not changed and not removed:
+            return
+
+        logs_dir = settings.memory_dir / "logs"
+        with conn:
+            for name in removed:
+                conn.execute("DELETE FROM logs WHERE file = ?", (name,))
+                conn.execute("DELETE FROM log_files WHERE name = ?", (name,))
+            for name in changed:
+                conn.execute("DELETE FROM logs WHERE file = ?", (name,))
+                try:
+                    entries = orjson.loads((logs_dir / name).read_bytes()).get("entries", [])
+                    rows = [
+                        (content.lower(), content, name, pos)
+                        for pos, content in enumerate(e.get("content", "") for e in entries)
+                        if isinstance(content, str)
+                    ]
+                except Exception as e:
+                    # 与逐条扫描一致：损坏的日志文件整体跳过，文件变化后会重新索引
+                    logger.debug("索引日志 %s 失败: %s", name, e)
+                    rows = []
+                conn.executemany("INSERT INTO logs VALUES (?, ?, ?, ?)", rows)
+                conn.execute(
+                    "INSERT OR REPLACE INTO log_files (name, mtime_ns, size) VALUES (?, ?, ?)",
+                    (name, *current[name]),
+                )
+        for name in removed:
+            del self._log_files[name]
+        for name in changed:
+            self._log_files[name] = current[name]
+        self._docs_version += 1
+
+    def _sync_vectors(
+        self,
+        conn: sqlite3.Connection,
+        embed_texts: Callable[[list[str]], list[list[float]]],
+        model: str,
+    ) -> None:
+        """为新增或内容变化的文档计算向量，删除失效向量，并同步 KNN 索引
+
+        只有 memories/logs 表或 embedding 模型变化后才会执行；
+        内容与模型都未变的文档沿用已存向量，不重复调用 embedding API。
+
+        需在不持有 _lock 时调用：差异计算与写库在锁内完成，embedding API（网络请求）在锁外调用，
+        关键词检索等操作不必等待。写库前发现文档或 vectors 表已被其他线程改动时重新计算差异，
+        已算好的向量按内容复用。
+        """
+        from memory.manager import memory_manager
+        memory_manager.flush_pending_logs()
+
+        embedded: dict[str, list[float]] = {}
+        while True:
+            with self._lock:
+                self._sync_memories(conn)
+                self._sync_logs(conn)
+                plan = self._plan_vectors(conn, model)
+                if plan is None:
+                    return
+                docs, missing = plan[1], plan[3]
+                texts = list(dict.fromkeys(
+                    docs[key][0] for key in missing if docs[key][0] not in embedded
+                ))
+                if not texts:
+                    self._apply_vectors(conn, plan, embedded)
+                    return
+                generation = self._vec_generation
+
+            # 网络调用在锁外；失败时直接抛出，由调用方降级
+            embedded.update(zip(texts, embed_texts(texts)))
+
+            with self._lock:
+                if self._docs_version == plan[0][0] and self._vec_generation == generation:
+                    self._apply_vectors(conn, plan, embedded)
+                    return
+
+    def _plan_vectors(
+        self, conn: sqlite3.Connection, model: str
+    ) -> Optional[tuple[tuple[int, str, str], dict[str, tuple[str, dict]], list[tuple[int]], list[str]]]:
+        """计算向量同步差异（需在 _lock 内调用）
+
+        Returns:
+            (目标状态, 文档 key → (内容, 元数据), 待删除的 rowid, 待计算向量的 key)；已是最新时返回 None
+        """
+        state = (self._docs_version, model, _quant_mode())
+        if state == self._vec_state:
+            return None
+
+        docs: dict[str, tuple[str, dict]] = {}
+        for entry_id, content, category, salience in conn.execute(
+            "SELECT id, content, category, salience FROM memories ORDER BY pos"
+        ):
+            if content.strip():
+                docs[f"mem:{entry_id}"] = (content, {
+                    "id": entry_id,
+                    "category": category,
+                    "salience": salience,
+                    "source": "memory.json",
+                    "type": "long_term",
+                })
+        for file_name, pos, content in conn.execute("SELECT file, pos, content FROM logs"):
+            if content.strip():
+                docs[f"log:{file_name}:{pos}"] = (content, {
+                    "source": f"logs/{file_name}",
+                    "type": "daily_log",
+                    "date": file_name.rsplit(".", 1)[0],
+                })
+
+        existing = {
+            key: (rowid, content, row_model)
+            for rowid, key, content, row_model in conn.execute(
+                "SELECT rowid, key, content, model FROM vectors"
+            )
+        }
+        stale = [
+            (rowid,) for key, (rowid, content, row_model) in existing.items()
+            if key not in docs or (content, row_model) != (docs[key][0], model)
+        ]
+        missing = [
+            key for key, (content, _) in docs.items()
+            if key not in existing or existing[key][1:] != (content, model)
+        ]
+        return state, docs, stale, missing
+
+    def _apply_vectors(
+        self,
+        conn: sqlite3.Connection,
+        plan: tuple[tuple[int, str, str], dict[str, tuple[str, dict]], list[tuple[int]], list[str]],
+        embedded: dict[str, list[float]],
+    ) -> None:
+        """按 _plan_vectors 的差异写入向量并重建内存中的检索结构（需在 _lock 内调用）
+
+        embedded 为 内容 → 向量，需覆盖 plan 中全部待计算的文档。
+        """
+        state, docs, stale, missing = plan
+        model = state[1]
+        with conn:
+            conn.executemany("DELETE FROM vectors WHERE rowid = ?", stale)
+            conn.executemany(
+                "INSERT INTO vectors (key, content, model, embedding) VALUES (?, ?, ?, ?)",
+                [(key, docs[key][0], model, _pack_vector(embedded[docs[key][0]])) for key in missing],
+            )
+            if self._vec_loaded:
+                self._sync_vec_index(conn, stale, missing, state[2])
+            elif stale or missing:
+                # vec0 索引（若有）已与 vectors 表不一致，下次加载 sqlite-vec 时整体重建
+                conn.execute("DELETE FROM meta WHERE key = 'vec_spec'")
+        self._vec_generation += 1
+
+        rows = conn.execute("SELECT rowid, key, embedding FROM vectors").fetchall()
+        self._vec_meta = {}
+        for rowid, key, _ in rows:
+            content, meta = docs[key]
+            self._vec_meta[rowid] = {**meta, "content": content}
+        self._vec_scales = None
+        if self._vec_loaded:
+            self._vec_rowids, self._vec_matrix = [], None
+        else:
+            self._vec_rowids = [rowid for rowid, _, _ in rows]
+            if np is not None:
+                self._build_matrix([blob for _, _, blob in rows], state[2])
+            else:
+                self._vec_matrix = [_normalize(array("f", blob)) for _, _, blob in rows]
+                self._vec_quant = "fp32"
+        self._vec_state = state
+
+    def _build_matrix(self, blobs: list[bytes], quant: str) -> None:
+        """构建暴力检索用的 numpy 矩阵（行已归一化，按量化方式压缩）"""
+        matrix = np.array([np.frombuffer(blob, dtype=np.float32) for blob in blobs], dtype=np.float32)
+        if len(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms > 0, norms, 1.0)
+        self._vec_dim = matrix.shape[1] if matrix.ndim == 2 else 0
+        self._vec_quant = quant
+        if quant == "int8" and len(matrix):
+            peaks = np.abs(matrix).max(axis=1)
+            scales = np.where(peaks > 0, peaks / 127, 1.0).astype(np.float32)
+            self._vec_scales = scales
+            matrix = np.round(matrix / scales[:, None]).astype(np.int8)
+        elif quant == "binary" and len(matrix):
+            matrix = np.packbits(matrix > 0, axis=1)
+        self._vec_matrix = matrix
+
+    def _sync_vec_index(
+        self,
+        conn: sqlite3.Connection,
+        stale: list[tuple[int]],
+        missing: list[str],
+        quant: str,
+    ) -> None:
+        """将 vectors 表的变更同步到 vec0 虚表（需在事务内调用）
+
+        向量维度（切换模型）或量化方式变化，或索引可能与 vectors 表不一致时整体重建。
+        """
+        row = conn.execute("SELECT length(embedding) FROM vectors LIMIT 1").fetchone()
+        dim = row[0] // 4 if row else None
+        spec = f"{quant}:{dim}"
+        if dim is not None and spec == self._get_meta(conn, "vec_spec"):
+            conn.executemany("DELETE FROM vec_index WHERE rowid = ?", stale)
+            rows = [
+                row for key in missing
+                for row in conn.execute("SELECT rowid, embedding FROM vectors WHERE key = ?", (key,))
+            ]
+        else:
+            conn.execute("DROP TABLE IF EXISTS vec_index")
+            conn.execute("DELETE FROM meta WHERE key = 'vec_spec'")
+            if dim is None:
+                self._vec_dim = 0
+                return
+            column = _VEC_COLUMNS[quant].format(dim=dim)
+            conn.execute(f"CREATE VIRTUAL TABLE vec_index USING vec0(embedding {column})")
+            conn.execute("INSERT INTO meta (key, value) VALUES ('vec_spec', ?)", (spec,))
+            rows = conn.execute("SELECT rowid, embedding FROM vectors").fetchall()
+        if quant == "int8":
+            rows = [(rowid, _quantize_int8(blob)) for rowid, blob in rows]
+        conn.executemany(
+            f"INSERT INTO vec_index (rowid, embedding) VALUES (?, {_VEC_EXPRS[quant]})",
+            rows,
+        )
+        self._vec_dim = dim
+        self._vec_quant = quant
+
+    def _knn(self, conn: sqlite3.Connection, query_embedding: list[float], limit: int) -> list[tuple[dict, float]]:
+        """返回与查询向量余弦相似度最高的 limit 个文档：(元数据, 相似度)"""
+        if not self._vec_meta or limit <= 0:
+            return []
+        quant = self._vec_quant
+        if self._vec_loaded:
+            query = _pack_vector(query_embedding)
+            if quant == "int8":
+                query = _quantize_int8(query)
+            rows = conn.execute(
+                f"SELECT rowid, distance FROM vec_index WHERE embedding MATCH {_VEC_EXPRS[quant]} "
+                "AND k = ? ORDER BY distance",
+                (query, limit),
+            )
+            if quant == "binary":
+                # 汉明距离 → [-1, 1] 的相似度估计（符号一致的维度占比）
+                return [(self._vec_meta[rowid], 1.0 - 2.0 * distance / self._vec_dim) for rowid, distance in rows]
+            return [(self._vec_meta[rowid], 1.0 - distance) for rowid, distance in rows]
+
+        if np is not None:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            query = query / norm if norm > 0 else query
+            scores = self._matrix_scores(query)
+            if limit < len(scores):
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._vec_meta[self._vec_rowids[i]], float(scores[i])) for i in top]
+
+        query = _normalize(query_embedding)
+        scores = [sum(a * b for a, b in zip(row, query)) for row in self._vec_matrix]
+        top = sorted(range(len(scores)), key=lambda i: -scores[i])[:limit]
+        return [(self._vec_meta[self._vec_rowids[i]], scores[i]) for i in top]
+
+    def _matrix_scores(self, query):
+        """numpy 矩阵上的余弦相似度（query 已归一化），按矩阵的量化方式计算"""
+        if self._vec_quant == "int8":
+            peak = float(np.abs(query).max())
+            scale = peak / 127 if peak > 0 else 1.0
+            query_int8 = np.round(query / scale).astype(np.int8)
+            # 整数点积以 int32 累加，避免 int8/int16 溢出
+            dots = np.einsum("ij,j->i", self._vec_matrix, query_int8, dtype=np.int32)
+            return dots * self._vec_scales * np.float32(scale)
+        if self._vec_quant == "binary":
+            diff = np.bitwise_xor(self._vec_matrix, np.packbits(query > 0))
+            if hasattr(np, "bitwise_count"):
+                hamming = np.bitwise_count(diff).sum(axis=1, dtype=np.int64)
+            else:
+                hamming = np.unpackbits(diff, axis=1).sum(axis=1, dtype=np.int64)
+            return 1.0 - 2.0 * hamming / self._vec_dim
+        return self._vec_matrix @ query
+
+    def keyword_candidates(
+        self,
+        keywords: list[str],
+        include_memories: bool = True,
+        include_logs: bool = True,
+    ) -> Optional[tuple[list[tuple[dict, str]], list[tuple[str, str, str]]]]:
+        """查找包含任一关键词（已小写化）的长期记忆与日志条目
+
+        Returns:
+            (memories, logs)：memories 为 (条目字典, 小写内容) 列表，按 memory.json 中的顺序；
+            logs 为 (内容, 小写内容, 文件名) 列表，按文件名倒序、文件内顺序排列。
+            存储不可用时返回 None，调用方应回退到逐条扫描。
+        """
+        if include_logs:
+            # 日志同步直接读文件，先写出缓冲中的日志（在 _lock 外进行，不与 MemoryManager 的锁嵌套）
+            from memory.manager import memory_manager
+            memory_manager.flush_pending_logs()
+        with self._lock:
+            conn = self._ensure_conn()
+            if conn is None:
+                return None
+
+            memories: list[tuple[dict, str]] = []
+            logs: list[tuple[str, str, str]] = []
+            if include_memories:
+                self._sync_memories(conn)
+                where, params = _match_clause("memories", keywords)
+                for content_lower, content, entry_id, category, salience, last_accessed in conn.execute(
+                    "SELECT content_lower, content, id, category, salience, last_accessed "
+                    f"FROM memories WHERE {where} ORDER BY pos",
+                    params,
+                ):
+                    memories.append(({
+                        "id": entry_id,
+                        "content": content,
+                        "category": category,
+                        "salience": salience,
+                        "last_accessed": last_accessed,
+                    }, content_lower))
+            if include_logs:
+                self._sync_logs(conn)
+                where, params = _match_clause("logs", keywords)
+                logs = conn.execute(
+                    f"SELECT content, content_lower, file FROM logs WHERE {where} "
+                    "ORDER BY file DESC, pos",
+                    params,
+                ).fetchall()
+            return memories, logs
+
+    def vector_candidates(
+        self,
+        query_embedding: list[float],
+        embed_texts: Callable[[list[str]], list[list[float]]],
+        model: str,
+        limit: int,
+    ) -> Optional[list[tuple[dict, float]]]:
+        """向量 KNN 检索
+
+        Args:
+            query_embedding: 查询向量
+            embed_texts: 批量计算文档向量的函数（仅对新增/变化的文档调用）
+            model: embedding 模型名，变化后全部文档重新计算向量
+            limit: 返回数量
+
+        Returns:
+            (文档元数据, 余弦相似度) 列表，按相似度降序；元数据含 content、source、type，
+            长期记忆另含 id/category/salience，日志另含 date。存储不可用时返回 None。
+        """
+        with self._lock:
+            conn = self._ensure_conn()
+            if conn is None:
+                return None
+        self._sync_vectors(conn, embed_texts, model)
+        with self._lock:
+            return self._knn(conn, query_embedding, limit)
+
+    def rebuild_vectors(
+        self,
+        embed_texts: Callable[[list[str]], list[list[float]]],
+        model: str,
+    ) -> Optional[int]:
+        """丢弃全部已存向量并重新计算，返回已索引的文档数（存储不可用时返回 None）"""
+        with self._lock:
+            conn = self._ensure_conn()
+            if conn is None:
+                return None
+            with conn:
+                conn.execute("DELETE FROM vectors")
+                # 未加载 sqlite-vec 时无法操作 vec0 虚表，清除 vec_spec 后下次加载会整体重建
+                if self._vec_loaded:
+                    conn.execute("DROP TABLE IF EXISTS vec_index")
+                conn.execute("DELETE FROM meta WHERE key = 'vec_spec'")
+            self._vec_state = None
+            self._vec_generation += 1
+        self._sync_vectors(conn, embed_texts, model)
+        with self._lock:
+            return len(self._vec_meta)
+
+
+# 全局单例（首次查询时才建库）
+search_store = MemorySearchStore()
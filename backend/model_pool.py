@@ -5,7 +5,6 @@ Each scenario (llm, embedding, translate) references a pool entry by ID.
 
 并发安全增强：使用锁保护缓存和文件操作。
 """
-import json
 import logging
 import os
 import tempfile
@@ -14,6 +13,8 @@ import uuid
 from pathlib import Path
 from typing import Optional
 
+import orjson
+
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -22,12 +23,21 @@ logger = logging.getLogger(__name__)
 _pool_lock = threading.Lock()
 
 # In-memory cache
-_pool_cache: Optional[dict] = None
+# (pool, 模型 ID → 模型配置)：索引指向 pool 中的条目；两者放在同一个元组里整体替换，
+# 不持锁的写入方（save_pool / invalidate_cache）也不会让读取方看到不匹配的组合
+_pool_cache: Optional[tuple[dict, dict[str, dict]]] = None
+# 上次写入文件的序列化内容，内容未变化时跳过写盘
+_last_written_payload: Optional[bytes] = None
+# .env 旧配置回退结果：场景 → 模型配置，首次回退时构建，invalidate_cache 时重置
+_legacy_configs: Optional[dict[str, dict]] = None
 
 POOL_FILENAME = "model_pool.json"
 
 MASK_PATTERN = "***"
 
+# 可分配模型的场景
+_VALID_SCENARIOS = frozenset({"llm", "embedding", "translate"})
+
 
 def _pool_path() -> Path:
     return settings.get_data_path() / POOL_FILENAME
@@ -54,41 +64,55 @@ def load_pool() -> dict:
 
     线程安全：使用锁保护缓存读写。
     """
+    with _pool_lock:
+        pool, _ = _cached_pool()
+        # 返回深拷贝防止外部修改污染缓存
+        import copy
+        return copy.deepcopy(pool)
+
+
+def _set_cache(pool: dict) -> tuple[dict, dict[str, dict]]:
+    """更新 pool 缓存并重建模型 ID 索引（一次赋值整体替换），返回新的缓存"""
     global _pool_cache
+    cached = (pool, {m["id"]: m for m in pool.get("models", [])})
+    _pool_cache = cached
+    return cached
 
-    with _pool_lock:
-        if _pool_cache is not None:
-            # 返回深拷贝防止外部修改污染缓存
-            import copy
-            return copy.deepcopy(_pool_cache)
 
-        path = _pool_path()
-        if path.exists():
-            try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-                _pool_cache = data
-                import copy
-                return copy.deepcopy(data)
-            except Exception as e:
-                logger.error(f"Failed to load model pool: {e}")
-                return _empty_pool()
+def _cached_pool() -> tuple[dict, dict[str, dict]]:
+    """返回缓存的 pool 及模型 ID 索引（不拷贝，调用方不得修改；需在 _pool_lock 内调用）"""
+    cached = _pool_cache
+    if cached is not None:
+        return cached
 
-        # File doesn't exist — try migration from .env
-        pool = _maybe_migrate_from_env()
-        _pool_cache = pool
-        import copy
-        return copy.deepcopy(pool)
+    path = _pool_path()
+    if path.exists():
+        try:
+            data = orjson.loads(path.read_bytes())
+        except Exception as e:
+            logger.error(f"Failed to load model pool: {e}")
+            return _empty_pool(), {}
+        return _set_cache(data)
+
+    # File doesn't exist — try migration from .env
+    return _set_cache(_maybe_migrate_from_env())
 
 
 def save_pool(pool: dict) -> None:
     """Atomically write pool to JSON file.
 
-    安全增强：使用备份机制防止 Windows 上 unlink-rename 之间的数据丢失窗口。
-    流程：写临时文件 → 备份原文件 → 删除原文件 → 重命名临时文件
-    如果最后一步失败，可从备份恢复。
+    流程：写临时文件并 fsync → 备份原文件 → os.replace 原子替换目标文件
+    os.replace 在 Windows 和 POSIX 上都能直接覆盖已存在的目标，不存在目标文件缺失的窗口；
+    备份用于目标文件意外丢失时恢复。
+    序列化结果与上次写入的内容相同时（如未修改任何字段的更新请求）跳过写盘。
     """
-    global _pool_cache
+    global _last_written_payload
     path = _pool_path()
+    payload = orjson.dumps(pool, option=orjson.OPT_INDENT_2)
+    if payload == _last_written_payload and path.exists():
+        _set_cache(pool)
+        return
+
     backup_path = path.with_suffix(".json.bak")
     path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -97,8 +121,11 @@ def save_pool(pool: dict) -> None:
         fd, tmp_path = tempfile.mkstemp(
             dir=str(path.parent), suffix=".tmp", prefix="model_pool_"
         )
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(pool, f, ensure_ascii=False, indent=2)
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            # 重命名前确保数据落盘
+            f.flush()
+            os.fsync(f.fileno())
 
         # 先创建备份（如果原文件存在）
         if path.exists():
@@ -108,15 +135,12 @@ def save_pool(pool: dict) -> None:
             except Exception as e:
                 logger.warning(f"Failed to create backup: {e}")
 
-        # Windows 上需要先删除目标文件
-        if path.exists():
-            path.unlink()
-
-        # 重命名临时文件为目标文件
-        Path(tmp_path).rename(path)
+        # 原子替换目标文件
+        os.replace(tmp_path, path)
         tmp_path = None  # 标记已处理，防止 finally 中重复删除
 
-        _pool_cache = pool
+        _set_cache(pool)
+        _last_written_payload = payload
         logger.info("Model pool saved successfully")
 
     except Exception as e:
@@ -218,8 +242,10 @@ def _maybe_migrate_from_env() -> dict:
 
 def invalidate_cache() -> None:
     """Clear in-memory pool cache, forcing a re-read from disk."""
-    global _pool_cache
+    global _pool_cache, _last_written_payload, _legacy_configs
     _pool_cache = None
+    _last_written_payload = None
+    _legacy_configs = None
 
 
 def list_models() -> list[dict]:
@@ -234,11 +260,11 @@ def list_models() -> list[dict]:
 
 def get_model(model_id: str) -> Optional[dict]:
     """Get a model by ID (returns full config with real key for internal use)."""
-    pool = load_pool()
-    for m in pool.get("models", []):
-        if m["id"] == model_id:
-            return m
-    return None
+    with _pool_lock:
+        _, index = _cached_pool()
+        model = index.get(model_id)
+        # 只拷贝这一条，无需深拷贝整个 pool
+        return dict(model) if model is not None else None
 
 
 def add_model(name: str, api_key: str, api_base: str, model: str) -> dict:
@@ -284,10 +310,9 @@ def delete_model(model_id: str) -> None:
                 f"Reassign it first."
             )
 
-    original_len = len(pool["models"])
-    pool["models"] = [m for m in pool["models"] if m["id"] != model_id]
-    if len(pool["models"]) == original_len:
+    if get_model(model_id) is None:
         raise KeyError(f"Model '{model_id}' not found")
+    pool["models"] = [m for m in pool["models"] if m["id"] != model_id]
 
     save_pool(pool)
 
@@ -300,32 +325,29 @@ def get_assignments() -> dict:
 
 def set_assignment(scenario: str, model_id: str) -> None:
     """Assign a model to a scenario (llm/embedding/translate)."""
-    if scenario not in ("llm", "embedding", "translate"):
-        raise ValueError(f"Invalid scenario: {scenario}")
-
-    # Verify model exists
-    model = get_model(model_id)
-    if model is None:
-        raise KeyError(f"Model '{model_id}' not found")
-
-    pool = load_pool()
-    pool["assignments"][scenario] = model_id
-    save_pool(pool)
+    update_assignments({scenario: model_id})
 
 
 def update_assignments(assignments: dict) -> None:
-    """Update multiple scenario assignments at once."""
+    """Update multiple scenario assignments at once.
+
+    只加载一次 pool：先校验全部场景与模型 ID，全部通过后才修改并一次性保存，
+    任一项无效时 pool 保持不变。
+    """
     pool = load_pool()
+    model_ids = {m["id"] for m in pool.get("models", [])}
     for scenario, model_id in assignments.items():
-        if scenario not in ("llm", "embedding", "translate"):
+        if scenario not in _VALID_SCENARIOS:
             raise ValueError(f"Invalid scenario: {scenario}")
+        if model_id and model_id not in model_ids:
+            raise KeyError(f"Model '{model_id}' not found")
+
+    current = pool.setdefault("assignments", {})
+    for scenario, model_id in assignments.items():
         if model_id:
-            model = get_model(model_id)
-            if model is None:
-                raise KeyError(f"Model '{model_id}' not found")
-            pool["assignments"][scenario] = model_id
+            current[scenario] = model_id
         else:
-            pool["assignments"].pop(scenario, None)
+            current.pop(scenario, None)
     save_pool(pool)
 
 
@@ -338,12 +360,11 @@ def resolve_model(scenario: str) -> dict:
 
     Returns dict with keys: api_key, api_base, model
     """
-    pool = load_pool()
-    assignments = pool.get("assignments", {})
-    model_id = assignments.get(scenario)
-
-    if model_id:
-        model = get_model(model_id)
+    # 热路径（每次 LLM/embedding/翻译请求）：直接读缓存与 ID 索引，不深拷贝 pool
+    with _pool_lock:
+        pool, index = _cached_pool()
+        model_id = pool.get("assignments", {}).get(scenario)
+        model = index.get(model_id) if model_id else None
         if model:
             return {
                 "api_key": model.get("api_key", ""),
@@ -352,24 +373,32 @@ def resolve_model(scenario: str) -> dict:
             }
 
     # Fallback to .env legacy config
-    from config import settings as s
-    if scenario == "llm":
-        return {
-            "api_key": s.llm_api_key,
-            "api_base": s.llm_api_base,
-            "model": s.llm_model,
-        }
-    elif scenario == "embedding":
-        return {
-            "api_key": s.embedding_api_key or s.llm_api_key,
-            "api_base": s.embedding_api_base or s.llm_api_base,
-            "model": s.embedding_model,
+    return _get_legacy(scenario)
+
+
+def _get_legacy(scenario: str) -> dict:
+    """返回 .env 旧配置中该场景的模型配置（首次访问时构建全部场景并缓存，返回副本）"""
+    global _legacy_configs
+    if _legacy_configs is None:
+        from config import settings as s
+        _legacy_configs = {
+            "llm": {
+                "api_key": s.llm_api_key,
+                "api_base": s.llm_api_base,
+                "model": s.llm_model,
+            },
+            "embedding": {
+                "api_key": s.embedding_api_key or s.llm_api_key,
+                "api_base": s.embedding_api_base or s.llm_api_base,
+                "model": s.embedding_model,
+            },
+            "translate": {
+                "api_key": s.translate_api_key or s.llm_api_key,
+                "api_base": s.translate_api_base or s.llm_api_base,
+                "model": s.translate_model or s.llm_model,
+            },
         }
-    elif scenario == "translate":
-        return {
-            "api_key": s.translate_api_key or s.llm_api_key,
-            "api_base": s.translate_api_base or s.llm_api_base,
-            "model": s.translate_model or s.llm_model,
-        }
-    else:
+    config = _legacy_configs.get(scenario)
+    if config is None:
         raise ValueError(f"Unknown scenario: {scenario}")
+    return dict(config)
@@ -1,4 +1,6 @@
 """System Prompt Builder - Dynamically assembles the system prompt from workspace files."""
+import codecs
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 import logging
@@ -7,16 +9,37 @@ from xml.sax.saxutils import escape as xml_escape
 
 from config import settings, PROJECT_ROOT, read_text_smart
 
+try:
+    from cache import prompt_cache
+except Exception:
+    # 缓存模块不可用时每次都重新构建 prompt
+    prompt_cache = None
+
 logger = logging.getLogger(__name__)
 
 
+# 按文件缓存读取结果：路径 → (mtime_ns, size, max_chars, 截断后的内容)
+# 整体 prompt 缓存失效时，未修改的文件无需重新读取和解码
+_file_cache: dict[str, tuple[int, int, Optional[int], str]] = {}
+
+
 def _read_file_safe(path: Path, max_chars: Optional[int] = None) -> str:
-    """安全读取文件，自动处理编码，找不到时返回空字符串。"""
-    if not path.exists():
+    """安全读取文件，自动处理编码，找不到时返回空字符串。
+
+    按 (mtime_ns, size) 缓存，文件未变化时直接返回上次的结果。
+    """
+    try:
+        st = path.stat()
+    except OSError:
         return ""
+    key = str(path)
+    cached = _file_cache.get(key)
+    if cached is not None and cached[:3] == (st.st_mtime_ns, st.st_size, max_chars):
+        return cached[3]
     content = read_text_smart(path)
     if max_chars and len(content) > max_chars:
         content = content[:max_chars] + "\n\n...[truncated]"
+    _file_cache[key] = (st.st_mtime_ns, st.st_size, max_chars, content)
     return content
 
 
@@ -65,8 +88,43 @@ def _detect_os_description() -> str:
         return f"{system} {platform.release()} ({machine})"
 
 
+# 上次生成的技能快照：(目录与 SKILL.md 的指纹, XML)
+_skills_cache: Optional[tuple[tuple, str]] = None
+
+
+def _scan_skills(skills_dirs: list[Path]) -> tuple[list[tuple[Path, Path]], tuple]:
+    """列出各技能目录下的 (技能目录, SKILL.md)，并按目录与文件的 mtime 计算指纹
+
+    增删技能会改变基础目录的 mtime，编辑 SKILL.md 会改变其自身的 mtime/size，
+    都无需读取文件内容即可感知。
+    """
+    skills: list[tuple[Path, Path]] = []
+    fingerprint: list[tuple] = [(str(settings.get_data_path()),)]
+    for base_dir in skills_dirs:
+        try:
+            fingerprint.append((str(base_dir), base_dir.stat().st_mtime_ns))
+            children = sorted(base_dir.iterdir())
+        except OSError:
+            continue
+        for skill_dir in children:
+            if not skill_dir.is_dir():
+                continue
+            skill_md = skill_dir / "SKILL.md"
+            try:
+                st = skill_md.stat()
+            except OSError:
+                continue
+            skills.append((skill_dir, skill_md))
+            fingerprint.append((str(skill_md), st.st_mtime_ns, st.st_size))
+    return skills, tuple(fingerprint)
+
+
 def generate_skills_snapshot() -> str:
-    """Scan skills directory and generate SKILLS_SNAPSHOT content."""
+    """Scan skills directory and generate SKILLS_SNAPSHOT content.
+
+    技能目录与 SKILL.md 均未变化时直接返回上次生成的 XML，跳过 frontmatter 解析与拼接。
+    """
+    global _skills_cache
     skills_dirs = [settings.skills_dir]
 
     # Claude Code Skills compatibility
@@ -74,50 +132,97 @@ def generate_skills_snapshot() -> str:
     if claude_code_dir:
         skills_dirs.append(claude_code_dir)
 
+    skills, fingerprint = _scan_skills(skills_dirs)
+    cached = _skills_cache
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
     data_path = settings.get_data_path()
-    skills_xml = "<available_skills>\n"
-    for base_dir in skills_dirs:
-        if not base_dir.exists():
-            continue
-        for skill_dir in sorted(base_dir.iterdir()):
-            if not skill_dir.is_dir():
-                continue
-            skill_md = skill_dir / "SKILL.md"
-            if not skill_md.exists():
-                continue
-            # Parse frontmatter for name and description
-            name, description = _parse_skill_frontmatter(skill_md)
-            if not name:
-                name = skill_dir.name
-            # Use relative path from data_dir first, fallback to PROJECT_ROOT
+    # 逐段追加到列表，最后一次性拼接（避免循环中反复 += 复制整个字符串）
+    buf: list[str] = ["<available_skills>\n"]
+    for skill_dir, skill_md in skills:
+        # Parse frontmatter for name and description
+        name, description = _parse_skill_frontmatter(skill_md)
+        if not name:
+            name = skill_dir.name
+        # Use relative path from data_dir first, fallback to PROJECT_ROOT
+        try:
+            rel_path = skill_md.relative_to(data_path)
+        except ValueError:
             try:
-                rel_path = skill_md.relative_to(data_path)
+                rel_path = skill_md.relative_to(PROJECT_ROOT)
             except ValueError:
-                try:
-                    rel_path = skill_md.relative_to(PROJECT_ROOT)
-                except ValueError:
-                    rel_path = skill_md
-            # 安全修复：对 XML 内容进行转义，防止 XML 注入
-            # 如果技能名或描述包含 <、>、& 等字符，可能破坏 XML 结构
-            safe_name = xml_escape(name)
-            safe_desc = xml_escape(description)
-            safe_loc = xml_escape(str(rel_path))
-            skills_xml += f"  <skill>\n"
-            skills_xml += f"    <name>{safe_name}</name>\n"
-            skills_xml += f"    <description>{safe_desc}</description>\n"
-            skills_xml += f"    <location>./{safe_loc}</location>\n"
-            skills_xml += f"  </skill>\n"
-
-    skills_xml += "</available_skills>"
+                rel_path = skill_md
+        # 安全修复：对 XML 内容进行转义，防止 XML 注入
+        # 如果技能名或描述包含 <、>、& 等字符，可能破坏 XML 结构
+        safe_name = xml_escape(name)
+        safe_desc = xml_escape(description)
+        safe_loc = xml_escape(str(rel_path))
+        buf.append(
+            f"  <skill>\n"
+            f"    <name>{safe_name}</name>\n"
+            f"    <description>{safe_desc}</description>\n"
+            f"    <location>./{safe_loc}</location>\n"
+            f"  </skill>\n"
+        )
+
+    buf.append("</available_skills>")
+    skills_xml = "".join(buf)
+    _skills_cache = (fingerprint, skills_xml)
     return skills_xml
 
 
+# frontmatter 位于文件开头，只读取前 4 KiB 即可覆盖绝大多数 SKILL.md
+_FRONTMATTER_READ_BYTES = 4096
+
+# 按文件缓存 frontmatter 解析结果：路径 → (mtime_ns, size, (name, description))
+_frontmatter_cache: dict[str, tuple[int, int, tuple[str, str]]] = {}
+
+
 def _parse_skill_frontmatter(skill_md: Path) -> tuple[str, str]:
-    """解析 SKILL.md 的 YAML frontmatter，自动处理文件编码。"""
+    """解析 SKILL.md 的 YAML frontmatter，自动处理文件编码。
+
+    只读取文件开头 _FRONTMATTER_READ_BYTES 字节；按 (mtime_ns, size) 缓存，文件未变化时不做任何读取。
+    常见的 `name: ...` / `description: ...` 单行写法由 _parse_simple_frontmatter 直接提取，
+    遇到多行、引号转义等复杂 YAML 写法或 frontmatter 超出读取范围时，才读取全文交给
+    python-frontmatter（PyYAML）解析。
+    """
+    try:
+        st = skill_md.stat()
+        key = str(skill_md)
+        cached = _frontmatter_cache.get(key)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        with open(skill_md, "rb") as f:
+            head = f.read(_FRONTMATTER_READ_BYTES)
+    except Exception:
+        return "", ""
+
+    fields = _parse_simple_frontmatter(_decode_head(head, final=len(head) < _FRONTMATTER_READ_BYTES))
+    if fields is not None:
+        result = (fields.get("name", ""), fields.get("description", ""))
+    else:
+        result = _parse_frontmatter_full(skill_md)
+    _frontmatter_cache[key] = (st.st_mtime_ns, st.st_size, result)
+    return result
+
+
+def _decode_head(raw: bytes, final: bool) -> str:
+    """按 UTF-8 → GBK 解码文件开头，截断处不完整的多字节字符会被丢弃，都失败时替换非法字节"""
+    for enc in ("utf-8", "gbk"):
+        try:
+            return codecs.getincrementaldecoder(enc)().decode(raw, final=final)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("utf-8", errors="replace")
+
+
+def _parse_frontmatter_full(skill_md: Path) -> tuple[str, str]:
+    """读取全文并用 python-frontmatter 解析（复杂 YAML 写法的兜底）"""
     try:
-        import frontmatter
         # 用 read_text_smart 处理编码后，再解析 frontmatter
         content = read_text_smart(skill_md)
+        import frontmatter
         post = frontmatter.loads(content)
         name = post.get("name", "")
         description = post.get("description", "")
@@ -126,8 +231,59 @@ def _parse_skill_frontmatter(skill_md: Path) -> tuple[str, str]:
         return "", ""
 
 
+# 需要从 frontmatter 中提取的字段
+_FRONTMATTER_FIELDS = ("name", "description")
+
+
+def _parse_simple_frontmatter(content: str) -> Optional[dict[str, str]]:
+    """手写解析 frontmatter 中 name/description 的单行 `key: value`
+
+    没有 frontmatter 时返回空字典；这两个字段使用了无法按单行处理的 YAML 写法
+    （块标量、续行、流式集合、带转义的双引号等）或 frontmatter 未闭合时返回 None。
+    """
+    lines = iter(content.lstrip("\ufeff").splitlines())
+    if next(lines, "").strip() != "---":
+        return {}
+    fields: dict[str, str] = {}
+    last_key = None
+    for line in lines:
+        stripped = line.strip()
+        if stripped == "---":
+            return fields
+        if not stripped or stripped.startswith("#"):
+            continue
+        if line[0] in " \t":
+            # 缩进行：上一个键的续行或嵌套内容
+            if last_key in _FRONTMATTER_FIELDS:
+                return None
+            continue
+        key, sep, value = stripped.partition(":")
+        last_key = key.strip()
+        if not sep or last_key not in _FRONTMATTER_FIELDS:
+            continue
+        value = value.strip()
+        if not value:
+            # 值在后续缩进行中（或为空）
+            continue
+        if value[0] in "|>[{&*!%@`":
+            return None
+        if value[0] in "\"'":
+            quote = value[0]
+            if len(value) < 2 or value[-1] != quote or quote in value[1:-1] or "\\" in value:
+                return None
+            value = value[1:-1]
+        elif " #" in value:
+            value = value.split(" #", 1)[0].rstrip()
+        fields[last_key] = value
+    return None
+
+
+@lru_cache(maxsize=1)
 def _detect_claude_code_skills() -> Optional[Path]:
-    """Detect Claude Code skills directory if installed."""
+    """Detect Claude Code skills directory if installed.
+
+    结果在进程内缓存（每次构建 prompt 都会调用），设置变更后由 invalidate_cache() 清除。
+    """
     # Common Claude Code skills locations
     home = Path.home()
     possible_paths = [
@@ -145,6 +301,11 @@ def _detect_claude_code_skills() -> Optional[Path]:
     return None
 
 
+def invalidate_cache() -> None:
+    """设置重新加载后调用：清除依赖设置的缓存（Claude Code 技能目录探测结果）"""
+    _detect_claude_code_skills.cache_clear()
+
+
 def build_system_prompt() -> str:
     """
     Build the complete system prompt by assembling 6 components in order:
@@ -156,14 +317,14 @@ def build_system_prompt() -> str:
     6. memory.json (长期记忆) + Daily Logs
     """
     # Check cache first
-    try:
-        from cache import prompt_cache
-        cached = prompt_cache.get_cached_prompt()
-        if cached is not None:
-            logger.debug("✓ Using cached system prompt")
-            return cached
-    except Exception as e:
-        logger.warning(f"Prompt cache error (falling back to build): {e}")
+    if prompt_cache is not None:
+        try:
+            cached = prompt_cache.get_cached_prompt()
+            if cached is not None:
+                logger.debug("✓ Using cached system prompt")
+                return cached
+        except Exception as e:
+            logger.warning(f"Prompt cache error (falling back to build): {e}")
 
     max_chars = settings.max_prompt_chars
     workspace = settings.workspace_dir
@@ -245,12 +406,12 @@ def build_system_prompt() -> str:
     full_prompt = "\n\n---\n\n".join(parts)
 
     # Cache the result
-    try:
-        from cache import prompt_cache
-        prompt_cache.cache_prompt(full_prompt)
-        logger.debug("✓ System prompt cached")
-    except Exception as e:
-        logger.warning(f"Failed to cache prompt: {e}")
+    if prompt_cache is not None:
+        try:
+            prompt_cache.cache_prompt(full_prompt)
+            logger.debug("✓ System prompt cached")
+        except Exception as e:
+            logger.warning(f"Failed to cache prompt: {e}")
 
     return full_prompt
 
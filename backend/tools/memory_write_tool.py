@@ -11,7 +11,7 @@ import logging
 
 from langchain_core.tools import tool
 from memory.manager import memory_manager
-from memory.models import VALID_CATEGORIES, CATEGORY_LABELS
+from memory.models import VALID_CATEGORIES, VALID_CATEGORIES_SET, CATEGORY_LABELS
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +71,7 @@ def memory_write(content: str, category: str = "general", write_to: str = "memor
 
     content = content.strip()
 
-    if category not in VALID_CATEGORIES:
+    if category not in VALID_CATEGORIES_SET:
         return f"❌ Error: Invalid category '{category}'. Valid: {', '.join(VALID_CATEGORIES)}"
 
     try:
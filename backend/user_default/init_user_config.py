@@ -27,11 +27,13 @@ ENABLE_URL_CACHE=true
 ENABLE_LLM_CACHE=false
 ENABLE_PROMPT_CACHE=true
 ENABLE_TRANSLATE_CACHE=true
+ENABLE_EMBEDDING_CACHE=true
 
 URL_CACHE_TTL=3600
 LLM_CACHE_TTL=86400
 PROMPT_CACHE_TTL=600
 TRANSLATE_CACHE_TTL=604800
+EMBEDDING_CACHE_TTL=2592000
 
 CACHE_MAX_MEMORY_ITEMS=100
 CACHE_MAX_DISK_SIZE_MB=5120
@@ -43,6 +45,8 @@ MEMORY_SESSION_REFLECT_ENABLED=true
 MEMORY_DAILY_LOG_DAYS=2
 MEMORY_MAX_PROMPT_TOKENS=4000
 MEMORY_INDEX_ENABLED=true
+MEMORY_USE_VEC_INDEX=true
+MEMORY_EMBEDDING_QUANT=fp32
 
 # Memory v2 Configuration
 MEMORY_CONSOLIDATION_ENABLED=true
@@ -380,6 +384,7 @@ _REQUIRED_DIRS = [
     ".cache/llm",
     ".cache/prompt",
     ".cache/translate",
+    ".cache/embedding",
     "tmp",
     "logs",
 ]
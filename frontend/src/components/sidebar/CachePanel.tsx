@@ -37,6 +37,7 @@ const CORE_CACHE_META: Record<string, { label: string; icon: React.ElementType }
     llm: { label: "LLM 缓存", icon: Bot },
     prompt: { label: "Prompt 缓存", icon: FileText },
     translate: { label: "翻译缓存", icon: Languages },
+    embedding: { label: "Embedding 缓存", icon: Sparkles },
 };
 
 function isMcpCache(id: string): boolean {
@@ -107,7 +108,7 @@ function getCombinedHitRate(l1: { hits: number }, l2: { hits: number; misses: nu
 const PAGE_SIZE = 10;
 
 // Preferred display order for core types
-const CORE_ORDER = ["url", "llm", "prompt", "translate"];
+const CORE_ORDER = ["url", "llm", "prompt", "translate", "embedding"];
 
 interface CachePanelProps {
     onFileOpen?: (path: string) => void;
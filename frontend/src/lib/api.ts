@@ -1089,7 +1089,7 @@ export async function fetchRollingSummary(): Promise<string> {
 // ============================================
 // Cache API
 // ============================================
-export type CacheType = string;  // "url" | "llm" | "prompt" | "translate" | "tool_*"
+export type CacheType = string;  // "url" | "llm" | "prompt" | "translate" | "embedding" | "tool_*"
 
 export interface CacheEntryPreview {
   key: string;